@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+"""
+Measures the cost of computing a frame of each effect (see effects module) for different numbers of leds. Must be
+executed from the src directory:
+
+    python -m benchmark.effects --leds 300 5000 --frames 1000
+"""
+
+from argparse import ArgumentParser
+from time import perf_counter
+from effects import effects
+from framebuffer import pack
+
+PALETTE = [pack((255, 0, 0)), pack((0, 255, 0)), pack((0, 0, 255))]
+
+
+def measure(name: str, leds: int, frames: int) -> float:
+    """
+    :return: mean time to compute a frame in microseconds (60 frames per second)
+    """
+    effect = effects[name](leds, 1.0, PALETTE, 1)
+    start = perf_counter()
+    for i in range(frames):
+        effect.render(i / 60)
+    return 1e6 * (perf_counter() - start) / frames
+
+
+if __name__ == '__main__':
+
+    parser = ArgumentParser(description='Measures the cost of computing a frame of each effect')
+    parser.add_argument('--leds', type=int, nargs='+', default=[300, 5000])
+    parser.add_argument('--frames', type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f'{"effect":<12}' + ''.join(f'{f"{leds} leds (us)":>18}' for leds in args.leds))
+    for name in effects.keys():
+        print(f'{name:<12}' + ''.join(f'{measure(name, leds, args.frames):>18.1f}' for leds in args.leds))
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+
+"""
+Measures the time spent on each stage of the execution of each command (parse, validate_arguments, exec_cmd and
+encoding the response, also end to end through the Dispatcher), and the time to concatenate sections and to render
+the whole strip, for different strip lengths and numbers of sections. Must be executed from the src directory:
+
+    python -m benchmark.pipeline --leds 300 5000 --sections 1 100 --output results.json
+
+By default the strip is simulated without waiting the wire time (see driver.SimulatedStrip), so only the time spent
+by the server is measured, use --driver ws281x to measure on the Raspberry or --wire-time to simulate it.
+
+Results are written as JSON and they can be compared against a previous run (a baseline), stages slower than the
+baseline by more than the tolerance are reported as regressions (and the exit code is 1):
+
+    python -m benchmark.pipeline --baseline results.json
+"""
+
+import json
+import platform
+import sys
+from argparse import ArgumentParser
+from configparser import ConfigParser
+from time import perf_counter_ns
+from typing import Callable, List, Dict
+from command import CommandParser
+from commands import registry
+from controller import Controller
+from dispatcher import Dispatcher
+
+
+# commands not measured
+excluded_commands = ['disconnect']
+
+
+def requests(ids: List[str], leds: int) -> Dict[str, dict]:
+    """
+    Builds a request for each command (see commands.registry), sections (with the given ids) are defined on the first
+    half of the strip
+
+    :return: arguments of each command (disconnect is not measured)
+    """
+    return {
+        'batch': {'commands': [{'name': 'turn_off', 'args': {'section_id': ids[0]}},
+                               {'name': 'turn_on', 'args': {'section_id': ids[0]}}]},
+        'metrics': {},
+        'profile': {'action': 'status'},
+        'reset': {},
+        'resume': {'version': 0},
+        'section_add': {'sections': [{'start': leds // 2, 'end': leds - 1, 'color': '#ff8000'}]},
+        'section_edit': {'section_id': ids[0], 'color': '#00ff00'},
+        'section_effect': {'section_id': ids[0], 'effect': 'none'},
+        'section_remove': {'sections': [ids[0]]},
+        'status': {},
+        'turn_off': {'section_id': ids[0]},
+        'turn_on': {'section_id': ids[0]},
+    }
+
+
+def summarize(samples: List[int]) -> dict:
+    """
+    :param samples: durations in nanoseconds
+    :return: statistics in microseconds
+    """
+    samples = sorted(samples)
+    return {
+        'mean_us': sum(samples) / len(samples) / 1000,
+        'p50_us': samples[len(samples) // 2] / 1000,
+        'p99_us': samples[min(len(samples) - 1, len(samples) * 99 // 100)] / 1000,
+    }
+
+
+def timed(fn: Callable, samples: List[int]):
+    start = perf_counter_ns()
+    result = fn()
+    samples.append(perf_counter_ns() - start)
+    return result
+
+
+def run(config: ConfigParser, leds: int, sections: int, iterations: int) -> List[dict]:
+    """
+    Measures all stages for a strip length and a number of sections, the state is rolled back after executing each
+    command (not measured) so all iterations start from the same state
+    """
+    config['PIXEL_STRIP']['n'] = str(leds)
+    config['RENDER'] = {'mode': 'sync'}
+    config['STATE'] = {'enabled': '0'}
+    controller = Controller(config)
+    parser = CommandParser()
+    dispatcher = Dispatcher(parser, controller)
+    length = (leds // 2) // sections
+    ids = controller.new_sections([(i * length, (i + 1) * length - 1, (255, 0, 0)) for i in range(sections)])
+    controller.render()
+    results = []
+
+    def add(command: str, stage: str, samples: List[int]):
+        results.append({'leds': leds, 'sections': sections, 'command': command, 'stage': stage, **summarize(samples)})
+
+    try:
+        sample_requests = requests(ids, leds)
+        for name in registry.keys():
+            if name in excluded_commands:
+                continue
+            if name not in sample_requests:
+                raise Exception(f'there is no sample request for {name}, it must be added to requests')
+            req = json.dumps({'name': name, 'args': sample_requests[name]})
+            stages = {'parse': [], 'validate_arguments': [], 'exec_cmd': [], 'to_json': [], 'end_to_end': []}
+            # the first execution imports the command (see CommandParser.get_class)
+            snapshot = controller.snapshot()
+            dispatcher.dispatch(req)
+            controller.rollback(snapshot)
+            controller.render()
+            for _ in range(iterations):
+                snapshot = controller.snapshot()
+                cmd = timed(lambda: parser.parse(req), stages['parse'])
+                timed(cmd.validate_arguments, stages['validate_arguments'])
+                timed(lambda: controller.exec_cmd(cmd), stages['exec_cmd'])
+                controller.rollback(snapshot)
+                response = timed(lambda: dispatcher.dispatch(req), stages['end_to_end'])
+                if response.status.value != 200:
+                    raise Exception(f'{name} failed: {response.to_json()}')
+                timed(response.to_json, stages['to_json'])
+                controller.rollback(snapshot)
+                controller.render()
+            for stage, samples in stages.items():
+                add(name, stage, samples)
+
+        samples = []
+        for _ in range(iterations):
+            timed(controller.concatenate_sections, samples)
+        add('', 'concatenate_sections', samples)
+
+        samples = []
+        for _ in range(iterations):
+            controller.framebuffer.mark_all_dirty()
+            timed(controller.render, samples)
+        add('', 'render', samples)
+    finally:
+        controller.close()
+    return results
+
+
+def compare(results: List[dict], baseline: List[dict], tolerance: float) -> List[str]:
+    """
+    :return: stages slower than the baseline (p50) by more than tolerance (ratio)
+    """
+    key = ('leds', 'sections', 'command', 'stage')
+    previous = {tuple(r[k] for k in key): r for r in baseline}
+    regressions = []
+    for r in results:
+        b = previous.get(tuple(r[k] for k in key))
+        if b is not None and r['p50_us'] > b['p50_us'] * (1 + tolerance) and r['p50_us'] - b['p50_us'] > 1:
+            regressions.append(f'{r["leds"]} leds, {r["sections"]} sections, {r["command"]} {r["stage"]}: '
+                               f'{b["p50_us"]:.1f} us -> {r["p50_us"]:.1f} us')
+    return regressions
+
+
+if __name__ == '__main__':
+
+    arg_parser = ArgumentParser(description='Measures the time spent on each stage of the execution of commands')
+    arg_parser.add_argument('--config', default='../config.ini')
+    arg_parser.add_argument('--leds', type=int, nargs='+', default=[300, 1000, 5000])
+    arg_parser.add_argument('--sections', type=int, nargs='+', default=[1, 10, 100])
+    arg_parser.add_argument('--iterations', type=int, default=200)
+    arg_parser.add_argument('--output', help='file to write results (JSON)')
+    arg_parser.add_argument('--baseline', help='results of a previous run to compare with')
+    arg_parser.add_argument('--driver', default='simulated', choices=['simulated', 'ws281x'])
+    arg_parser.add_argument('--wire-time', action='store_true', help='simulate the time to send frames to the strip')
+    arg_parser.add_argument('--tolerance', type=float, default=0.2, help='ratio, 0.2 reports stages 20%% slower')
+    args = arg_parser.parse_args()
+
+    config = ConfigParser()
+    config.read(args.config)
+    config['PIXEL_STRIP']['driver'] = args.driver
+    config['PIXEL_STRIP']['timing'] = '1' if args.wire_time else '0'
+    results = []
+    for leds in args.leds:
+        for sections in args.sections:
+            if sections > leds // 2:
+                continue
+            results += run(config, leds, sections, args.iterations)
+
+    print(f'{"leds":>6}{"sections":>10}  {"command":<16}{"stage":<22}{"p50 (us)":>10}{"p99 (us)":>10}')
+    for r in results:
+        print(f'{r["leds"]:>6}{r["sections"]:>10}  {r["command"]:<16}{r["stage"]:<22}{r["p50_us"]:>10.1f}'
+              f'{r["p99_us"]:>10.1f}')
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(),
+                       'iterations': args.iterations, 'results': results}, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        sys.exit(1 if len(regressions) > 0 else 0)
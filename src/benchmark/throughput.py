@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+"""
+Measures how many frames are shown per second with the render loop on a simulated strip (see driver.SimulatedStrip)
+while frames are written at a given rate (like the UdpReceiver does), frames written faster than they can be shown
+are coalesced (dropped). Must be executed from the src directory:
+
+    python -m benchmark.throughput --leds 300 --rate 120 --max-fps 60 --seconds 5
+"""
+
+from argparse import ArgumentParser
+from configparser import ConfigParser
+from time import perf_counter, sleep
+from controller import Controller
+
+
+if __name__ == '__main__':
+
+    parser = ArgumentParser(description='Measures frames shown per second on a simulated strip')
+    parser.add_argument('--config', default='../config.ini')
+    parser.add_argument('--leds', type=int, default=300)
+    parser.add_argument('--rate', type=float, default=120, help='frames written per second')
+    parser.add_argument('--max-fps', type=float, default=60)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    config = ConfigParser()
+    config.read(args.config)
+    config['PIXEL_STRIP']['n'] = str(args.leds)
+    config['PIXEL_STRIP']['driver'] = 'simulated'
+    config['RENDER'] = {'mode': 'loop', 'max_fps': str(args.max_fps)}
+    config['STATE'] = {'enabled': '0'}
+    controller = Controller(config)
+    frames = [bytes([i % 256]) * (3 * args.leds) for i in range(256)]
+
+    written = 0
+    start = perf_counter()
+    while perf_counter() - start < args.seconds:
+        controller.write_frame(frames[written % 256])
+        written += 1
+        sleep(max(0.0, start + written / args.rate - perf_counter()))
+    elapsed = perf_counter() - start
+    controller.close()
+
+    strip = controller.strip
+    times = list(strip.frame_times)
+    intervals = sorted(b[0] - a[0] for a, b in zip(times, times[1:]))
+    print(f'written: {written} frames ({written / elapsed:.1f} per second)')
+    print(f'shown: {strip.frames} frames ({strip.frames / elapsed:.1f} per second)')
+    print(f'dropped: {max(0, written - strip.frames)} frames')
+    print(f'wire time: {1000 * strip.wire_time:.2f} ms per frame')
+    if len(intervals) > 0:
+        print(f'interval between frames: p50 {1000 * intervals[len(intervals) // 2]:.2f} ms, '
+              f'max {1000 * intervals[-1]:.2f} ms')
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+"""
+Measures the latency of validating the arguments of each command, with the fast validator (see schema.compile_schema)
+and with jsonschema only. Must be executed from the src directory:
+
+    python -m benchmark.validation --iterations 10000
+"""
+
+from argparse import ArgumentParser
+from time import perf_counter
+from command import CommandParser
+
+SAMPLES = {
+    'section_add': {'sections': [{'start': 10 * i, 'end': 10 * i + 9, 'color': '#ff8000'} for i in range(10)]},
+    'section_edit': {'section_id': 'a3c0d7f2', 'start': 0, 'end': 99, 'color': '#00ff00'},
+    'section_remove': {'sections': ['a3c0d7f2', '0b1e97c4']},
+    'turn_on': {'section_id': 'a3c0d7f2'},
+    'turn_off': {},
+    'batch': {'commands': [{'name': 'turn_off'}, {'name': 'turn_on'}]},
+}
+
+
+def measure(cmd, iterations: int) -> float:
+    """
+    :return: mean latency of cmd.check_arguments in microseconds
+    """
+    start = perf_counter()
+    for _ in range(iterations):
+        cmd.check_arguments()
+    return 1e6 * (perf_counter() - start) / iterations
+
+
+if __name__ == '__main__':
+
+    parser = ArgumentParser(description='Measures the latency of validating arguments of commands')
+    parser.add_argument('--iterations', type=int, default=10000)
+    args = parser.parse_args()
+
+    command_parser = CommandParser()
+    print(f'{"command":<16}{"fast (us)":>12}{"jsonschema (us)":>18}{"speedup":>10}')
+    for name, sample in SAMPLES.items():
+        cmd = command_parser.parse_object({'name': name, 'args': sample})
+        fast = measure(cmd, args.iterations)
+        fast_validator = cmd.fast_validator
+        cmd.fast_validator = None
+        slow = measure(cmd, args.iterations)
+        cmd.fast_validator = fast_validator
+        print(f'{name:<16}{fast:>12.2f}{slow:>18.2f}{slow / fast:>9.1f}x')
@@ -0,0 +1,60 @@
+from functools import lru_cache
+from string import hexdigits
+from typing import Tuple
+
+# the master usually reuses a handful of colors (for instance its palette)
+CACHE_SIZE = 256
+
+
+def parse_hex(c: str) -> Tuple[int, int, int]:
+    """
+    Parses colors like #ff8000 or #f80 (case insensitive)
+
+    :raises ValueError: if c is not correctly defined
+    """
+    if len(c) not in (4, 7) or c[0] != '#' or c[1:].strip(hexdigits) != '':
+        raise ValueError(f'invalid hexadecimal color {c}')
+    if len(c) == 4:
+        return int(c[1] * 2, 16), int(c[2] * 2, 16), int(c[3] * 2, 16)
+    value = int(c[1:], 16)
+    return value >> 16, (value >> 8) & 0xFF, value & 0xFF
+
+
+def parse_rgb(c: str) -> Tuple[int, int, int]:
+    """
+    Parses colors like rgb(255,128,0) (without spaces)
+
+    :raises ValueError: if c is not correctly defined
+    """
+    if not c.startswith('rgb(') or not c.endswith(')'):
+        raise ValueError(f'invalid rgb color {c}')
+    channels = c[4:-1].split(',')
+    if len(channels) != 3 or \
+            not all(0 < len(channel) <= 3 and channel.isascii() and channel.isdigit() for channel in channels):
+        raise ValueError(f'invalid rgb color {c}')
+    red, green, blue = int(channels[0]), int(channels[1]), int(channels[2])
+    if red > 255 or green > 255 or blue > 255:
+        raise ValueError(f'invalid rgb color {c}')
+    return red, green, blue
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_color(c: str) -> Tuple[int, int, int]:
+    """
+    Parse and returns the corresponding color
+
+    :param c: RGB or hexadecimal string representation of the color
+    :return: the color
+    :raises ValueError: if c is not correctly defined
+    """
+    if c.startswith('#'):
+        return parse_hex(c)
+    return parse_rgb(c)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def to_hex(color: Tuple[int, int, int]) -> str:
+    """
+    Inverse of parse_hex, formats colors like #ff8000 (lower case)
+    """
+    return f'#{color[0]:02x}{color[1]:02x}{color[2]:02x}'
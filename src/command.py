@@ -1,12 +1,22 @@
 from importlib import import_module
 from json import loads
-from typing import Optional
-from jsonschema import Draft7Validator
-from os.path import abspath, isfile, join, dirname
-from os import listdir
-from inflector import Inflector
+from typing import Optional, Callable, Any, Dict, Type, TYPE_CHECKING
 from controller import Controller
 from error import ParseError
+from schema import compile_schema
+from commands import registry
+
+if TYPE_CHECKING:
+    from jsonschema import Draft7Validator
+
+
+def create_validator(schema: dict) -> 'Draft7Validator':
+    """
+    jsonschema is imported only when needed (it's slow to import), that is when a message is not valid (see
+    Command.check_arguments)
+    """
+    from jsonschema import Draft7Validator
+    return Draft7Validator(schema)
 
 
 class Command:
@@ -17,19 +27,55 @@ class Command:
         - Must me implemented on his own module (inside commands package)
         - Must inherit from this class
         - Class name must be the camelized version of the module name
+        - Must be added to the registry (see commands/__init__.py)
 
     The command name (the value for the *name* attribute on the JSON) will be the same
     as the module name (snake-case version).
 
+    Commands with arguments define the JSON schema of the arguments on the *arguments_schema*
+    class attribute, it's compiled only once (see compile) when the command is used for the
+    first time.
+
+    Commands that don't access the state of the controller set *exclusive* to False, so they're
+    executed without waiting for other commands or the render (see Controller.exec_cmd). Those
+    that may block (for instance waiting for other threads or writing files) also set *blocking*
+    to True, so they're not executed on the event loop (see AsyncServer.process).
+
     """
 
+    arguments_schema: Optional[dict] = None
+    exclusive = True
+    blocking = False
+    validator: Optional['Draft7Validator'] = None
+    fast_validator: Optional[Callable[[Any], bool]] = None
+
+    @classmethod
+    def compile(cls):
+        """
+        Compiles the JSON schema of the arguments (see check_arguments)
+        """
+        if cls.arguments_schema is not None:
+            fast_validator = compile_schema(cls.arguments_schema)
+            # staticmethod: otherwise it would be bound to instances
+            cls.fast_validator = staticmethod(fast_validator) if fast_validator is not None else None
+
     def __init__(self):
-        self.args: dict = None
+        self.name = ''
+        self.args: dict = {}
+        # id of the strip addressed (see strips.py), None for the default strip
+        self.strip: Optional[int] = None
         self.controller: Optional[Controller] = None
+        self.parser: Optional['CommandParser'] = None
 
     def set_controller(self, controller: Controller):
         self.controller = controller
 
+    def set_parser(self, parser: 'CommandParser'):
+        """
+        Sets the parser that created the command (used by commands containing other commands)
+        """
+        self.parser = parser
+
     def set_arguments(self, args: dict):
         """
         Sets the arguments of the command
@@ -38,6 +84,22 @@ class Command:
         """
         self.args = args
 
+    def check_arguments(self):
+        """
+        Validates arguments against the JSON schema of the command, jsonschema is used only if the fast validator
+        rejects them (to get the errors)
+
+        :raise ParseError: if arguments are not valid
+        """
+        cls = type(self)
+        if cls.arguments_schema is None or (self.fast_validator is not None and self.fast_validator(self.args)):
+            return
+        if cls.validator is None:
+            cls.validator = create_validator(cls.arguments_schema)
+        errors = [e for e in cls.validator.iter_errors(self.args)]
+        if len(errors) > 0:
+            raise ParseError(errors)
+
     def validate_arguments(self):
         """
         :raise ValidationError:
@@ -55,39 +117,46 @@ class Command:
 
 
 class CommandParser:
+    """
+    Parses commands, classes of commands are resolved from the registry (see commands/__init__.py) and their modules are
+    imported when they are used for the first time
+    """
 
     def __init__(self):
-        # Dynamically constructs the JSON schema and the Draft7Validator used in the CommandParser
-        # IMPORTANT: validate schema with Draft7Validator.check_schema(schema) before using it!
-
-        inflector = Inflector()
-        commands = 'commands'
-        current_path = dirname(abspath(__file__))
-        excluded_files = ['__init__.py']
-        modules = [
-            file_name[:-3]
-            for file_name in listdir(commands)
-            if isfile(join(join(current_path, commands), file_name)) and file_name not in excluded_files
-        ]
         schema = {
             "$schema": "https://json-schema.org/schema#",
             "type": "object",
             "properties": {
                 "name": {
                     "type": "string",
-                    "enum": modules
+                    "enum": list(registry.keys())
                 },
                 "args": {
                     "type": "object"
+                },
+                "strip": {
+                    "type": "integer"
                 }
             },
             "required": ["name"]
         }
-        classes = dict()
-        for module_name in modules:
-            classes[module_name] = getattr(import_module(f'{commands}.{module_name}'), inflector.camelize(module_name))
-        self.validator = Draft7Validator(schema)
-        self.classes = classes
+        self.schema = schema
+        self.validator: Optional['Draft7Validator'] = None
+        self.fast_validator = compile_schema(schema)
+        self.classes: Dict[str, Type[Command]] = dict()
+
+    def get_class(self, name: str) -> Type[Command]:
+        """
+        Returns the class of a command, importing its module if needed
+
+        :raise KeyError: if the command is not in the registry
+        """
+        cls = self.classes.get(name)
+        if cls is None:
+            cls = getattr(import_module(f'commands.{name}'), registry[name])
+            cls.compile()
+            self.classes[name] = cls
+        return cls
 
     def parse(self, json: str) -> Command:
         """
@@ -100,17 +169,34 @@ class CommandParser:
             json = loads(json)
         except Exception:
             raise ParseError(['Invalid JSON'])
+        return self.parse_object(json)
+
+    def parse_object(self, json: dict) -> Command:
+        """
+        Parse a command already decoded with json.loads
+        :param json: decoded JSON representation of the command
+        :return: the corresponding command instance
+        :raises ParseError: in case of parsing an invalid command
+        """
         if not isinstance(json, dict):
             raise ParseError(['Invalid JSON'])
 
-        errors = [e.message for e in self.validator.iter_errors(json)]
-        if len(errors) > 0:
-            raise ParseError(errors)
+        if not self.fast_validator(json):
+            if self.validator is None:
+                self.validator = create_validator(self.schema)
+            errors = [e.message for e in self.validator.iter_errors(json)]
+            if len(errors) > 0:
+                raise ParseError(errors)
 
         cmd_name = json['name']
-        cmd: Command = self.classes.get(cmd_name)()
+        cmd: Command = self.get_class(cmd_name)()
+        cmd.name = cmd_name
+        cmd.set_parser(self)
 
         if 'args' in json.keys():
             cmd.set_arguments(json['args'])
 
+        if 'strip' in json.keys():
+            cmd.strip = json['strip']
+
         return cmd
@@ -1 +1,20 @@
+"""
+Registry of commands: maps the name of each command (the module name) to the name of its class. It must be updated
+when adding a command, so the CommandParser doesn't have to scan this package and import every module on startup.
+"""
 
+registry = {
+    'batch': 'Batch',
+    'disconnect': 'Disconnect',
+    'metrics': 'Metrics',
+    'profile': 'Profile',
+    'reset': 'Reset',
+    'resume': 'Resume',
+    'section_add': 'SectionAdd',
+    'section_edit': 'SectionEdit',
+    'section_effect': 'SectionEffect',
+    'section_remove': 'SectionRemove',
+    'status': 'Status',
+    'turn_off': 'TurnOff',
+    'turn_on': 'TurnOn',
+}
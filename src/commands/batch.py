@@ -0,0 +1,71 @@
+from command import Command
+from error import ParseError, ValidationError, ExecutionError, AlreadyOn, AlreadyOff
+
+
+class Batch(Command):
+    """
+    Executes many commands as a single one: all commands are validated before executing any of them, they are executed
+    in order and if any of them fails, changes made by previous ones are rolled back. The strip is rendered only once,
+    after executing all commands. Commands are executed on the strip of the batch, so they can't address a strip.
+    """
+
+    excluded_commands = ['batch', 'disconnect']
+
+    arguments_schema = {
+        "$schema": "https://json-schema.org/schema#",
+        "type": "object",
+        "properties": {
+            "commands": {
+                "type": "array",
+                "items": {
+                    "type": "object"
+                }
+            }
+        },
+        "required": ["commands"]
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.commands = None
+
+    def validate_arguments(self):
+        self.check_arguments()
+        self.commands = []
+        errors = []
+        for i, c in enumerate(self.args['commands']):
+            if c.get('name') in self.excluded_commands:
+                raise ValidationError(f'command {c["name"]} is not allowed in a batch')
+            if 'strip' in c:
+                raise ValidationError(f'args.commands[{i}] : commands in a batch can\'t address a strip')
+            try:
+                cmd = self.parser.parse_object(c)
+                cmd.validate_arguments()
+                self.commands.append(cmd)
+            except ParseError as e:
+                errors += [f'error in args.commands[{i}] : {error}' for error in e.errors]
+            except ValidationError as e:
+                errors.append(f'error in args.commands[{i}] : {e.get_msg()}')
+        if len(errors) > 0:
+            raise ParseError(errors)
+
+    def exec(self) -> dict:
+        results = []
+        snapshot = self.controller.snapshot()
+        with self.controller.deferred_render():
+            for i, cmd in enumerate(self.commands):
+                try:
+                    cmd.set_controller(self.controller)
+                    result = cmd.exec()
+                    results.append(result if result is not None else {})
+                except (ExecutionError, AlreadyOn, AlreadyOff) as e:
+                    self.controller.rollback(snapshot)
+                    raise ExecutionError(f'commands[{i}] : {e.get_msg()}')
+                except KeyError as e:
+                    self.controller.rollback(snapshot)
+                    raise ExecutionError(f'commands[{i}] : section {e.args[0]} is not defined')
+                except Exception:
+                    self.controller.rollback(snapshot)
+                    raise
+        self.controller.render()
+        return {'results': results}
@@ -0,0 +1,30 @@
+import metrics
+from command import Command
+
+
+class Metrics(Command):
+    """
+    Returns latency histograms and counters collected since startup (or since the last reset), see metrics.py. It
+    doesn't access the state of the controller, so it neither waits for other commands nor for the render.
+    """
+
+    arguments_schema = {
+        "$schema": "https://json-schema.org/schema#",
+        "type": "object",
+        "properties": {
+            "reset": {
+                "type": "boolean"
+            }
+        }
+    }
+
+    exclusive = False
+
+    def __init__(self):
+        super().__init__()
+
+    def validate_arguments(self):
+        self.check_arguments()
+
+    def exec(self) -> dict:
+        return metrics.snapshot(self.args.get('reset', False))
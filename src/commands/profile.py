@@ -0,0 +1,67 @@
+from command import Command
+from error import ExecutionError, ValidationError
+from profiling import DETERMINISTIC, SAMPLING
+
+
+class Profile(Command):
+    """
+    Starts or stops profiling commands and the render (see profiling.py). Profiling stops by itself after the given
+    duration or number of commands, results are written on a rotating file and the top hotspots are returned when
+    stopped (or with the status action once finished).
+    """
+
+    arguments_schema = {
+        "$schema": "https://json-schema.org/schema#",
+        "type": "object",
+        "properties": {
+            "action": {
+                "type": "string",
+                "enum": ["start", "stop", "status"]
+            },
+            "mode": {
+                "type": "string",
+                "enum": [DETERMINISTIC, SAMPLING]
+            },
+            "duration": {
+                "type": "number"
+            },
+            "commands": {
+                "type": "integer"
+            },
+            "top": {
+                "type": "integer"
+            }
+        },
+        "required": ["action"]
+    }
+
+    exclusive = False
+    # stopping waits for other threads to leave the code profiled and writes the results
+    blocking = True
+
+    def __init__(self):
+        super().__init__()
+
+    def validate_arguments(self):
+        self.check_arguments()
+        if self.args.get('duration', 1) <= 0:
+            raise ValidationError('duration must be greater than 0')
+        for key in ['commands', 'top']:
+            if self.args.get(key, 1) < 1:
+                raise ValidationError(f'{key} must be at least 1')
+
+    def exec(self) -> dict:
+        profiler = self.controller.profiler
+        action = self.args['action']
+        if action == 'start':
+            try:
+                return profiler.start(self.args.get('mode', DETERMINISTIC), self.args.get('duration', 10),
+                                      self.args.get('commands'), self.args.get('top', 10))
+            except ValueError as e:
+                raise ExecutionError(str(e))
+        if action == 'stop':
+            result = profiler.stop()
+            if result is None:
+                raise ExecutionError('profiler is not running')
+            return result
+        return profiler.status()
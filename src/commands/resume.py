@@ -0,0 +1,30 @@
+from command import Command
+
+
+class Resume(Command):
+    """
+    Handshake for clients reconnecting: the state (sections and on/off) is kept between connections, so if the instance
+    and the version sent by the client match the current ones, the client doesn't need to define sections again
+    """
+
+    arguments_schema = {
+        "$schema": "https://json-schema.org/schema#",
+        "type": "object",
+        "properties": {
+            "instance": {
+                "type": "string"
+            },
+            "version": {
+                "type": "integer"
+            }
+        }
+    }
+
+    def __init__(self):
+        super().__init__()
+
+    def validate_arguments(self):
+        self.check_arguments()
+
+    def exec(self) -> dict:
+        return self.controller.resume(self.args.get('instance'), self.args.get('version'))
@@ -1,7 +1,6 @@
 from command import Command
-from jsonschema import Draft7Validator
-from webcolors import hex_to_rgb
-from error import Overlapping, ParseError, ValidationError, ExecutionError
+from color import parse_color
+from error import Overlapping, ValidationError, ExecutionError
 
 
 # noinspection PyShadowingBuiltins
@@ -37,68 +36,57 @@ def test_overlapping(list):
 
 class SectionAdd(Command):
 
+    arguments_schema = {
+        "$schema": "https://json-schema.org/schema#",
+        "$defs": {
+            "section": {
+                "type": "object",
+                "properties": {
+                    "start": {
+                        "type": "integer"
+                    },
+                    "end": {
+                        "type": "integer"
+                    },
+                    "color": {
+                        "type": "string",
+                        "pattern": "^#([a-fA-F0-9]{6}|[a-fA-F0-9]{3})$"
+                    }
+                },
+                "required": ["start", "end", "color"]
+            }
+        },
+        "type": "object",
+        "properties": {
+            "sections": {
+                "type": "array",
+                "items": {"$ref": "#/$defs/section"}
+            }
+        },
+        "required": ["sections"]
+    }
+
     def __init__(self):
         super().__init__()
-        arguments_schema = {
-            "$schema": "https://json-schema.org/schema#",
-            "$defs": {
-                "section": {
-                    "type": "object",
-                    "properties": {
-                        "start": {
-                            "type": "integer"
-                        },
-                        "end": {
-                            "type": "integer"
-                        },
-                        "color": {
-                            "type": "string",
-                            "pattern": "^#([a-fA-F0-9]{6}|[a-fA-F0-9]{3})$"
-                        }
-                    },
-                    "required": ["start", "end", "color"]
-                }
-            },
-            "type": "object",
-            "properties": {
-                "sections": {
-                    "type": "array",
-                    "items": {"$ref": "#/$defs/section"}
-                }
-            },
-            "required": ["sections"]
-        }
-        self.validator = Draft7Validator(arguments_schema)
 
     def validate_arguments(self):
-        errors = [e for e in self.validator.iter_errors(self.args)]
-        if len(errors) > 0:
-            raise ParseError(errors)
+        self.check_arguments()
         try:
             test_overlapping([(s['start'], s['end']) for s in self.args['sections']])
         except Overlapping:
             raise ValidationError('section overlapping')
 
     def exec(self) -> dict:
-        ids = []
-        error = None
-
+        sections = []
         for s in self.args['sections']:
-            try:
-                color = hex_to_rgb(s['color'])
-                color = (int(color[0]), int(color[1]), int(color[2]))
-                ids.append(self.controller.new_section(s['start'], s['end'], color))
-            except Overlapping:
-                error = ExecutionError('section overlapping')
-                break
-            except ValueError:
-                error = ExecutionError('start > end for some section')
-                break
+            sections.append((s['start'], s['end'], parse_color(s['color'])))
 
-        # rollback in case of error
-        if error is not None:
-            self.controller.remove_sections(ids)
-            raise error
+        try:
+            ids = self.controller.new_sections(sections)
+        except Overlapping:
+            raise ExecutionError('section overlapping')
+        except ValueError:
+            raise ExecutionError('start > end for some section')
 
         self.controller.render()
         return {'sections': ids}
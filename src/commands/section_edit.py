@@ -1,43 +1,40 @@
-from utils import parse_color
+from color import parse_color
 from command import Command
 from error import ParseError, ExecutionError
-from jsonschema import Draft7Validator
 
 
 class SectionEdit(Command):
 
+    arguments_schema = {
+        "$schema": "https://json-schema.org/schema#",
+        "type": "object",
+        "properties": {
+            "section_id": {
+                "type": "string"
+            },
+            "start": {
+                "type": "integer"
+            },
+            "end": {
+                "type": "integer"
+            },
+            "color": {
+                "type": "string",
+                "pattern": "^#([a-fA-F0-9]{6}|[a-fA-F0-9]{3})$"
+            }
+        },
+        "required": ["section_id"]
+    }
+
     def __init__(self):
         super().__init__()
-        arguments_schema = {
-            "$schema": "https://json-schema.org/schema#",
-            "type": "object",
-            "properties": {
-                "section_id": {
-                    "type": "string"
-                },
-                "start": {
-                    "type": "integer"
-                },
-                "end": {
-                    "type": "integer"
-                },
-                "color": {
-                    "type": "string",
-                    "pattern": "^#([a-fA-F0-9]{6}|[a-fA-F0-9]{3})$"
-                }
-            },
-            "required": ["section_id"]
-        }
         self.section_id = None
         self.color = None
         self.start = None
         self.end = None
-        self.validator = Draft7Validator(arguments_schema)
 
     def validate_arguments(self):
-        errors = [e for e in self.validator.iter_errors(self.args)]
-        if len(errors) > 0:
-            raise ParseError(errors)
+        self.check_arguments()
         if 'color' in self.args.keys():
             try:
                 self.color = parse_color(self.args['color'])
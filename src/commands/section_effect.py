@@ -0,0 +1,67 @@
+from color import parse_color
+from command import Command
+from error import ParseError, ExecutionError
+from effects import effects
+from framebuffer import pack
+
+
+class SectionEffect(Command):
+    """
+    Binds an effect to a section (or removes it with "none"), see effects module
+    """
+
+    arguments_schema = {
+        "$schema": "https://json-schema.org/schema#",
+        "type": "object",
+        "properties": {
+            "section_id": {
+                "type": "string"
+            },
+            "effect": {
+                "type": "string",
+                "enum": list(effects.keys()) + ["none"]
+            },
+            "speed": {
+                "type": "number"
+            },
+            "palette": {
+                "type": "array",
+                "items": {
+                    "type": "string",
+                    "pattern": "^#([a-fA-F0-9]{6}|[a-fA-F0-9]{3})$"
+                }
+            },
+            "direction": {
+                "type": "string",
+                "enum": ["forward", "backward"]
+            }
+        },
+        "required": ["section_id", "effect"]
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.palette = None
+
+    def validate_arguments(self):
+        self.check_arguments()
+        effect = effects.get(self.args['effect'])
+        if effect is None:
+            return
+        palette = self.args.get('palette', effect.default_palette)
+        if len(palette) == 0:
+            raise ParseError(['error in args.palette : palette must have at least one color'])
+        self.palette = [pack(parse_color(c)) for c in palette]
+
+    def exec(self):
+        try:
+            section = self.controller.get_section(self.args['section_id'])
+            effect = effects.get(self.args['effect'])
+            if effect is not None:
+                start, end = section.limits
+                direction = -1 if self.args.get('direction') == 'backward' else 1
+                effect = effect(end - start + 1, self.args.get('speed', 1.0), self.palette, direction)
+            self.controller.set_effect(self.args['section_id'], effect)
+            self.controller.render()
+        except KeyError:
+            raise ExecutionError(f'section {self.args["section_id"]} is not defined')
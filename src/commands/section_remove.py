@@ -1,33 +1,29 @@
-from utils import parse_color
 from command import Command
-from error import ParseError, ExecutionError
-from jsonschema import Draft7Validator
+from error import ExecutionError
 
 
 class SectionRemove(Command):
 
+    arguments_schema = {
+        "$schema": "https://json-schema.org/schema#",
+        "type": "object",
+        "properties": {
+            "sections": {
+                "type": "array",
+                "items": {
+                    "type": "string"
+                }
+            }
+        },
+        "required": ["sections"]
+    }
+
     def __init__(self):
         super().__init__()
-        arguments_schema = {
-            "$schema": "https://json-schema.org/schema#",
-            "type": "object",
-            "properties": {
-                "sections": {
-                    "type": "array",
-                    "items": {
-                        "type": "string"
-                    }
-                }
-            },
-            "required": ["sections"]
-        }
         self.sections = None
-        self.validator = Draft7Validator(arguments_schema)
 
     def validate_arguments(self):
-        errors = [e for e in self.validator.iter_errors(self.args)]
-        if len(errors) > 0:
-            raise ParseError(errors)
+        self.check_arguments()
         self.sections = self.args['sections']
 
     def exec(self):
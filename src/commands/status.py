@@ -1,15 +1,39 @@
 from command import Command
+from error import ValidationError
 
 
 class Status(Command):
+    """
+    Returns the state of all sections (paginated with offset and limit), or only the changes since a previous version
+    with since_version (see Controller.status)
+    """
+
+    arguments_schema = {
+        "$schema": "https://json-schema.org/schema#",
+        "type": "object",
+        "properties": {
+            "since_version": {
+                "type": "integer"
+            },
+            "offset": {
+                "type": "integer"
+            },
+            "limit": {
+                "type": "integer"
+            }
+        }
+    }
 
     def __init__(self):
         super().__init__()
 
     def validate_arguments(self):
-        pass
+        self.check_arguments()
+        if self.args.get('offset', 0) < 0:
+            raise ValidationError('offset must not be negative')
+        if self.args.get('limit', 1) < 1:
+            raise ValidationError('limit must be at least 1')
 
     def exec(self) -> dict:
-        return self.controller.status()
-
-
+        return self.controller.status(self.args.get('since_version'), self.args.get('offset', 0),
+                                      self.args.get('limit'))
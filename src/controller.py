@@ -1,112 +1,273 @@
 import logging
-from typing import List, Tuple
-from webcolors import rgb_to_hex
-from rpi_ws281x import PixelStrip, Color
+import metrics
+from array import array
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from heapq import merge
+from threading import Lock, RLock
+from typing import List, Tuple, Dict, Optional
+from color import to_hex
+from driver import create_strip
 from configparser import ConfigParser
 from error import Overlapping, AlreadyOn, AlreadyOff
 from uuid import uuid1
 from utils import bool
+from render_loop import RenderLoop
+from framebuffer import FrameBuffer, pack, unpack, from_rgb_bytes
+from state_file import StateFile
+from effects import Effect
+from output_stage import OutputStage
+from profiling import Profiler
+from time import perf_counter
 
 
 class Section:
+    """
+    View of a section stored in a SectionManager. Attributes are read from the SectionManager on access (nothing is
+    copied), so a view must not be used after its section is removed.
+    """
 
-    # noinspection PyShadowingBuiltins
-    def __init__(self, id: str, is_on: bool, limits: tuple, color_list: List[tuple]):
-        self.id = id
-        self.limits = limits
-        self.color_list = color_list
-        self.is_on = is_on
+    __slots__ = ('manager', 'slot')
+
+    def __init__(self, manager: 'SectionManager', slot: int):
+        self.manager = manager
+        self.slot = slot
+
+    @property
+    def id(self) -> str:
+        return self.manager.ids[self.slot]
+
+    @property
+    def limits(self) -> Tuple[int, int]:
+        return self.manager.starts[self.slot], self.manager.ends[self.slot]
+
+    @property
+    def is_on(self) -> bool:
+        return (self.manager.on_mask >> self.slot) & 1 == 1
+
+    @property
+    def color(self) -> Tuple[int, int, int]:
+        """
+        Color of the first led of the section
+        """
+        return unpack(self.manager.colors[self.manager.starts[self.slot]])
+
+    @property
+    def color_list(self) -> List[Tuple[int, int, int]]:
+        return [unpack(c) for c in self.manager.colors[self.manager.starts[self.slot]:self.manager.ends[self.slot] + 1]]
+
+
+class Snapshot:
+    """
+    State of a SectionManager at a given version (see SectionManager.snapshot)
+    """
+
+    __slots__ = ('version', 'columns')
+
+    def __init__(self, version: int, columns: tuple):
+        self.version = version
+        self.columns = columns
 
 
 class SectionManager:
+    """
+    Stores sections in columns indexed by slot (a slot is assigned to each section when it's inserted and it's reused
+    after the section is removed):
+
+        - ids: id of the section on each slot (None for free slots)
+        - starts, ends: limits of the section on each slot
+        - on_mask: bit i is set if the section on slot i is turned on
+
+    Colors are stored per led (packed as 24 bits integers, see framebuffer.pack) in a single array with the length of
+    the strip, leds not belonging to any section are set to 0.
+
+    Slots are also kept sorted by the start of their sections (order and order_starts), so finding the position of a
+    section and testing overlapping are binary searches.
+
+    The state is versioned: each change increments the version and it's recorded (with the section and the range of
+    leds affected) in a bounded list of changes, so the differences since a previous version can be computed (see diff
+    and changed_ranges). Snapshots share columns with the current state until it's modified again (copy-on-write), so
+    taking a snapshot and restoring it are O(1).
+    """
+
+    # maximum number of recorded changes (see diff)
+    max_changes = 4096
+
+    def _write(self):
+        """
+        Must be called before changing the state: increments the version and copies columns shared with a snapshot
+        """
+        if self.shared:
+            self.ids = list(self.ids)
+            self.starts = array('l', self.starts)
+            self.ends = array('l', self.ends)
+            self.colors = array('I', self.colors)
+            self.slots = dict(self.slots)
+            self.free_slots = list(self.free_slots)
+            self.views = list(self.views)
+            self.order = array('l', self.order)
+            self.order_starts = array('l', self.order_starts)
+            self.shared = False
+        self.version += 1
+
+    def touch(self):
+        """
+        Increments the version for changes on state not stored here (for instance turning on or off the whole strip)
+        """
+        self.version += 1
 
     # noinspection PyShadowingBuiltins
-    def _insert_section(self, id: str, start: int, end: int, color_list):
+    def _record(self, kind: str, id: str, start: int, end: int):
         """
+        Records a change on the current version
+
+        :param kind: 'added', 'removed' or 'changed'
+        """
+        if len(self.changes) >= self.max_changes:
+            self.forgotten_version = self.changes.popleft()[0]
+        self.changes.append((self.version, kind, id, start, end))
+
+    def _find_position(self, start: int, end: int) -> int:
+        """
+        Binary search of the position (in order) for a new section
+
+        :return: the position where the new section must be inserted
+        :raise Overlapping: if the new section overlaps another section
+        """
+        index = bisect_left(self.order_starts, start)
+        if index > 0 and self.ends[self.order[index - 1]] >= start:
+            raise Overlapping()
+        if index < len(self.order) and self.order_starts[index] <= end:
+            raise Overlapping()
+        return index
+
+    # noinspection PyShadowingBuiltins
+    def _check_position(self, slot: int, start: int, end: int):
+        """
+        Binary search of the new position of an existing section, like _find_position but ignoring the section itself
+
+        :raise Overlapping: if the section would overlap another section
+        """
+        own = bisect_left(self.order_starts, self.starts[slot])
+        index = bisect_left(self.order_starts, start)
+        before = index - 1 if index - 1 != own else index - 2
+        after = index if index != own else index + 1
+        if before >= 0 and self.ends[self.order[before]] >= start:
+            raise Overlapping()
+        if after < len(self.order) and self.order_starts[after] <= end:
+            raise Overlapping()
+
+    def _check_limits(self, start: int, end: int):
+        """
+        :raise ValueError: if limits are outside the strip
+        """
+        if start < 0 or end >= self.strip_length:
+            raise ValueError('section not defined correctly')
+
+    # noinspection PyShadowingBuiltins
+    def _allocate_slot(self, id: str, start: int, end: int) -> int:
+        """
+        Stores a section on a free slot (or a new one), it's not added to order
+
+        :return: the slot of the section
+        """
+        if len(self.free_slots) > 0:
+            slot = self.free_slots.pop()
+            self.ids[slot] = id
+            self.starts[slot] = start
+            self.ends[slot] = end
+        else:
+            slot = len(self.ids)
+            self.ids.append(id)
+            self.starts.append(start)
+            self.ends.append(end)
+            self.views.append(Section(self, slot))
+        self.on_mask |= 1 << slot
+        self.slots[id] = slot
+        self._record('added', id, start, end)
+        return slot
+
+    # noinspection PyShadowingBuiltins
+    def _insert_section(self, id: str, start: int, end: int) -> int:
+        """
+        :return: the slot of the new section
         :raise ValueError: if start > end
         :raise Overlapping: if the new section overlaps another section
         """
-        index = None
-        if end < start or start < 0 or end >= self.strip_length:
+        if end < start:
             raise ValueError('section not defined correctly')
-        for i, v in enumerate(self.limits):
-            if v[0] < start < v[1] or v[0] < end < v[1]:
-                raise Overlapping()
-            if i < len(self.limits) - 1:
-                if self.limits[i][0] < start and end < self.limits[i + 1][0]:
-                    index = i + 1
-                    break
-            elif index is None:
-                if start > self.limits[i][1]:
-                    index = i + 1
-                else:
-                    index = i
-        index = 0 if index is None else index
-
-        self.is_on.insert(index, True)
-        self.ids.insert(index, id)
-        self.color_list.insert(index, color_list)
-        self.limits.insert(index, (start, end))
-        self.color_list_by_id[id] = color_list
-        self.limits_by_id[id] = (start, end)
-        self.is_on_by_id[id] = True
+        index = self._find_position(start, end)
+        self._check_limits(start, end)
+        slot = self._allocate_slot(id, start, end)
+        self.order_starts.insert(index, start)
+        self.order.insert(index, slot)
+        return slot
 
+    # noinspection PyShadowingBuiltins
     def _remove_section(self, id: str):
         """
         :raise KeyError: if section don't exist
         """
-        t = self.limits_by_id[id]
-        i = self.limits.index(t)
-        del self.ids[i]
-        del self.color_list[i]
-        del self.limits[i]
-        del self.is_on[i]
-        del self.color_list_by_id[id]
-        del self.limits_by_id[id]
-        del self.is_on_by_id[id]
+        slot = self.slots.pop(id)
+        start, end = self.starts[slot], self.ends[slot]
+        self.colors[start:end + 1] = array('I', [0]) * (end - start + 1)
+        index = bisect_left(self.order_starts, start)
+        del self.order_starts[index]
+        del self.order[index]
+        self.ids[slot] = None
+        self.on_mask &= ~(1 << slot)
+        self.free_slots.append(slot)
+        self._record('removed', id, start, end)
 
     def __init__(self, config: ConfigParser):
         self.strip_length = int(config['PIXEL_STRIP'].get('n'))
         self.config = config
-        self.ids = []
-        self.color_list = []
-        self.limits = []
-        self.is_on = []
-        self.color_list_by_id = {}
-        self.limits_by_id = {}
-        self.is_on_by_id = {}
+        self.ids: List[Optional[str]] = []
+        self.starts = array('l')
+        self.ends = array('l')
+        self.on_mask = 0
+        self.colors = array('I', bytes(4 * self.strip_length))
+        self.slots: Dict[str, int] = {}
+        self.free_slots: List[int] = []
+        self.views: List[Section] = []
+        # slots sorted by the start of their sections and the respective starts (for binary search)
+        self.order = array('l')
+        self.order_starts = array('l')
+        # True if columns are shared with a snapshot
+        self.shared = False
+        self.version = 0
+        # (version, kind, section id, start, end) for each change, see _record
+        self.changes = deque()
+        # changes up to this version are no longer recorded
+        self.forgotten_version = 0
 
     # noinspection PyShadowingBuiltins
     def edit_section(self, id: str, new_start: int = None, new_end: int = None, color: Tuple[int, int, int] = None):
         """
-        Edits a section
+        Edits a section (in case of error the section is not modified). The new limits are checked before modifying
+        anything, so the state is only copied if it's shared with a snapshot (see _write).
 
         :raise KeyError: if section not exist
         :raise ValueError: if start > end
         :raise Overlapping: if the new section overlaps another section
         """
-        try:
-            index = self.ids.index(id)
-        except ValueError:
-            raise KeyError()
-
-        new_start = new_start if new_start is not None else self.limits_by_id[id][0]
-        new_end = new_end if new_end is not None else self.limits_by_id[id][1]
-        if color is not None:
-            new_color_list = [color] * (new_end - new_start + 1)
-        else:
-            color_list = self.color_list_by_id[id]
-            new_color_list = [color_list[0]] * (new_end - new_start + 1)
-
-        del self.ids[index]
-        del self.color_list[index]
-        del self.limits[index]
-        del self.is_on[index]
-        del self.color_list_by_id[id]
-        del self.limits_by_id[id]
-        del self.is_on_by_id[id]
+        slot = self.slots[id]
+        start, end = self.starts[slot], self.ends[slot]
+        is_on = (self.on_mask >> slot) & 1
+        new_start = new_start if new_start is not None else start
+        new_end = new_end if new_end is not None else end
+        packed_color = pack(color) if color is not None else self.colors[start]
+        if new_end < new_start:
+            raise ValueError('section not defined correctly')
+        self._check_position(slot, new_start, new_end)
+        self._check_limits(new_start, new_end)
 
-        self._insert_section(id, new_start, new_end, new_color_list)
+        self._write()
+        self._remove_section(id)
+        slot = self._insert_section(id, new_start, new_end)
+        self.colors[new_start:new_end + 1] = array('I', [packed_color]) * (new_end - new_start + 1)
+        self.on_mask = self.on_mask & ~(1 << slot) | (is_on << slot)
 
     def new_section(self, start: int, end: int, color: Tuple[int, int, int]) -> str:
         """
@@ -115,10 +276,46 @@ class SectionManager:
         :raise ValueError: if start > end
         :raise Overlapping: if the new section overlaps another section
         """
-        section_id = str(uuid1())
-        color_list = [color] * (end - start + 1)
-        self._insert_section(section_id, start, end, color_list)
-        return section_id
+        return self.new_sections([(start, end, color)])[0]
+
+    def new_sections(self, sections: List[Tuple[int, int, Tuple[int, int, int]]]) -> List[str]:
+        """
+        Defines many sections at once, all of them or none (in case of error). New sections are sorted and checked in
+        one pass and then merged with existing sections.
+
+        :param sections: (start, end, color) of each section
+        :return: ids of the new sections (in the same order as sections)
+        :raise ValueError: if start > end for some section
+        :raise Overlapping: if some section overlaps another section
+        """
+        indexes = sorted(range(len(sections)), key=lambda i: sections[i][0])
+        last_end = None
+        for i in indexes:
+            start, end, _ = sections[i]
+            if end < start:
+                raise ValueError('section not defined correctly')
+            if last_end is not None and start <= last_end:
+                raise Overlapping()
+            self._find_position(start, end)
+            self._check_limits(start, end)
+            last_end = end
+
+        self._write()
+        ids = [str(uuid1()) for _ in sections]
+        if len(sections) == 1:
+            start, end, color = sections[0]
+            self._insert_section(ids[0], start, end)
+            self.colors[start:end + 1] = array('I', [pack(color)]) * (end - start + 1)
+            return ids
+        new_order = []
+        for i in indexes:
+            start, end, color = sections[i]
+            new_order.append((start, self._allocate_slot(ids[i], start, end)))
+            self.colors[start:end + 1] = array('I', [pack(color)]) * (end - start + 1)
+        order = list(merge(zip(self.order_starts, self.order), new_order))
+        self.order_starts = array('l', [start for start, _ in order])
+        self.order = array('l', [slot for _, slot in order])
+        return ids
 
     # noinspection PyShadowingBuiltins
     def set_section_on(self, id: str):
@@ -126,11 +323,10 @@ class SectionManager:
         :raise AlreadyOn: if section is already on
         :raise KeyError: if section do not exist
         """
-        if id not in self.ids:
-            raise KeyError()
-        index = self.ids.index(id)
-        self.is_on_by_id[id] = True
-        self.is_on.insert(index, True)
+        slot = self.slots[id]
+        self._write()
+        self.on_mask |= 1 << slot
+        self._record('changed', id, self.starts[slot], self.ends[slot])
 
     # noinspection PyShadowingBuiltins
     def set_section_off(self, id: str):
@@ -138,11 +334,10 @@ class SectionManager:
         :raise AlreadyOff: if section is already off
         :raise KeyError: if section do not exist
         """
-        if id not in self.ids:
-            raise KeyError()
-        index = self.ids.index(id)
-        self.is_on_by_id[id] = False
-        self.is_on.insert(index, False)
+        slot = self.slots[id]
+        self._write()
+        self.on_mask &= ~(1 << slot)
+        self._record('changed', id, self.starts[slot], self.ends[slot])
 
     def set_color(self, section_id: str, color_list: List[tuple]):
         """
@@ -153,13 +348,15 @@ class SectionManager:
         :raises KeyError: if section is not defined
         :raises ValueError: if color_list is longer than the size of the section
         """
-        limits = self.limits_by_id.get(section_id)
-        if limits is None:
+        slot = self.slots.get(section_id)
+        if slot is None:
             raise KeyError(f'section {section_id} is not defined')
-        if len(color_list) != (limits[1] - limits[0] + 1):
+        start, end = self.starts[slot], self.ends[slot]
+        if len(color_list) != (end - start + 1):
             raise ValueError(f'color array length does not match section {section_id} length')
-        self.color_list[self.ids.index(section_id)] = color_list
-        self.color_list_by_id[section_id] = color_list
+        self._write()
+        self.colors[start:end + 1] = array('I', map(pack, color_list))
+        self._record('changed', section_id, start, end)
 
     # noinspection PyShadowingBuiltins
     def get_section(self, id: str) -> Section:
@@ -169,28 +366,126 @@ class SectionManager:
         :param id: identifier of the section to look for
         :raises KeyError: if the section is not defined
         """
-        return Section(id, self.is_on_by_id[id], self.limits_by_id[id], self.color_list_by_id[id])
+        return self.views[self.slots[id]]
 
     def list_sections(self) -> List[Section]:
         """
         Returns all sections ordered by their respective (start, end) limits
         """
-        return [
-            Section(self.ids[i], self.is_on[i], self.limits[i], self.color_list[i])
-            for i in range(len(self.limits))
-        ]
+        return [self.views[slot] for slot in self.order]
+
+    def concatenate(self, start: int = 0, end: int = None) -> array:
+        """
+        Returns the colors of leds from start to end (both inclusive, by default all leds) packed, leds not belonging
+        to any section or belonging to sections turned off are set to 0
+        """
+        end = self.strip_length - 1 if end is None else end
+        result = self.colors[start:end + 1]
+        off_mask = ~self.on_mask
+        index = max(0, bisect_left(self.order_starts, start) - 1)
+        while index < len(self.order) and self.order_starts[index] <= end:
+            slot = self.order[index]
+            if (off_mask >> slot) & 1:
+                s, e = max(start, self.starts[slot]), min(end, self.ends[slot])
+                if s <= e:
+                    result[s - start:e - start + 1] = array('I', [0]) * (e - s + 1)
+            index += 1
+        return result
+
+    def snapshot(self) -> Snapshot:
+        """
+        Returns the current state (it's not copied until the next change), see restore
+        """
+        self.shared = True
+        return Snapshot(self.version, (self.ids, self.starts, self.ends, self.on_mask, self.colors, self.slots,
+                                       self.free_slots, self.views, self.order, self.order_starts))
+
+    def restore(self, snapshot: Snapshot):
+        """
+        Restores the state (and the version) from a snapshot of a previous version (see snapshot). Changes recorded
+        after that version are discarded.
+        """
+        (self.ids, self.starts, self.ends, self.on_mask, self.colors, self.slots, self.free_slots, self.views,
+         self.order, self.order_starts) = snapshot.columns
+        self.shared = True
+        self.version = snapshot.version
+        while len(self.changes) > 0 and self.changes[-1][0] > snapshot.version:
+            self.changes.pop()
+
+    def diff(self, since_version: int) -> Optional[Tuple[List[str], List[str], List[str]]]:
+        """
+        Computes the differences between a previous version and the current one
+
+        :return: ids of sections added, removed and changed since that version, or None if changes since that version
+                 are no longer recorded
+        """
+        if since_version < self.forgotten_version:
+            return None
+        first_kind = {}
+        for version, kind, section_id, _, _ in reversed(self.changes):
+            if version <= since_version:
+                break
+            first_kind[section_id] = kind
+        added, removed, changed = [], [], []
+        for section_id, kind in first_kind.items():
+            if section_id in self.slots:
+                (added if kind == 'added' else changed).append(section_id)
+            elif kind != 'added':
+                removed.append(section_id)
+        return added, removed, changed
+
+    def changed_ranges(self, since_version: int) -> Optional[List[Tuple[int, int]]]:
+        """
+        Returns the ranges of leds (both limits inclusive) affected by changes since a previous version, or None if
+        changes since that version are no longer recorded
+        """
+        if since_version < self.forgotten_version:
+            return None
+        ranges = []
+        for version, _, _, start, end in reversed(self.changes):
+            if version <= since_version:
+                break
+            ranges.append((start, end))
+        return ranges
+
+    def load(self, sections: List[Tuple[str, int, int, bool]], colors: array, version: int):
+        """
+        Replaces the state with sections stored elsewhere (see StateFile), keeping their ids. Changes recorded before
+        are discarded.
+
+        :param sections: (id, start, end, is_on) of each section
+        :param colors: colors of all leds (packed)
+        :raise ValueError: if some section is outside the strip or start > end
+        :raise Overlapping: if some section overlaps another section
+        """
+        self.remove_all_sections()
+        for section_id, start, end, is_on in sorted(sections, key=lambda section: section[1]):
+            slot = self._insert_section(section_id, start, end)
+            if not is_on:
+                self.on_mask &= ~(1 << slot)
+        self.colors = array('I', colors)
+        self.version = version
+        self.changes.clear()
+        self.forgotten_version = version
 
     def remove_all_sections(self):
         """
         Removes all sections and resets the current section (see set_current_section) to None
         """
+        self._write()
+        for slot in self.order:
+            self._record('removed', self.ids[slot], self.starts[slot], self.ends[slot])
         self.ids = []
-        self.color_list = []
-        self.limits = []
-        self.is_on = []
-        self.color_list_by_id = {}
-        self.limits_by_id = {}
-        self.is_on_by_id = {}
+        self.starts = array('l')
+        self.ends = array('l')
+        self.on_mask = 0
+        self.colors = array('I', bytes(4 * self.strip_length))
+        self.slots = {}
+        self.free_slots = []
+        self.views = []
+        self.order = array('l')
+        self.order_starts = array('l')
+        self.shared = False
 
     def remove_sections(self, sections: List[str]):
         """
@@ -201,11 +496,12 @@ class SectionManager:
         # test if all sections are defined
         invalid_section_id = None
         for section_id in sections:
-            if section_id not in self.limits_by_id:
+            if section_id not in self.slots:
                 invalid_section_id = section_id
                 break
         # remove sections (if all sections are defined)
         if invalid_section_id is None:
+            self._write()
             for section_id in sections:
                 self._remove_section(section_id)
         else:
@@ -216,9 +512,12 @@ class Controller:
     """
     Provides an interface to control the strip executing commands on specific sections
     (portions of the strip defined by the starting and ending position).
+
+    :param strip: strip to drive (for instance a channel shared with other strips, see driver.create_ws281x_strips),
+                  created from the [PIXEL_STRIP] section if it's not given
     """
 
-    def __init__(self, config: ConfigParser):
+    def __init__(self, config: ConfigParser, strip=None):
 
         n = int(config['PIXEL_STRIP'].get('n'))
         pin = int(config['PIXEL_STRIP'].get('pin'))
@@ -244,12 +543,55 @@ class Controller:
             raise Exception('Cannot initialize controller, channel was not set in config.ini')
 
         self.strip_length = n
-        self.strip = PixelStrip(n, pin, freq_hz, dma, invert, brightness, channel)
+        # id of the strip (see strips.py)
+        self.strip_id = int(config['PIXEL_STRIP'].get('id', '0'))
+        # identifies the state of this controller along with the version (see resume)
+        self.instance = str(uuid1())
+        self.strip = strip if strip is not None else create_strip(config, n, pin, freq_hz, dma, invert, brightness,
+                                                                  channel)
         self.logger = logging.getLogger('Controller')
         self.section_manager = SectionManager(config)
         self.is_on = True
+        # commands and frames (for instance from UdpReceiver) may come from different threads
+        self.lock = RLock()
+        # held while writing the strip buffer and showing it (see show), always acquired while holding lock. Strips
+        # sharing the hardware (see driver.Ws281xDevice) provide a lock shared by all of them
+        self.show_lock = getattr(self.strip, 'lock', None) or Lock()
+        # colors of the leds (the last frame or the sections) kept between renders, see show
+        self.framebuffer = FrameBuffer(n)
+        # color correction applied right before writing on the strip
+        self.output_stage = OutputStage.from_config(config)
+        # (version, status of each section) built on the last call to status
+        self.status_cache: Optional[Tuple[int, List[dict]]] = None
+        # profiles commands and the render on demand (see profile command)
+        self.profiler = Profiler.from_config(config)
+        self.frame_written = False
+        # a raw frame was written and it was not shown yet (see write_frame)
+        self.frame_pending = False
+        self.render_loop = None
+        # while greater than 0, render calls are deferred (see deferred_render)
+        self.render_deferred = 0
+        self.state_file = None
+        # slot of each section on the state file
+        self.persisted_slots: Dict[str, int] = {}
+        # version of the state written on the state file (see persist)
+        self.persisted_version = 0
+        # effect bound to each section (see set_effect)
+        self.effects: Dict[str, Effect] = {}
         self.strip.begin()
 
+        if config.has_section('STATE') and bool(config['STATE'].get('enabled', 'False')):
+            self.state_file = StateFile(config['STATE'].get('filename', '../sc-rpi.state'), n)
+            self.restore_state()
+
+        self.max_fps = float(config['RENDER'].get('max_fps', str(60))) if config.has_section('RENDER') else 60.0
+        if config.has_section('RENDER') and config['RENDER'].get('mode', 'sync') == 'loop':
+            self.start_render_loop()
+
+    def start_render_loop(self):
+        self.render_loop = RenderLoop(self, self.max_fps)
+        self.render_loop.start()
+
     def new_section(self, start: int, end: int, color: Tuple[int, int, int]) -> str:
         """
         Defines a new section on the strip
@@ -261,7 +603,23 @@ class Controller:
         :raise Overlapping: if the new section overlaps another section
         :return: id of the new section
         """
-        return self.section_manager.new_section(start, end, color)
+        section_id = self.section_manager.new_section(start, end, color)
+        self.framebuffer.fill(start, end, pack(color))
+        return section_id
+
+    def new_sections(self, sections: List[Tuple[int, int, Tuple[int, int, int]]]) -> List[str]:
+        """
+        Defines many sections at once, all of them or none (in case of error)
+
+        :param sections: (start, end, color) of each section
+        :raise ValueError: if start > end for some section
+        :raise Overlapping: if some section overlaps another section
+        :return: ids of the new sections
+        """
+        ids = self.section_manager.new_sections(sections)
+        for start, end, color in sections:
+            self.framebuffer.fill(start, end, pack(color))
+        return ids
 
     # noinspection PyShadowingBuiltins
     def edit_section(self, id: str, start: int = None, end: int = None, color: Tuple[int, int, int] = None):
@@ -275,7 +633,70 @@ class Controller:
         :raises KeyError: if section with section_id is not defined
         :raises ValueError: if limits are defined correctly (also in case of section overlapping)
         """
-        return self.section_manager.edit_section(id, start, end, color)
+        limits = self.section_manager.get_section(id).limits
+        self.section_manager.edit_section(id, start, end, color)
+        self.framebuffer.fill(limits[0], limits[1], 0)
+        self.paint_section(id)
+
+    def set_color(self, color: Tuple[int, int, int], section_id: str):
+        """
+        Sets the same color for each led of the specified section
+
+        :raises KeyError: if section with section_id is not defined
+        """
+        limits = self.section_manager.get_section(section_id).limits
+        self.section_manager.set_color(section_id, [color] * (limits[1] - limits[0] + 1))
+        self.paint_section(section_id)
+
+    def paint_section(self, section_id: str):
+        """
+        Writes the colors of a section on the framebuffer (black if the section is turned off)
+
+        :raises KeyError: if section with section_id is not defined
+        """
+        section = self.section_manager.get_section(section_id)
+        start, end = section.limits
+        if section.is_on:
+            self.framebuffer.write(start, self.section_manager.colors[start:end + 1])
+        else:
+            self.framebuffer.fill(start, end, 0)
+
+    def set_effect(self, section_id: str, effect: Optional[Effect]):
+        """
+        Binds an effect to a section (it replaces the colors of the section while the section is turned on), effects
+        are computed on each tick of the render loop (it's started if it's not enabled)
+
+        :param effect: None to remove the effect of the section
+        :raises KeyError: if section with section_id is not defined
+        """
+        self.section_manager.get_section(section_id)
+        if effect is None:
+            if self.effects.pop(section_id, None) is not None:
+                self.paint_section(section_id)
+            return
+        self.effects[section_id] = effect
+        if self.render_loop is None:
+            self.start_render_loop()
+
+    def animate(self, t: float):
+        """
+        Writes on the framebuffer the next frame of each effect (see set_effect), effects of sections removed are
+        discarded
+
+        :param t: time in seconds
+        """
+        section_manager = self.section_manager
+        for section_id, effect in list(self.effects.items()):
+            slot = section_manager.slots.get(section_id)
+            if slot is None:
+                del self.effects[section_id]
+                continue
+            if not (section_manager.on_mask >> slot) & 1:
+                continue
+            start, end = section_manager.starts[slot], section_manager.ends[slot]
+            if effect.length != end - start + 1:
+                effect.resize(end - start + 1)
+            self.framebuffer.write(start, effect.render(t))
 
     def get_section(self, section_id: str) -> Section:
         """
@@ -292,13 +713,17 @@ class Controller:
         :param sections: list of section ids to be removed
         :raise KeyError: if some section don't exist
         """
+        limits = [self.section_manager.get_section(section_id).limits for section_id in sections]
         self.section_manager.remove_sections(sections)
+        for start, end in limits:
+            self.framebuffer.fill(start, end, 0)
 
     def remove_all_sections(self):
         """
         Removes all sections and resets the current section (see set_current_section) to None
         """
         self.section_manager.remove_all_sections()
+        self.framebuffer.fill(0, self.strip_length - 1, 0)
 
     def concatenate_sections(self) -> List[tuple]:
         """
@@ -307,25 +732,9 @@ class Controller:
 
         :return: a list with the length of the strip or void list if no sections are defined
         """
-        result = []
-        sections = self.section_manager.list_sections()
-        N = self.strip_length
-        S = len(sections)
-
-        if S > 0:
-            result = [(0, 0, 0)] * sections[0].limits[0]
-            if S > 1:
-                for i in range(S - 1):
-                    color_list = sections[i].color_list
-                    result += color_list if sections[i].is_on else [(0, 0, 0)] * len(color_list)
-                    result += [(0, 0, 0)] * (sections[i + 1].limits[0] - sections[i].limits[1] - 1)
-                result += sections[-1].color_list
-            else:
-                color_list = sections[0].color_list
-                result += color_list if sections[0].is_on else [(0, 0, 0)] * len(color_list)
-            result = result + [(0, 0, 0)] * (N - sections[-1].limits[1] - 1)
-
-        return result
+        if len(self.section_manager.order) == 0:
+            return []
+        return [unpack(c) for c in self.section_manager.concatenate()]
 
     def turn_on(self, section_id: str = None):
         """
@@ -338,8 +747,11 @@ class Controller:
             if self.is_on:
                 raise AlreadyOn()
             self.is_on = True
+            self.section_manager.touch()
+            self.framebuffer.mark_all_dirty()
         else:
             self.section_manager.set_section_on(section_id)
+            self.paint_section(section_id)
 
     def turn_off(self, section_id: str = None):
         """
@@ -352,47 +764,286 @@ class Controller:
             if not self.is_on:
                 raise AlreadyOff()
             self.is_on = False
+            self.section_manager.touch()
+            self.framebuffer.mark_all_dirty()
         else:
             self.section_manager.set_section_off(section_id)
+            self.paint_section(section_id)
 
-    def status(self) -> dict:
+    def resume(self, instance: str = None, version: int = None) -> dict:
+        """
+        Returns the identity of the current state, so a client reconnecting can tell if the state is still the same it
+        left (same controller instance and same version) and skip defining sections again
+
+        :param instance: controller instance known by the client
+        :param version: state version known by the client
+        """
         return {
-            'strip_length': self.strip_length,
-            'current_sections': [{
-                'id': s.id,
-                'is_on': s.is_on,
-                'color': rgb_to_hex(s.color_list[0]),
-                'limits': {
-                    'start': s.limits[0],
-                    'end': s.limits[1]
-                }
-            } for s in self.section_manager.list_sections()]
+            'instance': self.instance,
+            'version': self.section_manager.version,
+            'in_sync': instance == self.instance and version == self.section_manager.version
         }
 
+    @staticmethod
+    def section_status(section: Section) -> dict:
+        return {
+            'id': section.id,
+            'is_on': section.is_on,
+            'color': to_hex(section.color),
+            'limits': {
+                'start': section.limits[0],
+                'end': section.limits[1]
+            }
+        }
+
+    def status(self, since_version: int = None, offset: int = 0, limit: int = None) -> dict:
+        """
+        Returns the state of all sections, or only the sections added, removed or changed since a previous version (if
+        those changes are still recorded, see SectionManager.diff). The list of all sections is built once per version
+        (see status_cache), so polling the status while nothing changes doesn't build it again.
+
+        :param since_version: state version known by the client (of the same instance)
+        :param offset: index of the first section returned (when returning all sections)
+        :param limit: maximum number of sections returned (when returning all sections), None for all
+        """
+        section_manager = self.section_manager
+        version = section_manager.version
+        result = {'strip': self.strip_id, 'strip_length': self.strip_length, 'instance': self.instance,
+                  'version': version}
+        diff = section_manager.diff(since_version) \
+            if since_version is not None and since_version <= version else None
+        if diff is not None:
+            added, removed, changed = diff
+            result['since_version'] = since_version
+            result['added'] = [self.section_status(section_manager.get_section(i)) for i in added]
+            result['removed'] = removed
+            result['changed'] = [self.section_status(section_manager.get_section(i)) for i in changed]
+            return result
+        if self.status_cache is None or self.status_cache[0] != version:
+            self.status_cache = (version, [self.section_status(s) for s in section_manager.list_sections()])
+        sections = self.status_cache[1]
+        result['total_sections'] = len(sections)
+        if offset > 0 or limit is not None:
+            sections = sections[offset:] if limit is None else sections[offset:offset + limit]
+        result['current_sections'] = sections
+        return result
+
     def render(self):
         """
-        Renders the actual configuration on the strip
+        Renders the actual configuration on the strip. On render loop mode (see RenderLoop), it only requests a new
+        frame that will be shown on the next tick.
+        """
+        with self.lock:
+            if self.render_deferred > 0:
+                return
+            if self.frame_written:
+                # the last frame may have overwritten any led
+                self.frame_written = False
+                self.framebuffer.write(0, self.section_manager.concatenate())
+        self.request_show()
+
+    @contextmanager
+    def deferred_render(self):
+        """
+        Within this context render does nothing, changes are accumulated on the framebuffer until the next render
+        outside the context
+        """
+        with self.lock:
+            self.render_deferred += 1
+            try:
+                yield
+            finally:
+                self.render_deferred -= 1
+
+    def snapshot(self) -> Tuple[bool, Snapshot, Dict[str, Effect]]:
+        """
+        Returns the current state of sections, effects and the strip (on/off) in O(1), see rollback
+        """
+        return self.is_on, self.section_manager.snapshot(), dict(self.effects)
+
+    def rollback(self, snapshot: Tuple[bool, Snapshot, Dict[str, Effect]]):
+        """
+        Restores the state of sections, effects and the strip from a snapshot (see snapshot), it must be rendered
+        afterwards. Only leds affected by changes since the snapshot are written again on the framebuffer.
+        """
+        is_on, section_manager_snapshot, effects = snapshot
+        if is_on != self.is_on:
+            self.is_on = is_on
+            self.framebuffer.mark_all_dirty()
+        ranges = self.section_manager.changed_ranges(section_manager_snapshot.version)
+        self.section_manager.restore(section_manager_snapshot)
+        # versions after the snapshot will be reached again with other states
+        self.status_cache = None
+        for start, end in ranges if ranges is not None else [(0, self.strip_length - 1)]:
+            self.framebuffer.write(start, self.section_manager.concatenate(start, end))
+        for section_id in self.effects.keys() - effects.keys():
+            if section_id in self.section_manager.slots:
+                self.paint_section(section_id)
+        self.effects = effects
+
+    def request_show(self):
+        """
+        Shows the strip immediately or on the next tick of the render loop (if it's enabled)
+        """
+        if self.render_loop is not None:
+            self.render_loop.request()
+        else:
+            self.show()
+
+    def show(self):
+        """
+        Writes on the strip buffer the leds modified on the framebuffer since the last time (black if the strip is
+        turned off) corrected by the output stage (see OutputStage) and shows it
         """
-        colors = self. concatenate_sections()
-        if len(colors) == 0 or not self.is_on:
-            if len(colors) == 0:
-                self.logger.warning('No sections defined (rendering Color(0, 0, 0))')
+        self.profiler.run(self._show)
+
+    def _show(self):
+        now = perf_counter()
+        with self.lock:
+            self.frame_pending = False
+            if len(self.effects) > 0:
+                self.animate(now)
+            ranges = self.framebuffer.take_dirty()
+            if len(ranges) == 0:
+                return
+            # the strip buffer must not be modified while it's being shown by another thread, but the framebuffer
+            # can be modified meanwhile, so only show_lock is held while showing
+            self.show_lock.acquire()
+            try:
+                set_pixel_color = self.strip.setPixelColor
+                pixels = self.framebuffer.pixels
+                for start, end in ranges:
+                    if self.state_file is not None:
+                        self.state_file.pixels[start:end + 1] = pixels[start:end + 1]
+                    if self.is_on:
+                        for i, c in enumerate(self.output_stage.apply(pixels[start:end + 1]), start):
+                            set_pixel_color(i, c)
+                    else:
+                        for i in range(start, end + 1):
+                            set_pixel_color(i, 0)
+            except Exception:
+                self.show_lock.release()
+                raise
+
+        try:
+            self.strip.show()
+        finally:
+            self.show_lock.release()
+        metrics.observe('show', f'{metrics.STRIP}:{self.strip_id}', perf_counter() - now)
+
+    def write_frame(self, frame: bytes):
+        """
+        Writes a raw frame straight into the framebuffer and shows it, bypassing sections. Sections are not modified,
+        so they will be rendered again on the next render.
+
+        :param frame: RGB bytes (3 bytes per led) starting from the first led, it may be shorter than the strip
+        :raises ValueError: if the frame length is not a multiple of 3 or it is longer than the strip
+        """
+        if len(frame) % 3 != 0 or len(frame) > 3 * self.strip_length:
+            raise ValueError(f'frame length must be a multiple of 3 and at most {3 * self.strip_length}')
+        with self.lock:
             if not self.is_on:
-                self.logger.warning('Strip is turned off (rendering Color(0, 0, 0))')
-            for i in range(self.strip_length):
-                self.strip.setPixelColor(i, Color(0, 0, 0))
+                return
+            if self.frame_pending:
+                # the previous frame is overwritten before being shown
+                metrics.count('frames_dropped')
+            self.frame_pending = True
+            self.framebuffer.write(0, from_rgb_bytes(frame))
+            if not self.frame_written:
+                self.frame_written = True
+                self.persist()
+        self.request_show()
+
+    def restore_state(self):
+        """
+        Restores the state saved on the state file (if any) and shows the last frame
+        """
+        state = self.state_file.load()
+        if state is not None:
+            try:
+                self.section_manager.load(state.sections, state.colors, state.version)
+            except (ValueError, Overlapping):
+                self.logger.warning('Ignoring state file, sections are not valid')
+                self.section_manager.remove_all_sections()
+            else:
+                self.instance = state.instance
+                self.is_on = state.is_on
+                self.frame_written = state.frame_written
+                self.framebuffer.write(0, state.pixels)
+                self.logger.info(f'State restored, {len(state.sections)} sections (version {state.version})')
+                self.show()
+        self.persist(True)
+
+    def persist(self, full: bool = False):
+        """
+        Writes on the state file (if it's enabled) the changes on sections since the last time (see
+        SectionManager.diff), the last frame is written on each show.
+
+        :param full: True to write all sections and colors
+        """
+        if self.state_file is None:
+            return
+        section_manager = self.section_manager
+        state_file = self.state_file
+        diff = None if full else section_manager.diff(self.persisted_version)
+        ranges = None if full else section_manager.changed_ranges(self.persisted_version)
+        state_file.write_header(self.instance, section_manager.version, self.is_on, self.frame_written, False)
+        if diff is None or ranges is None:
+            for slot in range(state_file.strip_length):
+                state_file.clear_section(slot)
+            for section_id, slot in section_manager.slots.items():
+                state_file.write_section(slot, section_id, section_manager.starts[slot], section_manager.ends[slot],
+                                         (section_manager.on_mask >> slot) & 1)
+            state_file.colors[:] = section_manager.colors
+            state_file.pixels[:] = self.framebuffer.pixels
+            self.persisted_slots = dict(section_manager.slots)
         else:
-            for i, c in enumerate(colors):
-                self.strip.setPixelColor(i, Color(c[0], c[1], c[2]))
+            section_ids = diff[0] + diff[1] + diff[2]
+            for section_id in section_ids:
+                slot = self.persisted_slots.pop(section_id, None)
+                if slot is not None:
+                    state_file.clear_section(slot)
+            for section_id in section_ids:
+                slot = section_manager.slots.get(section_id)
+                if slot is not None:
+                    state_file.write_section(slot, section_id, section_manager.starts[slot],
+                                             section_manager.ends[slot], (section_manager.on_mask >> slot) & 1)
+                    self.persisted_slots[section_id] = slot
+            for start, end in ranges:
+                state_file.colors[start:end + 1] = section_manager.colors[start:end + 1]
+        state_file.write_header(self.instance, section_manager.version, self.is_on, self.frame_written)
+        self.persisted_version = section_manager.version
 
-        self.strip.show()
+    def close(self):
+        """
+        Stops the render loop (if it's enabled) and closes the state file (if it's enabled), results of a profiling
+        session still running are written
+        """
+        self.profiler.stop()
+        if self.render_loop is not None:
+            self.render_loop.stop()
+            self.render_loop.join()
+            self.render_loop = None
+        if self.state_file is not None:
+            with self.lock:
+                self.persist()
+                self.state_file.close()
+                self.state_file = None
 
     def exec_cmd(self, cmd) -> dict:
         """
         Executes the current command (see set_command) on the current section (see set_section).
         If no section was set, executes the command on the entire strip.
 
+        Commands that are not exclusive (see Command) are executed without holding the lock.
+
         :return: result of the execution
         """
         cmd.set_controller(self)
-        return cmd.exec()
+        if not cmd.exclusive:
+            return cmd.exec()
+        with self.lock:
+            try:
+                return cmd.exec()
+            finally:
+                self.persist()
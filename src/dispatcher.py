@@ -0,0 +1,138 @@
+import logging
+import metrics
+import startup
+from http import HTTPStatus
+from time import perf_counter
+from typing import Optional, Dict
+from command import Command, CommandParser
+from commands.disconnect import Disconnect
+from controller import Controller
+from error import ParseError, ExecutionError, ValidationError
+from network import MessageTooLong
+from response import Response
+from strips import DEFAULT_STRIP
+
+
+class Dispatcher:
+    """
+    Parses requests received from clients, executes the corresponding commands on the controller and builds the
+    responses that must be sent back.
+
+    When several strips are defined (see strips.py), commands and frames are executed on the controller of the strip
+    they address.
+
+    :param controller: controller of the default strip
+    :param controllers: controller of each strip by id (only the default one if None)
+    """
+
+    def __init__(self, parser: CommandParser, controller: Controller, controllers: Dict[int, Controller] = None):
+        self.parser = parser
+        self.controller = controller
+        self.controllers = controllers if controllers is not None else {DEFAULT_STRIP: controller}
+        self.logger = logging.getLogger('Dispatcher')
+
+    def get_controller(self, strip: Optional[int]) -> Controller:
+        """
+        :param strip: id of the strip, None for the default one
+        :raise KeyError: if the strip is not defined
+        """
+        return self.controller if strip is None else self.controllers[strip]
+
+    def parse(self, req: str, received: float = 0.0) -> Command:
+        """
+        Parses a request and validates the arguments of the command
+
+        :param req: stringified JSON representation of the command
+        :param received: time spent receiving the request in seconds (see metrics)
+        :return: the command ready to be executed
+        :raises ParseError: in case of parsing an invalid command
+        :raises ValidationError: if command arguments are not valid (or the strip is not defined)
+        """
+        profiler = self.controller.profiler
+        start = perf_counter()
+        cmd = profiler.run(self.parser.parse, req)
+        parsed = perf_counter()
+        profiler.run(cmd.validate_arguments)
+        if cmd.strip is not None and cmd.strip not in self.controllers:
+            raise ValidationError(f'strip {cmd.strip} is not defined')
+        metrics.observe('receive', cmd.name, received)
+        metrics.observe('parse', cmd.name, parsed - start)
+        metrics.observe('validate', cmd.name, perf_counter() - parsed)
+        return cmd
+
+    def execute(self, cmd: Command) -> Response:
+        """
+        Executes a (previously parsed) command on the controller
+
+        :return: the response for the client
+        """
+        start = perf_counter()
+        try:
+            controller = self.get_controller(cmd.strip)
+            result = controller.profiler.run(controller.exec_cmd, cmd, command=True)
+            startup.mark('First command executed')
+            response = Response(HTTPStatus.OK, result)
+        except ExecutionError as e:
+            response = self.error_response(e)
+        except Exception as e:
+            metrics.count_error(e)
+            self.logger.exception(e)
+            response = Response(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': 'Internal server error'})
+        metrics.observe('exec', cmd.name, perf_counter() - start)
+        response.command = cmd.name
+        return response
+
+    def error_response(self, e: Exception) -> Response:
+        """
+        Builds the response for an error raised while receiving, parsing or executing a command
+        """
+        metrics.count_error(e)
+        if isinstance(e, ParseError):
+            self.logger.warning('Invalid command received')
+            return Response(HTTPStatus.BAD_REQUEST, e.errors)
+        if isinstance(e, ValidationError):
+            self.logger.warning('Invalid command received')
+            return Response(HTTPStatus.BAD_REQUEST, e.get_msg())
+        if isinstance(e, ExecutionError):
+            return Response(HTTPStatus.CONFLICT, {'error': e.get_msg()})
+        if isinstance(e, MessageTooLong):
+            return Response(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': e.get_msg()})
+        self.logger.exception(e)
+        return Response(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': 'Internal server error'})
+
+    def dispatch_frame(self, frame: bytes, strip: int = DEFAULT_STRIP):
+        """
+        Writes a raw frame on a strip. Frames are not answered, so errors are only logged.
+
+        :param frame: RGB bytes of the frame
+        :param strip: id of the strip
+        """
+        start = perf_counter()
+        try:
+            self.get_controller(strip).write_frame(frame)
+        except KeyError as e:
+            metrics.count_error(e)
+            self.logger.warning(f'Frame received for strip {strip} which is not defined')
+        except ValueError as e:
+            metrics.count_error(e)
+            self.logger.warning(f'Invalid frame received: {e}')
+        except Exception as e:
+            metrics.count_error(e)
+            self.logger.exception(e)
+        metrics.observe('exec', metrics.FRAME, perf_counter() - start)
+
+    def dispatch(self, req: str, received: float = 0.0) -> Optional[Response]:
+        """
+        Parses and executes a request
+
+        :param req: stringified JSON representation of the command
+        :param received: time spent receiving the request in seconds (see metrics)
+        :return: the response for the client or None if the client asked to disconnect
+        """
+        try:
+            cmd = self.parse(req, received)
+        except Exception as e:
+            return self.error_response(e)
+        if isinstance(cmd, Disconnect):
+            return None
+        return self.execute(cmd)
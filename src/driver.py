@@ -0,0 +1,248 @@
+import atexit
+import logging
+from array import array
+from collections import deque
+from configparser import ConfigParser
+from threading import Lock
+from time import perf_counter, sleep
+from typing import Dict, List
+from utils import bool
+
+
+class SimulatedStrip:
+    """
+    Replaces rpi_ws281x.PixelStrip (same methods used by Controller) to run without the hardware. Colors are kept in
+    memory and show takes as long as sending them on the wire: 24 bits per led at freq_hz (30 us per led at 800 kHz)
+    plus the reset latch. The time when each frame is shown is recorded (see frame_times), so throughput and frames
+    dropped can be measured.
+
+    :param timing: False to show frames immediately (without waiting the wire time)
+    """
+
+    # number of frame times recorded
+    max_frame_times = 1024
+
+    def __init__(self, num, freq_hz: int = 800000, brightness: int = 255, reset_us: float = 300, timing: bool = True):
+        self.pixels = array('I', bytes(4 * num))
+        # colors sent on the last show
+        self.shown = array('I', self.pixels)
+        self.brightness = brightness
+        self.wire_time = (24 * num / freq_hz + reset_us / 1e6) if timing else 0.0
+        # (start, end) of each frame shown
+        self.frame_times = deque(maxlen=self.max_frame_times)
+        self.frames = 0
+
+    def begin(self):
+        pass
+
+    def show(self):
+        start = perf_counter()
+        self.shown = array('I', self.pixels)
+        if self.wire_time > 0:
+            sleep(self.wire_time)
+        self.frame_times.append((start, perf_counter()))
+        self.frames += 1
+
+    def setPixelColor(self, n: int, color: int):
+        self.pixels[n] = color
+
+    def setPixelColorRGB(self, n: int, red: int, green: int, blue: int, white: int = 0):
+        self.pixels[n] = (white << 24) | (red << 16) | (green << 8) | blue
+
+    def getPixelColor(self, n: int) -> int:
+        return self.pixels[n]
+
+    def getPixels(self) -> array:
+        return self.pixels
+
+    def numPixels(self) -> int:
+        return len(self.pixels)
+
+    def setBrightness(self, brightness: int):
+        self.brightness = brightness
+
+    def getBrightness(self) -> int:
+        return self.brightness
+
+
+def ws281x_strip_type(order: str) -> str:
+    """
+    Channels are placed in order by the output stage (see OutputStage), so the ws281x driver must send the bytes of the
+    packed color as they are instead of reordering them again (by default it expects RGB colors for GRB strips)
+
+    :param order: order of the channels on the wire (see OutputStage)
+    :return: name of the strip type constant of rpi_ws281x
+    """
+    return 'SK6812_STRIP_RGBW' if 'W' in order.upper() else 'WS2811_STRIP_RGB'
+
+
+class Ws281xDevice:
+    """
+    Drives both PWM channels of the Raspberry from a single ws2811_t of rpi_ws281x (they share the PWM peripheral and
+    the DMA channel). rpi_ws281x.PixelStrip creates a ws2811_t for each strip and initializes it with only its channel
+    set, so a PixelStrip per channel would reprogram the peripheral used by the other one. Here every channel is set
+    (see add_channel) before initializing the device once (see begin).
+
+    Rendering sends the buffers of both channels, so strips are shown one at a time holding lock, which must also be
+    held while writing the buffer of a channel (a frame half written would be sent by the other channel).
+
+    :param ws: the rpi_ws281x.ws module
+    """
+
+    def __init__(self, ws, freq_hz: int, dma: int):
+        self.ws = ws
+        self.leds = ws.new_ws2811_t()
+        for channel in range(2):
+            # channels not added are not used
+            handle = ws.ws2811_channel_get(self.leds, channel)
+            ws.ws2811_channel_t_count_set(handle, 0)
+            ws.ws2811_channel_t_gpionum_set(handle, 0)
+            ws.ws2811_channel_t_invert_set(handle, 0)
+            ws.ws2811_channel_t_brightness_set(handle, 0)
+        ws.ws2811_t_freq_set(self.leds, freq_hz)
+        ws.ws2811_t_dmanum_set(self.leds, dma)
+        self.lock = Lock()
+        self.channels: Dict[int, Ws281xChannel] = {}
+        self.initialized = False
+        atexit.register(self.close)
+
+    def add_channel(self, n: int, pin: int, invert: bool, brightness: int, channel: int,
+                    strip_type: int) -> 'Ws281xChannel':
+        """
+        :return: the strip driven by the channel
+        :raise ValueError: if the channel is not 0 or 1, it was already added or the device was already initialized
+        """
+        if channel not in (0, 1) or channel in self.channels or self.initialized:
+            raise ValueError(f'channel {channel} cannot be added')
+        ws = self.ws
+        handle = ws.ws2811_channel_get(self.leds, channel)
+        # colors are corrected by the output stage (see OutputStage)
+        ws.ws2811_channel_t_gamma_set(handle, list(range(256)))
+        ws.ws2811_channel_t_count_set(handle, n)
+        ws.ws2811_channel_t_gpionum_set(handle, pin)
+        ws.ws2811_channel_t_invert_set(handle, 1 if invert else 0)
+        ws.ws2811_channel_t_brightness_set(handle, brightness)
+        ws.ws2811_channel_t_strip_type_set(handle, strip_type)
+        strip = self.channels[channel] = Ws281xChannel(self, handle, n)
+        return strip
+
+    def begin(self):
+        """
+        Initializes the device (only the first time, it's called by the strip of each channel)
+
+        :raise RuntimeError: if rpi_ws281x fails
+        """
+        with self.lock:
+            if self.initialized:
+                return
+            self.check(self.ws.ws2811_init(self.leds), 'ws2811_init')
+            self.initialized = True
+
+    def render(self):
+        self.check(self.ws.ws2811_render(self.leds), 'ws2811_render')
+
+    def check(self, resp: int, function: str):
+        if resp != 0:
+            raise RuntimeError(f'{function} failed with code {resp} ({self.ws.ws2811_get_return_t_str(resp)})')
+
+    def close(self):
+        if self.leds is not None:
+            if self.initialized:
+                self.ws.ws2811_fini(self.leds)
+            self.ws.delete_ws2811_t(self.leds)
+            self.leds = None
+
+
+class Ws281xChannel:
+    """
+    Replaces rpi_ws281x.PixelStrip (same methods used by Controller) for a channel of a Ws281xDevice. Controller holds
+    lock (shared by the channels of the device) while writing the buffer and showing it.
+    """
+
+    def __init__(self, device: Ws281xDevice, channel, num: int):
+        self.device = device
+        self.channel = channel
+        self.size = num
+        self.lock = device.lock
+
+    def begin(self):
+        self.device.begin()
+
+    def show(self):
+        self.device.render()
+
+    def setPixelColor(self, n: int, color: int):
+        self.device.ws.ws2811_led_set(self.channel, n, color)
+
+    def setPixelColorRGB(self, n: int, red: int, green: int, blue: int, white: int = 0):
+        self.setPixelColor(n, (white << 24) | (red << 16) | (green << 8) | blue)
+
+    def getPixelColor(self, n: int) -> int:
+        return self.device.ws.ws2811_led_get(self.channel, n)
+
+    def getPixels(self) -> List[int]:
+        return [self.getPixelColor(n) for n in range(self.size)]
+
+    def numPixels(self) -> int:
+        return self.size
+
+    def setBrightness(self, brightness: int):
+        self.device.ws.ws2811_channel_t_brightness_set(self.channel, brightness)
+
+    def getBrightness(self) -> int:
+        return self.device.ws.ws2811_channel_t_brightness_get(self.channel)
+
+
+def output_order(config: ConfigParser) -> str:
+    """
+    :return: order of the channels on the wire (see OutputStage)
+    """
+    return config['OUTPUT'].get('order', 'RGB') if config.has_section('OUTPUT') else 'RGB'
+
+
+def create_ws281x_strips(configs: Dict[int, ConfigParser]) -> Dict[int, Ws281xChannel]:
+    """
+    Creates the strips using the ws281x driver on a single Ws281xDevice, each one on the channel set on its [PIXEL_STRIP]
+    section (strips must use different channels, the same dma and the same freq_hz, see strips.strip_configs)
+
+    :param configs: configuration of each strip by id (see strips.strip_configs)
+    :return: strip of each configuration using the ws281x driver
+    """
+    configs = {strip_id: strip_config for strip_id, strip_config in configs.items()
+               if strip_config['PIXEL_STRIP'].get('driver', 'ws281x') == 'ws281x'}
+    if len(configs) == 0:
+        return {}
+    # imported only here since it's available only on the Raspberry
+    from rpi_ws281x import ws
+    first = next(iter(configs.values()))['PIXEL_STRIP']
+    device = Ws281xDevice(ws, int(first.get('freq_hz')), int(first.get('dma')))
+    strips = {}
+    for strip_id, strip_config in configs.items():
+        options = strip_config['PIXEL_STRIP']
+        strip_type = getattr(ws, ws281x_strip_type(output_order(strip_config)))
+        strips[strip_id] = device.add_channel(int(options.get('n')), int(options.get('pin')),
+                                              bool(options.get('invert')), int(options.get('brightness')),
+                                              int(options.get('channel')), strip_type)
+    return strips
+
+
+def create_strip(config: ConfigParser, n: int, pin: int, freq_hz: int, dma: int, invert: bool, brightness: int,
+                 channel: int):
+    """
+    Creates the strip for the driver set on the [PIXEL_STRIP] section of the configuration: ws281x (a channel of its
+    own Ws281xDevice, the default) or simulated (see SimulatedStrip). Strips sharing the device are created by
+    create_ws281x_strips.
+
+    :raise ValueError: if the driver is not valid
+    """
+    driver = config['PIXEL_STRIP'].get('driver', 'ws281x')
+    if driver == 'simulated':
+        logging.getLogger('Driver').info('Using simulated strip')
+        return SimulatedStrip(n, freq_hz, brightness, float(config['PIXEL_STRIP'].get('reset_us', '300')),
+                              bool(config['PIXEL_STRIP'].get('timing', 'True')))
+    if driver == 'ws281x':
+        # imported only here since it's available only on the Raspberry
+        from rpi_ws281x import ws
+        strip_type = getattr(ws, ws281x_strip_type(output_order(config)))
+        return Ws281xDevice(ws, freq_hz, dma).add_channel(n, pin, invert, brightness, channel, strip_type)
+    raise ValueError(f'invalid driver {driver}')
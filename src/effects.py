@@ -0,0 +1,146 @@
+from array import array
+from colorsys import hsv_to_rgb
+from math import exp
+from random import randrange
+from typing import List
+from framebuffer import pack, unpack, from_rgb_bytes
+
+
+class Effect:
+    """
+    Animation computed on each frame for the leds of a section (see Controller.animate). Effects compute whole frames
+    with array slicing, bytes.translate and similar operations instead of iterating over each led in Python.
+
+    :param length: number of leds
+    :param speed: meaning depends on the effect (cycles per second by default)
+    :param palette: packed colors (see framebuffer.pack)
+    :param direction: 1 (towards the end of the section) or -1 (towards the start)
+    """
+
+    default_palette = ['#ffffff']
+
+    def __init__(self, length: int, speed: float, palette: List[int], direction: int):
+        self.speed = speed
+        self.palette = palette
+        self.direction = direction
+        self.length = 0
+        self.resize(length)
+
+    def resize(self, length: int):
+        """
+        Called when the number of leds changes (for instance when the section is edited)
+        """
+        self.length = length
+
+    def render(self, t: float) -> array:
+        """
+        :param t: time in seconds
+        :return: packed colors for each led
+        """
+        raise NotImplemented()
+
+    def shift(self, t: float, period: int, unit: float) -> int:
+        """
+        :return: offset (between 0 and period - 1) of the pattern at time t, moving unit leds per cycle
+        """
+        return int(self.direction * t * self.speed * unit) % period
+
+
+class Rainbow(Effect):
+    """
+    Moving rainbow spanning the whole section, speed in cycles per second (the palette is ignored)
+    """
+
+    def resize(self, length: int):
+        super().resize(length)
+        self.wheel = array('I', [pack(tuple(int(255 * c) for c in hsv_to_rgb(i / length, 1, 1)))
+                                 for i in range(length)])
+
+    def render(self, t: float) -> array:
+        offset = self.length - self.shift(t, self.length, self.length)
+        return self.wheel[offset:] + self.wheel[:offset]
+
+
+class Chase(Effect):
+    """
+    Blocks of leds with the colors of the palette separated by gaps of the same size (one tenth of the section) moving
+    along the section, speed in cycles per second
+    """
+
+    def resize(self, length: int):
+        super().resize(length)
+        self.block = max(1, length // 10)
+        pattern = array('I')
+        for color in self.palette:
+            pattern += array('I', [color]) * self.block + array('I', [0]) * self.block
+        self.period = len(pattern)
+        # long enough to take any window of length leds
+        self.pattern = pattern * (length // self.period + 2)
+
+    def render(self, t: float) -> array:
+        offset = self.period - self.shift(t, self.period, self.length)
+        return self.pattern[offset:offset + self.length]
+
+
+class Fade(Effect):
+    """
+    Whole section fading from one color of the palette to the next, speed in colors per second
+    """
+
+    default_palette = ['#ff0000', '#00ff00', '#0000ff']
+
+    def render(self, t: float) -> array:
+        position = t * self.speed
+        index = int(position)
+        ratio = position - index
+        if self.direction < 0:
+            index = -index
+        c1 = unpack(self.palette[index % len(self.palette)])
+        c2 = unpack(self.palette[(index + self.direction) % len(self.palette)])
+        color = pack(tuple(int(a + (b - a) * ratio) for a, b in zip(c1, c2)))
+        return array('I', [color]) * self.length
+
+
+class Twinkle(Effect):
+    """
+    Random leds lighting up with colors of the palette and fading out, speed in leds lighting up per second per 10
+    leds (direction is ignored)
+    """
+
+    # time in seconds for a led to fade out to about one third of its brightness
+    fade_time = 0.5
+
+    def __init__(self, length: int, speed: float, palette: List[int], direction: int):
+        self.last_t = None
+        self.pending = 0.0
+        self.factor = None
+        self.fade = None
+        super().__init__(length, speed, palette, direction)
+
+    def resize(self, length: int):
+        super().resize(length)
+        self.rgb = bytearray(3 * length)
+
+    def render(self, t: float) -> array:
+        dt = 0.0 if self.last_t is None else max(0.0, t - self.last_t)
+        self.last_t = t
+        # ticks are usually regular, so the fading table is rarely computed again
+        factor = int(1024 * exp(-dt / self.fade_time))
+        if factor != self.factor:
+            self.factor = factor
+            self.fade = bytes(v * factor // 1024 for v in range(256))
+        self.rgb = self.rgb.translate(self.fade)
+        self.pending = min(self.length, self.pending + dt * self.speed * self.length / 10)
+        while self.pending >= 1:
+            self.pending -= 1
+            i = 3 * randrange(self.length)
+            self.rgb[i:i + 3] = bytes(unpack(self.palette[randrange(len(self.palette))]))
+        return from_rgb_bytes(self.rgb)
+
+
+effects = {
+    'rainbow': Rainbow,
+    'chase': Chase,
+    'fade': Fade,
+    'twinkle': Twinkle
+}
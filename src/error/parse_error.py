@@ -1,8 +1,11 @@
-from typing import List, Union
-from jsonschema import ValidationError
+from typing import List, Union, TYPE_CHECKING
 
+if TYPE_CHECKING:
+    # not imported at runtime because jsonschema is slow to import (see command.create_validator)
+    from jsonschema import ValidationError
 
-def get_path(e: ValidationError) -> str:
+
+def get_path(e: 'ValidationError') -> str:
     result = 'args'
     for e in e.absolute_path:
         if isinstance(e, int):
@@ -14,7 +17,7 @@ def get_path(e: ValidationError) -> str:
 
 class ParseError(Exception):
 
-    def __init__(self, errors: List[Union[ValidationError, str]]):
-        aux1 = [f'error in {get_path(e)} : {e.message}' for e in errors if isinstance(e, ValidationError)]
+    def __init__(self, errors: List[Union['ValidationError', str]]):
+        aux1 = [f'error in {get_path(e)} : {e.message}' for e in errors if not isinstance(e, str)]
         aux2 = [e for e in errors if isinstance(e, str)]
         self.errors = aux1 if len(aux1) > 0 else aux2
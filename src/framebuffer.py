@@ -0,0 +1,93 @@
+import sys
+from array import array
+from typing import List, Tuple
+
+
+def pack(color: Tuple[int, int, int]) -> int:
+    """
+    Packs a color as a 24 bits integer (0xRRGGBB, the format used by rpi_ws281x)
+    """
+    return (color[0] << 16) | (color[1] << 8) | color[2]
+
+
+def unpack(color: int) -> Tuple[int, int, int]:
+    """
+    Inverse of pack
+    """
+    return (color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF
+
+
+def from_rgb_bytes(data) -> array:
+    """
+    Converts RGB bytes (3 bytes per led) to packed colors without iterating over each led in Python
+
+    :param data: bytes-like object, its length must be a multiple of 3
+    """
+    raw = bytearray(4 * (len(data) // 3))
+    if sys.byteorder == 'little':
+        raw[2::4], raw[1::4], raw[0::4] = data[0::3], data[1::3], data[2::3]
+    else:
+        raw[1::4], raw[2::4], raw[3::4] = data[0::3], data[1::3], data[2::3]
+    return array('I', raw)
+
+
+class FrameBuffer:
+    """
+    Keeps the color of each led (packed, see pack) between renders and tracks the ranges of leds modified since the
+    last time they were taken (see take_dirty), so only those leds have to be written on the strip.
+    """
+
+    # above this number of dirty ranges, they are collapsed into a single range
+    max_dirty_ranges = 64
+
+    def __init__(self, length: int):
+        self.length = length
+        self.pixels = array('I', bytes(4 * length))
+        self.dirty: List[Tuple[int, int]] = []
+
+    def mark_dirty(self, start: int, end: int):
+        """
+        Marks leds from start to end (both inclusive) as modified
+        """
+        if len(self.dirty) >= self.max_dirty_ranges:
+            self.dirty = [(min(start, min(r[0] for r in self.dirty)), max(end, max(r[1] for r in self.dirty)))]
+        else:
+            self.dirty.append((start, end))
+
+    def mark_all_dirty(self):
+        self.dirty = [(0, self.length - 1)]
+
+    def take_dirty(self) -> List[Tuple[int, int]]:
+        """
+        Returns the modified ranges of leds (sorted, merged and with both limits inclusive) and clears them
+        """
+        ranges = sorted(self.dirty)
+        self.dirty = []
+        merged = []
+        for start, end in ranges:
+            if len(merged) > 0 and start <= merged[-1][1] + 1:
+                if end > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        return merged
+
+    def fill(self, start: int, end: int, color: int):
+        """
+        Sets the same color for leds from start to end (both inclusive)
+
+        :param color: packed color (see pack)
+        """
+        self.pixels[start:end + 1] = array('I', [color]) * (end - start + 1)
+        self.mark_dirty(start, end)
+
+    def write(self, start: int, colors: array):
+        """
+        Sets colors for leds starting from start
+
+        :param colors: packed colors (see pack)
+        """
+        if len(colors) == 0:
+            return
+        self.pixels[start:start + len(colors)] = colors
+        self.mark_dirty(start, start + len(colors) - 1)
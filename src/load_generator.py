@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+
+"""
+Stress client: opens one or more SCP connections to a running server and sends a mix of operations, at a target rate
+or as fast as possible, then reports throughput, latency (p50 and p99) and errors of each kind of operation, for
+instance:
+
+    ./load_generator.py --host 127.0.0.1 --port 8080 --connections 4 --rate 400 --seconds 10 \\
+        --mix churn=1 edit=4 status=4 batch=1
+
+Operations (see OPERATIONS):
+
+    - churn: adds a section and removes it
+    - edit: changes the color of a section
+    - status: polls the status
+    - batch: turns a section off and on and changes its color with a single batch command
+    - frame: sends a raw frame (frames are not answered, so their latency is not measured)
+
+Each connection owns a range of leds, so connections don't interfere with each other. Raw frames always start from the
+first led (they can't set an offset), so they would overwrite leds of other connections: frame is only allowed with a
+single connection. Several connections require server_mode = asyncio (the blocking server serves one client at a
+time). Use driver = simulated (see driver.py) to run the server on localhost without a strip.
+
+With a target rate, latency is measured since each operation was scheduled, not since it was actually sent, so a
+server falling behind the rate shows up on the latency (instead of just slowing down the client).
+"""
+
+import json
+import random
+import socket
+import sys
+from argparse import ArgumentParser
+from collections import defaultdict
+from threading import Thread
+from time import perf_counter, sleep
+from typing import Dict, List, Optional
+from network import MessageReader
+
+OPERATIONS = ['churn', 'edit', 'status', 'batch', 'frame']
+
+
+class Client:
+    """
+    Connection to the server, it owns the leds from start to end: a section is kept on the first half (to be edited)
+    and sections are added and removed on the second half
+
+    :raise OSError: if the connection fails
+    """
+
+    def __init__(self, host: str, port: int, start: int, end: int, seed: int):
+        self.skt = socket.create_connection((host, port))
+        self.skt.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.file = self.skt.makefile('rb')
+        self.start = start
+        self.end = end
+        self.middle = (start + end) // 2
+        self.random = random.Random(seed)
+        self.section_id = None
+
+    def request(self, name: str, args: Optional[dict] = None) -> dict:
+        """
+        Sends a command and waits for the response
+
+        :raise ConnectionError: if the server closes the connection
+        """
+        msg = {'name': name} if args is None else {'name': name, 'args': args}
+        self.skt.sendall(json.dumps(msg).encode() + b'\n')
+        line = self.file.readline()
+        if len(line) == 0:
+            raise ConnectionError('connection closed by the server')
+        return json.loads(line)
+
+    def color(self) -> str:
+        return f'#{self.random.randrange(1 << 24):06x}'
+
+    def setup(self):
+        """
+        Defines the section edited by edit and batch operations
+
+        :raise Exception: if the section can't be added
+        """
+        response = self.request('section_add', {'sections': [{'start': self.start, 'end': self.middle,
+                                                               'color': self.color()}]})
+        if response['status'] != 200:
+            raise Exception(f'section could not be added: {response["result"]}')
+        self.section_id = response['result']['sections'][0]
+
+    def churn(self) -> bool:
+        response = self.request('section_add', {'sections': [{'start': self.middle + 1, 'end': self.end,
+                                                               'color': self.color()}]})
+        if response['status'] != 200:
+            return False
+        return self.request('section_remove', {'sections': response['result']['sections']})['status'] == 200
+
+    def edit(self) -> bool:
+        return self.request('section_edit', {'section_id': self.section_id, 'color': self.color()})['status'] == 200
+
+    def status(self) -> bool:
+        return self.request('status')['status'] == 200
+
+    def batch(self) -> bool:
+        return self.request('batch', {'commands': [
+            {'name': 'turn_off', 'args': {'section_id': self.section_id}},
+            {'name': 'turn_on', 'args': {'section_id': self.section_id}},
+            {'name': 'section_edit', 'args': {'section_id': self.section_id, 'color': self.color()}}
+        ]})['status'] == 200
+
+    def frame(self) -> bool:
+        payload = bytes([self.random.randrange(256)]) * (3 * (self.end + 1))
+        self.skt.sendall(MessageReader.FRAME_HEADER.pack(MessageReader.FRAME_MARKER, len(payload)) + payload)
+        return True
+
+    def close(self):
+        """
+        Removes the section (sections are kept between connections) and disconnects
+        """
+        try:
+            if self.section_id is not None:
+                self.request('section_remove', {'sections': [self.section_id]})
+            self.skt.sendall(b'{"name": "disconnect"}\n')
+        except (OSError, ValueError):
+            pass
+        self.file.close()
+        self.skt.close()
+
+
+class Worker(Thread):
+    """
+    Sends operations on a connection until the deadline, one at a time (waiting for the response)
+
+    :param period: seconds between operations (0 to send them as fast as possible)
+    """
+
+    def __init__(self, client: Client, mix: Dict[str, float], period: float, deadline: float):
+        super().__init__(daemon=True)
+        self.client = client
+        self.operations = list(mix.keys())
+        self.weights = list(mix.values())
+        self.period = period
+        self.deadline = deadline
+        # latencies (seconds) and number of errors of each operation
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.failure: Optional[Exception] = None
+
+    def run(self):
+        client = self.client
+        started = perf_counter()
+        i = 0
+        try:
+            while True:
+                scheduled = started + i * self.period if self.period > 0 else perf_counter()
+                if scheduled >= self.deadline:
+                    break
+                delay = scheduled - perf_counter()
+                if delay > 0:
+                    sleep(delay)
+                operation = client.random.choices(self.operations, self.weights)[0]
+                ok = getattr(client, operation)()
+                if operation != 'frame':
+                    self.latencies[operation].append(perf_counter() - scheduled)
+                else:
+                    self.latencies[operation].append(0.0)
+                if not ok:
+                    self.errors[operation] += 1
+                i += 1
+        except (OSError, ValueError) as e:
+            self.failure = e
+
+
+def percentile(samples: List[float], p: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def run(host: str, port: int, connections: int, rate: float, seconds: float, mix: Dict[str, float], leds: int,
+        seed: int = 0) -> dict:
+    """
+    Runs the load and summarizes the results
+
+    :param rate: operations per second on all connections (0 to send them as fast as possible)
+    :param leds: length of the strip, split among connections
+    :raise ValueError: if frame operations are mixed with several connections
+    :raise Exception: if some connection can't be established or set up
+    """
+    if 'frame' in mix and connections > 1:
+        raise ValueError('frame operations are only allowed with a single connection')
+    length = leds // connections
+    if length < 2:
+        raise ValueError('there must be at least 2 leds per connection')
+    clients = []
+    try:
+        for i in range(connections):
+            client = Client(host, port, i * length, (i + 1) * length - 1, seed + i)
+            clients.append(client)
+            client.setup()
+        period = connections / rate if rate > 0 else 0.0
+        started = perf_counter()
+        workers = [Worker(client, mix, period, started + seconds) for client in clients]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = perf_counter() - started
+    finally:
+        for client in clients:
+            client.close()
+
+    results = {'connections': connections, 'rate': rate, 'elapsed': elapsed, 'operations': {},
+               'failures': [str(worker.failure) for worker in workers if worker.failure is not None]}
+    total = 0
+    total_errors = 0
+    for operation in mix.keys():
+        latencies = sorted(latency for worker in workers for latency in worker.latencies[operation])
+        errors = sum(worker.errors[operation] for worker in workers)
+        total += len(latencies)
+        total_errors += errors
+        if len(latencies) == 0:
+            continue
+        results['operations'][operation] = {
+            'count': len(latencies),
+            'per_second': len(latencies) / elapsed,
+            'errors': errors,
+            'error_rate': errors / len(latencies),
+            'p50_ms': 1000 * percentile(latencies, 0.5) if operation != 'frame' else None,
+            'p99_ms': 1000 * percentile(latencies, 0.99) if operation != 'frame' else None,
+        }
+    results['count'] = total
+    results['per_second'] = total / elapsed
+    results['errors'] = total_errors
+    results['error_rate'] = total_errors / total if total > 0 else 0.0
+    return results
+
+
+def parse_mix(items: List[str]) -> Dict[str, float]:
+    """
+    :param items: operation=weight
+    """
+    mix = {}
+    for item in items:
+        operation, _, weight = item.partition('=')
+        if operation not in OPERATIONS:
+            raise ValueError(f'unknown operation {operation}, it must be one of {", ".join(OPERATIONS)}')
+        mix[operation] = float(weight) if weight != '' else 1.0
+    return mix
+
+
+if __name__ == '__main__':
+
+    parser = ArgumentParser(description='Sends a mix of commands to a running SCP server and measures latency')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080, help='port of the server (port on config.ini)')
+    parser.add_argument('--connections', type=int, default=1)
+    parser.add_argument('--rate', type=float, default=0, help='operations per second (0 for as fast as possible)')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--leds', type=int, default=300, help='length of the strip (number of leds on config.ini)')
+    parser.add_argument('--mix', nargs='+', default=['churn=1', 'edit=4', 'status=4', 'batch=1'],
+                        help=f'operation=weight, operations: {", ".join(OPERATIONS)}')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='file to write results (JSON)')
+    args = parser.parse_args()
+
+    results = run(args.host, args.port, args.connections, args.rate, args.seconds, parse_mix(args.mix), args.leds,
+                  args.seed)
+
+    print(f'{"operation":<12}{"count":>8}{"per s":>10}{"errors":>8}{"p50 (ms)":>10}{"p99 (ms)":>10}')
+    for operation, r in results['operations'].items():
+        p50 = f'{r["p50_ms"]:>10.2f}' if r['p50_ms'] is not None else f'{"-":>10}'
+        p99 = f'{r["p99_ms"]:>10.2f}' if r['p99_ms'] is not None else f'{"-":>10}'
+        print(f'{operation:<12}{r["count"]:>8}{r["per_second"]:>10.1f}{r["errors"]:>8}{p50}{p99}')
+    print(f'{"total":<12}{results["count"]:>8}{results["per_second"]:>10.1f}{results["errors"]:>8}')
+    for failure in results['failures']:
+        print(f'Connection failed: {failure}')
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    sys.exit(1 if results['errors'] > 0 or len(results['failures']) > 0 else 0)
@@ -0,0 +1,118 @@
+"""
+Logging configuration (see configure). Handlers writing on the log file and the console may be slow (for instance on
+an SD card), so they can be moved behind a queue: records are only queued by the threads logging and handlers are
+called from a separate thread (QueueListener). Messages logged for every command or frame are rate-limited (see
+RateLimitFilter), so they don't flood the log under load.
+"""
+
+import logging
+import logging.handlers
+from configparser import ConfigParser
+from queue import SimpleQueue
+from time import monotonic
+from typing import Dict, Optional, Tuple
+from utils import bool
+
+
+class ColorFormatter(logging.Formatter):
+    """
+    Colors the level and the message by severity for the console. The record is copied, so other handlers are not
+    affected.
+    """
+
+    colors = [
+        (logging.ERROR, '\x1b[31;1m'),
+        (logging.WARNING, '\x1b[33;1m'),
+    ]
+    default_color = '\x1b[0m'
+    reset = '\x1b[0m'
+
+    def format(self, record: logging.LogRecord) -> str:
+        color = next((color for level, color in self.colors if record.levelno >= level), self.default_color)
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = f'{color}{record.getMessage()}{self.reset}'
+        record.args = None
+        record.levelname = f'{color}{record.levelname}{self.reset}'
+        return super().format(record)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most rate records per second (with bursts of up to rate records) from each line of code logging,
+    errors are never dropped. The number of records dropped is appended to the next record let through.
+
+    :param rate: records per second, 0 to let through all records
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+        # (tokens, last update, records dropped) of each line logging
+        self.buckets: Dict[Tuple[str, int], Tuple[float, float, int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno >= logging.ERROR:
+            return True
+        # the same filter is shared by all handlers, the record is counted once
+        accepted = getattr(record, 'rate_limit_accepted', None)
+        if accepted is not None:
+            return accepted
+        record.rate_limit_accepted = self.accept(record)
+        return record.rate_limit_accepted
+
+    def accept(self, record: logging.LogRecord) -> bool:
+        key = (record.pathname, record.lineno)
+        now = monotonic()
+        tokens, last, dropped = self.buckets.get(key, (self.rate, now, 0))
+        tokens = min(self.rate, tokens + (now - last) * self.rate)
+        if tokens < 1:
+            self.buckets[key] = (tokens, now, dropped + 1)
+            return False
+        self.buckets[key] = (tokens - 1, now, 0)
+        if dropped > 0:
+            record.msg = f'{record.getMessage()} ({dropped} similar messages dropped)'
+            record.args = None
+        return True
+
+
+def configure(config: ConfigParser) -> Optional[logging.handlers.QueueListener]:
+    """
+    Configures the root logger from the [LOGGING] section of the configuration
+
+    :return: the listener calling handlers (it must be stopped before exiting) if handlers are behind a queue
+    """
+    logging_config = config['LOGGING']
+    level = logging_config.get('level', 'ERROR')
+    log_on_console = bool(logging_config.get('console', 'False'))
+    filename = logging_config.get('filename', '/var/log/sc_driver.log')
+    max_bytes = int(logging_config.get('max_bytes', str(1024 * 1024)))
+    backup_count = int(logging_config.get('backup_count', str(5)))
+    queued = bool(logging_config.get('queue', 'False'))
+    rate_limit = float(logging_config.get('rate_limit', '0'))
+
+    log_format = '%(asctime)s - %(name)s - %(levelname)s -- %(message)s'
+    file_handler = logging.handlers.RotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backup_count)
+    file_handler.setFormatter(logging.Formatter(log_format))
+    handlers = [file_handler]
+    if log_on_console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(ColorFormatter(log_format))
+        handlers.append(console_handler)
+
+    listener = None
+    if queued:
+        queue = SimpleQueue()
+        listener = logging.handlers.QueueListener(queue, *handlers, respect_handler_level=True)
+        queue_handler = logging.handlers.QueueHandler(queue)
+        # the message (and the traceback, if any) is merged before queuing the record, handlers add the rest
+        queue_handler.setFormatter(logging.Formatter('%(message)s'))
+        handlers = [queue_handler]
+    # records are dropped before being queued or handled
+    rate_limit_filter = RateLimitFilter(rate_limit)
+    for handler in handlers:
+        handler.addFilter(rate_limit_filter)
+    # noinspection PyArgumentList
+    logging.basicConfig(level=level, handlers=handlers)
+    if listener is not None:
+        listener.start()
+    return listener
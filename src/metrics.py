@@ -0,0 +1,130 @@
+"""
+Low overhead instrumentation of the server, queried with the metrics command:
+
+    - Latency histograms of each stage (see STAGES) keyed by command name. Histograms have fixed buckets (see BUCKETS),
+      so recording a value is a binary search and a few increments, and the memory used doesn't depend on the number of
+      values recorded.
+    - Counters (see count), for instance bytes received and sent or frames dropped.
+    - Errors by type (see count_error).
+
+Values are updated from several threads (event loop, controller worker, render loop, UDP receiver), so they're updated
+under a lock held only for the update itself (never while executing commands or showing frames).
+"""
+
+from bisect import bisect_left
+from collections import defaultdict
+from threading import Lock
+from time import perf_counter
+from typing import Dict
+
+# upper bounds (in microseconds) of the buckets of histograms, the last bucket counts values above the last bound
+BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 1000000)
+
+# receive: splitting the stream in messages (not waiting for the client)
+# parse: decoding JSON and validating it against the command schema
+# validate: validating the arguments (see Command.validate_arguments)
+# exec: executing the command on the controller (it includes showing the strip on sync render mode)
+# show: writing the strip (see Controller.show), it's not tied to a command, so it's keyed by STRIP and the strip id
+# send: encoding and sending the response
+STAGES = ('receive', 'parse', 'validate', 'exec', 'show', 'send')
+
+# key of the histograms of stages not tied to a command (followed by the strip id, for instance strip:0)
+STRIP = 'strip'
+# key of the histograms of raw frames
+FRAME = 'frame'
+
+
+class Histogram:
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, us: float):
+        """
+        :param us: value in microseconds
+        """
+        self.counts[bisect_left(BUCKETS, us)] += 1
+        self.count += 1
+        self.total += us
+        if us > self.max:
+            self.max = us
+
+    def quantile(self, q: float) -> float:
+        """
+        :return: upper bound of the bucket containing the quantile q (the maximum for the last bucket)
+        """
+        rank = q * self.count
+        accumulated = 0
+        for i, count in enumerate(self.counts):
+            accumulated += count
+            if accumulated >= rank and count > 0:
+                return BUCKETS[i] if i < len(BUCKETS) else self.max
+        return 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'mean_us': self.total / self.count if self.count > 0 else 0.0,
+            'p50_us': self.quantile(0.5),
+            'p99_us': self.quantile(0.99),
+            'max_us': self.max,
+            'counts': list(self.counts)
+        }
+
+
+lock = Lock()
+started = perf_counter()
+histograms: Dict[str, Dict[str, Histogram]] = {stage: dict() for stage in STAGES}
+counters: Dict[str, int] = defaultdict(int)
+errors: Dict[str, int] = defaultdict(int)
+
+
+def observe(stage: str, command: str, seconds: float):
+    """
+    Records the duration of a stage (see STAGES) for a command
+    """
+    with lock:
+        histogram = histograms[stage].get(command)
+        if histogram is None:
+            histogram = histograms[stage][command] = Histogram()
+        histogram.observe(seconds * 1e6)
+
+
+def count(name: str, n: int = 1):
+    with lock:
+        counters[name] += n
+
+
+def count_error(e: Exception):
+    with lock:
+        errors[type(e).__name__] += 1
+
+
+def snapshot(reset: bool = False) -> dict:
+    """
+    Copies all metrics (the lock is held only while copying them)
+
+    :param reset: True to start counting again from zero
+    """
+    global started
+    with lock:
+        result = {
+            'elapsed': perf_counter() - started,
+            'buckets_us': list(BUCKETS),
+            'histograms': {stage: {command: histogram.to_dict() for command, histogram in by_command.items()}
+                           for stage, by_command in histograms.items()},
+            'counters': dict(counters),
+            'errors': dict(errors)
+        }
+        if reset:
+            started = perf_counter()
+            for by_command in histograms.values():
+                by_command.clear()
+            counters.clear()
+            errors.clear()
+    return result
@@ -1,7 +1,14 @@
 import socket
 import logging
+import metrics
+import startup
+from collections import deque
+from struct import Struct
+from time import perf_counter
+from typing import Union
 from configparser import ConfigParser
 from response import Response
+from strips import max_strip_length
 
 
 class ClientDisconnected(Exception):
@@ -10,6 +17,118 @@ class ClientDisconnected(Exception):
         pass
 
 
+class MessageTooLong(Exception):
+
+    def __init__(self, max_size: int):
+        self.msg = f'message exceeds {max_size} bytes'
+
+    def get_msg(self) -> str:
+        return self.msg
+
+
+class Frame(bytes):
+    """
+    RGB bytes of a raw frame along with the id of the strip addressed (see strips.py)
+    """
+
+    strip = 0
+
+
+class MessageReader:
+    """
+    Splits a stream of bytes in messages. Bytes are accumulated in a buffer and every complete message found is queued,
+    so several messages sent back-to-back are parsed at once. There are two kinds of messages:
+
+        - Commands: strings finalized with an end character, queued as str
+        - Raw frames: a header (FRAME_HEADER) with the FRAME_MARKER byte followed by the size of the payload, and the
+          payload (RGB bytes), queued as Frame. Frames for a strip other than the default one have a header
+          (STRIP_FRAME_HEADER) with the STRIP_FRAME_MARKER byte, the id of the strip and the size of the payload.
+
+    """
+
+    FRAME_MARKER = 0x00
+    FRAME_HEADER = Struct('!BI')
+    STRIP_FRAME_MARKER = 0x01
+    STRIP_FRAME_HEADER = Struct('!BBI')
+
+    def __init__(self, end_char: str, encoding: str, max_size: int, max_frame_size: int = 0):
+        self.end_byte = end_char.encode(encoding)
+        self.encoding = encoding
+        self.max_size = max_size
+        self.max_frame_size = max_frame_size
+        self.pending = bytearray()
+        self.messages = deque()
+        self.discarding = False
+        self.skip = 0
+        self.logger = logging.getLogger('MessageReader')
+
+    def reset(self):
+        """
+        Discards any partially received or queued message
+        """
+        self.pending.clear()
+        self.messages.clear()
+        self.discarding = False
+        self.skip = 0
+
+    def feed(self, data):
+        """
+        Appends data to the buffer and moves every complete message to the message queue. A MessageTooLong error is
+        queued instead of any command exceeding the maximum size, in that case bytes are discarded until the next end
+        character. Frames exceeding the maximum size are discarded (frames are not answered, so nothing is queued).
+
+        :param data: bytes-like object with received data
+        """
+        pending = self.pending
+        pending += data
+        start = 0
+        while start < len(pending):
+            if self.skip > 0:
+                skipped = min(self.skip, len(pending) - start)
+                self.skip -= skipped
+                start += skipped
+            elif not self.discarding and pending[start] in (self.FRAME_MARKER, self.STRIP_FRAME_MARKER):
+                header = self.FRAME_HEADER if pending[start] == self.FRAME_MARKER else self.STRIP_FRAME_HEADER
+                if len(pending) - start < header.size:
+                    break
+                if header is self.FRAME_HEADER:
+                    _, size = header.unpack_from(pending, start)
+                    strip = 0
+                else:
+                    _, strip, size = header.unpack_from(pending, start)
+                if size > self.max_frame_size:
+                    metrics.count('frames_discarded')
+                    self.logger.warning(f'Frame of {size} bytes discarded, it exceeds {self.max_frame_size} bytes')
+                    self.skip = size
+                    start += header.size
+                elif len(pending) - start - header.size >= size:
+                    start += header.size
+                    frame = Frame(pending[start:start + size])
+                    frame.strip = strip
+                    self.messages.append(frame)
+                    start += size
+                else:
+                    break
+            else:
+                end = pending.find(self.end_byte, start)
+                if end < 0:
+                    if self.discarding:
+                        start = len(pending)
+                    elif len(pending) - start > self.max_size:
+                        self.discarding = True
+                        self.messages.append(MessageTooLong(self.max_size))
+                        start = len(pending)
+                    break
+                if self.discarding:
+                    self.discarding = False
+                elif end - start > self.max_size:
+                    self.messages.append(MessageTooLong(self.max_size))
+                else:
+                    self.messages.append(pending[start:end].decode(self.encoding, 'replace'))
+                start = end + len(self.end_byte)
+        del pending[:start]
+
+
 class NetworkManager:
     """
     Manages the communication between sc-driver and sc-master sending and receiving messages specified in a simple
@@ -21,9 +140,12 @@ class NetworkManager:
 
     Messages MUST be finalized with a special string defined con config.ini
 
+    Incoming bytes are read in large chunks into a reusable buffer and split on the end character (see MessageReader),
+    so several messages sent back-to-back by the client are parsed from a single read and queued until requested.
+
     """
 
-    # TODO: test sending multiple commands in a short period of time
+    recv_chunk_size = 4096
 
     def __init__(self, config: ConfigParser):
         self.host = config['DEFAULT'].get('host', '0.0.0.0')
@@ -33,8 +155,14 @@ class NetworkManager:
         self.tcp_msg_encoding = config['DEFAULT'].get('tcp_msg_encoding', 'UTF-8')
         self.logger = logging.getLogger('NetworkManager')
         self.skt_server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.skt_server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.skt_client = None
         self.end_char = '\n'
+        self.max_frame_size = 3 * max_strip_length(config)
+        self.recv_buffer = bytearray(max(self.recv_chunk_size, self.tcp_max_msg_size, self.max_frame_size))
+        self.reader = MessageReader(self.end_char, self.tcp_msg_encoding, self.tcp_max_msg_size, self.max_frame_size)
+        # time spent receiving the last message in seconds, waiting for the client is not included (see metrics)
+        self.received = 0.0
 
     def start(self):
         """
@@ -43,6 +171,7 @@ class NetworkManager:
         self.skt_server.bind((self.host, self.port))
         self.skt_server.listen(self.tcp_max_queue)
         self.logger.info(f'Listening on {self.host}:{self.port}')
+        startup.mark('Listening')
 
     def stop(self):
         """
@@ -59,6 +188,7 @@ class NetworkManager:
         Accepts connection for ONLY ONE client
         """
         self.skt_client, address = self.skt_server.accept()
+        self.reader.reset()
         self.logger.info(f'New client connected from {address[0]}:{address[1]}')
 
     def disconnect_client(self):
@@ -69,37 +199,44 @@ class NetworkManager:
             self.skt_client.close()
             self.logger.info('Client socket closed')
 
-    def receive(self) -> str:
+    def receive(self) -> Union[str, bytes]:
         """
-        Receives a command from the client.
+        Receives a command (or a raw frame) from the client. Returns a queued message if there is one, otherwise reads
+        from the socket until at least one complete message is received.
 
-        :return: stringified JSON representation of the command
+        :return: stringified JSON representation of the command (without the end character) or a Frame
         :raises ClientDisconnected: if client disconnect from sc-driver
+        :raises MessageTooLong: if the message exceeds tcp_max_msg_size
         """
-        logger = logging.getLogger()
-
-        # Receiving headers
-        msg = ''
-        end = self.end_char.encode(self.tcp_msg_encoding)
-        chunk = self.skt_client.recv(1)
-        while len(chunk) > 0 and chunk != end:
-            msg += chunk.decode(self.tcp_msg_encoding)
-            chunk = self.skt_client.recv(1)
-        if len(chunk) == 0:
-            logger.warning('Client disconnected abruptly')
-            raise ClientDisconnected()
-        else:
-            msg += chunk.decode(self.tcp_msg_encoding)
-            logger.info(f'Message received: {msg}')
-            return msg
+        self.received = 0.0
+        while len(self.reader.messages) == 0:
+            size = self.skt_client.recv_into(self.recv_buffer)
+            if size == 0:
+                self.logger.warning('Client disconnected abruptly')
+                raise ClientDisconnected()
+            start = perf_counter()
+            self.reader.feed(memoryview(self.recv_buffer)[:size])
+            self.received += perf_counter() - start
+            metrics.count('bytes_in', size)
+
+        msg = self.reader.messages.popleft()
+        if isinstance(msg, MessageTooLong):
+            self.logger.warning(msg.get_msg())
+            raise msg
+        if isinstance(msg, str):
+            self.logger.info(f'Message received: {msg}')
+        return msg
 
     def send(self, response: Response):
         """
         Sends a message to the client.
         """
+        start = perf_counter()
         msg = (response.to_json() + self.end_char).encode(self.tcp_msg_encoding)
+        metrics.count('bytes_out', len(msg))
         sent = self.skt_client.send(msg)
         msg = msg[sent:]
         while len(msg) > 0:
             sent = self.skt_client.send(msg)
             msg = msg[sent:]
+        metrics.observe('send', response.command, perf_counter() - start)
@@ -0,0 +1,81 @@
+import sys
+from array import array
+from configparser import ConfigParser
+from operator import sub
+from typing import Tuple
+
+
+def lut(gamma: float, factor: float) -> bytes:
+    """
+    Builds a lookup table applying gamma correction and then scaling by factor (see bytes.translate)
+    """
+    return bytes(min(255, max(0, round(255 * factor * (v / 255) ** gamma))) for v in range(256))
+
+
+class OutputStage:
+    """
+    Corrects colors right before they are written on the strip (see Controller.show). Gamma, white balance and
+    brightness are combined in a lookup table per channel applied with bytes.translate over all leds at once, then
+    channels are placed in the order expected by the strip.
+
+    Channels are reordered only here: the ws281x driver is set up to send the bytes of the packed color as they are
+    (see driver.ws281x_strip_type), the byte at bits 16-23 first, then 8-15, 0-7 and (RGBW strips) 24-31.
+
+    :param gamma: gamma correction (1 to disable it)
+    :param white_balance: factor applied to each channel (red, green and blue)
+    :param brightness: factor applied to all channels
+    :param order: channels in the order they're sent on the wire (for instance GRB for most WS2812 strips), with W the
+                  white channel is extracted from the other ones (RGBW strips)
+    :raise ValueError: if order is not valid
+    """
+
+    def __init__(self, gamma: float = 1.0, white_balance: Tuple[float, float, float] = (1.0, 1.0, 1.0),
+                 brightness: float = 1.0, order: str = 'RGB'):
+        order = order.upper()
+        if sorted(order) not in [['B', 'G', 'R'], ['B', 'G', 'R', 'W']]:
+            raise ValueError(f'invalid color order {order}')
+        self.order = order
+        self.luts = [lut(gamma, brightness * factor) for factor in white_balance]
+        self.identity = order == 'RGB' and all(table == bytes(range(256)) for table in self.luts)
+        # offset of each byte of the packed color (from the most significant) on the buffer of an array('I')
+        self.offsets = [3, 2, 1, 0] if sys.byteorder == 'little' else [0, 1, 2, 3]
+        # byte of the packed color (from the most significant) sent on each position of the wire (see driver)
+        self.wire = [1, 2, 3, 0]
+
+    @staticmethod
+    def from_config(config: ConfigParser) -> 'OutputStage':
+        """
+        Builds the output stage from the [OUTPUT] section of the configuration (if any)
+        """
+        if not config.has_section('OUTPUT'):
+            return OutputStage()
+        output = config['OUTPUT']
+        white_balance = tuple(float(factor) for factor in output.get('white_balance', '1, 1, 1').split(','))
+        if len(white_balance) != 3:
+            raise ValueError('white_balance must have a factor for each channel (red, green and blue)')
+        return OutputStage(float(output.get('gamma', '1')), white_balance, float(output.get('brightness', '1')),
+                           output.get('order', 'RGB'))
+
+    def apply(self, colors: array) -> array:
+        """
+        :param colors: packed colors (see framebuffer.pack)
+        :return: corrected colors in the order expected by the strip
+        """
+        if self.identity:
+            return colors
+        raw = colors.tobytes()
+        offsets = self.offsets
+        channels = {
+            'R': raw[offsets[1]::4].translate(self.luts[0]),
+            'G': raw[offsets[2]::4].translate(self.luts[1]),
+            'B': raw[offsets[3]::4].translate(self.luts[2])
+        }
+        if 'W' in self.order:
+            white = bytes(map(min, channels['R'], channels['G'], channels['B']))
+            for channel in 'RGB':
+                channels[channel] = bytes(map(sub, channels[channel], white))
+            channels['W'] = white
+        result = bytearray(len(raw))
+        for byte, channel in zip(self.wire, self.order):
+            result[offsets[byte]::4] = channels[channel]
+        return array('I', result)
@@ -0,0 +1,329 @@
+import logging
+import os
+import sys
+from collections import Counter
+from configparser import ConfigParser
+from cProfile import Profile
+from os.path import exists, splitext
+from pstats import Stats
+from threading import Condition, Thread, Timer, Event, get_ident
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Set
+
+# profiling modes
+DETERMINISTIC = 'deterministic'
+SAMPLING = 'sampling'
+
+
+def rotate(filename: str, backup_count: int):
+    """
+    Renames filename to filename.1, filename.1 to filename.2 and so on (like logging.handlers.RotatingFileHandler), the
+    file beyond backup_count is removed
+    """
+    for i in range(backup_count - 1, 0, -1):
+        if exists(f'{filename}.{i}'):
+            os.replace(f'{filename}.{i}', f'{filename}.{i + 1}')
+    if exists(filename):
+        if backup_count > 0:
+            os.replace(filename, f'{filename}.1')
+        else:
+            os.remove(filename)
+
+
+def label(code) -> str:
+    return f'{os.path.basename(code.co_filename)}:{code.co_firstlineno}({code.co_name})'
+
+
+class Session:
+    """
+    Profiles the code executed within Profiler.run, until stopped (see Profiler.stop)
+
+    :param commands: number of commands to profile (None for no limit)
+    """
+
+    def __init__(self, commands: Optional[int]):
+        self.max_commands = commands
+        self.commands = 0
+        self.started = perf_counter()
+        self.elapsed = 0.0
+
+    def enter(self):
+        """
+        Called (on the thread that runs the code profiled) before running the code profiled
+
+        :raise Exception: if the code can't be profiled on this thread (it's run without profiling it)
+        """
+        pass
+
+    def exit(self):
+        """
+        Called (on the thread that runs the code profiled) after running the code profiled
+        """
+        pass
+
+    def stop(self):
+        """
+        Called once no other thread runs code profiled (on the thread stopping the session)
+        """
+        self.elapsed = perf_counter() - self.started
+
+    def hotspots(self, top: int) -> List[dict]:
+        """
+        :return: functions with the highest own time
+        """
+        raise NotImplemented()
+
+    def write(self, filename: str):
+        raise NotImplemented()
+
+
+class DeterministicSession(Session):
+    """
+    Profiles with cProfile, which traces only the thread where it's enabled, so there is a profile for each thread
+    running code profiled (they're merged when stopped). Since Python 3.12 only one profiler can be enabled at a time
+    in the whole interpreter (see sys.monitoring), so enter fails on a thread while another thread runs code profiled
+    (and that code is not profiled, see Profiler.run).
+    """
+
+    extension = '.prof'
+
+    def __init__(self, commands: Optional[int]):
+        super().__init__(commands)
+        self.profiles: Dict[int, Profile] = {}
+        self.stats: Optional[Stats] = None
+
+    def enter(self):
+        profile = self.profiles.get(get_ident())
+        if profile is None:
+            profile = Profile()
+            profile.enable()
+            self.profiles[get_ident()] = profile
+        else:
+            profile.enable()
+
+    def exit(self):
+        self.profiles[get_ident()].disable()
+
+    def stop(self):
+        super().stop()
+        profiles = list(self.profiles.values())
+        if get_ident() in self.profiles:
+            # the session is stopped by code profiled (for instance by the profile command)
+            self.profiles[get_ident()].disable()
+        if len(profiles) > 0:
+            self.stats = Stats(profiles[0])
+            for profile in profiles[1:]:
+                self.stats.add(profile)
+
+    def hotspots(self, top: int) -> List[dict]:
+        if self.stats is None:
+            return []
+        rows = sorted(self.stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:top]
+        return [{'function': f'{os.path.basename(filename)}:{line}({name})', 'calls': calls, 'self_ms': 1000 * tottime,
+                 'total_ms': 1000 * cumtime}
+                for (filename, line, name), (_, calls, tottime, cumtime, _) in rows]
+
+    def write(self, filename: str):
+        if self.stats is not None:
+            self.stats.dump_stats(filename)
+
+
+class SamplingSession(Session):
+    """
+    Takes the stack of every thread running code profiled each interval seconds from a separate thread. Unlike
+    cProfile, it doesn't slow down the code profiled (apart from holding the GIL while taking stacks), but functions
+    shorter than the interval may be missed.
+    """
+
+    extension = '.folded'
+
+    def __init__(self, commands: Optional[int], interval: float, active: Set[int]):
+        super().__init__(commands)
+        self.interval = interval
+        self.active = active
+        # number of times each stack (tuple of labels, from the outermost call) was sampled
+        self.samples: Counter = Counter()
+        self.stopped = Event()
+        self.sampler = Thread(target=self.sample, name='Sampler', daemon=True)
+        self.sampler.start()
+
+    def sample(self):
+        labels = {}
+        while not self.stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self.active):
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    name = labels.get(code)
+                    if name is None:
+                        name = labels[code] = label(code)
+                    stack.append(name)
+                    frame = frame.f_back
+                if len(stack) > 0:
+                    self.samples[tuple(reversed(stack))] += 1
+
+    def stop(self):
+        super().stop()
+        self.stopped.set()
+        self.sampler.join()
+
+    def hotspots(self, top: int) -> List[dict]:
+        own = Counter()
+        total = Counter()
+        for stack, count in self.samples.items():
+            own[stack[-1]] += count
+            for name in set(stack):
+                total[name] += count
+        return [{'function': name, 'samples': count, 'self_ms': 1000 * count * self.interval,
+                 'total_ms': 1000 * total[name] * self.interval}
+                for name, count in own.most_common(top)]
+
+    def write(self, filename: str):
+        # one line per stack with the functions separated by semicolons and the number of samples (as expected by
+        # flame graph tools)
+        with open(filename, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f'{";".join(stack)} {count}\n')
+
+
+class Profiler:
+    """
+    Profiles on demand (see profile command) the execution of commands and the render (see Dispatcher.execute and
+    Controller.show) for a bounded time or number of commands. When stopped, results are written on a rotating file
+    (pstats format for deterministic mode, folded stacks for sampling mode).
+
+    While not profiling, run only calls the function (the cost is an attribute lookup).
+
+    :param filename: file for the results, the extension is replaced by the one of the mode
+    :param backup_count: number of previous results kept (see rotate)
+    :param max_duration: maximum duration of a session in seconds
+    :param interval: seconds between samples on sampling mode
+    """
+
+    # seconds to wait for other threads to leave the code profiled when stopping
+    stop_timeout = 1.0
+
+    def __init__(self, filename: str, backup_count: int = 5, max_duration: float = 300, interval: float = 0.005):
+        self.filename = filename
+        self.backup_count = backup_count
+        self.max_duration = max_duration
+        self.interval = interval
+        self.session: Optional[Session] = None
+        self.timer: Optional[Timer] = None
+        self.top = 0
+        # summary of the last session (see stop)
+        self.last: Optional[dict] = None
+        # threads running code profiled
+        self.active: Set[int] = set()
+        self.condition = Condition()
+        self.logger = logging.getLogger('Profiler')
+
+    @staticmethod
+    def from_config(config: ConfigParser) -> 'Profiler':
+        """
+        Builds the profiler from the [PROFILE] section of the configuration (if any), results are written next to the
+        log by default
+        """
+        log_filename = config['LOGGING'].get('filename', '/var/log/sc_driver.log') \
+            if config.has_section('LOGGING') else 'sc-rpi.log'
+        default = os.path.join(os.path.dirname(log_filename), 'sc-rpi.prof')
+        if not config.has_section('PROFILE'):
+            return Profiler(default)
+        profile = config['PROFILE']
+        return Profiler(profile.get('filename', default), int(profile.get('backup_count', '5')),
+                        float(profile.get('max_duration', '300')), float(profile.get('interval', '0.005')))
+
+    def start(self, mode: str, duration: float, commands: Optional[int], top: int) -> dict:
+        """
+        Starts profiling, it stops after duration seconds (at most max_duration) or after the given number of commands
+
+        :raise ValueError: if already profiling
+        """
+        with self.condition:
+            if self.session is not None:
+                raise ValueError('profiler is already running')
+            duration = min(duration, self.max_duration)
+            self.top = top
+            self.session = SamplingSession(commands, self.interval, self.active) if mode == SAMPLING \
+                else DeterministicSession(commands)
+            self.timer = Timer(duration, self.stop)
+            self.timer.daemon = True
+            self.timer.start()
+        self.logger.info(f'Profiling ({mode}) for {duration} s or {commands} commands')
+        return {'mode': mode, 'duration': duration, 'commands': commands}
+
+    def stop(self) -> Optional[dict]:
+        """
+        Stops profiling and writes the results
+
+        :return: summary of the results (see summary) or None if not profiling
+        """
+        with self.condition:
+            session = self.session
+            if session is None:
+                return None
+            # from now on code is not profiled
+            self.session = None
+            if self.timer is not None:
+                self.timer.cancel()
+            ident = get_ident()
+            if not self.condition.wait_for(lambda: self.active <= {ident}, self.stop_timeout):
+                self.logger.warning('Stopping profiler while some thread is still running code profiled')
+            session.stop()
+        filename = splitext(self.filename)[0] + session.extension
+        try:
+            rotate(filename, self.backup_count)
+            session.write(filename)
+        except OSError as e:
+            self.logger.warning(f'Profiling results could not be written: {e}')
+            filename = None
+        self.last = {'file': filename, 'elapsed': session.elapsed, 'commands': session.commands,
+                     'hotspots': session.hotspots(self.top)}
+        self.logger.info(f'Profiling stopped after {session.elapsed:.1f} s, results written on {filename}')
+        return self.last
+
+    def run(self, fn: Callable, *args, command: bool = False):
+        """
+        Calls fn, profiling it if there's a session
+
+        :param command: True if fn executes a command (see Session.max_commands)
+        """
+        session = self.session
+        if session is None:
+            return fn(*args)
+        ident = get_ident()
+        with self.condition:
+            if self.session is not session or ident in self.active:
+                # stopped meanwhile, or nested call (already profiled)
+                session = None
+            else:
+                try:
+                    session.enter()
+                except Exception as e:
+                    self.logger.warning(f'Code not profiled: {e}')
+                    session = None
+                else:
+                    self.active.add(ident)
+        if session is None:
+            return fn(*args)
+        try:
+            return fn(*args)
+        finally:
+            with self.condition:
+                session.exit()
+                self.active.discard(ident)
+                if command:
+                    session.commands += 1
+                finished = self.session is session and session.max_commands is not None and \
+                    session.commands >= session.max_commands
+                self.condition.notify_all()
+            if finished:
+                self.stop()
+
+    def status(self) -> dict:
+        session = self.session
+        if session is None:
+            return {'running': False, 'last': self.last}
+        return {'running': True, 'elapsed': perf_counter() - session.started, 'commands': session.commands}
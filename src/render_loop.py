@@ -0,0 +1,73 @@
+import logging
+import metrics
+from threading import Thread, Event
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from controller import Controller
+
+
+class RenderLoop(Thread):
+    """
+    Shows the strip on its own thread, so commands only have to request a render (see Controller.render). Requests
+    received between two ticks are coalesced into a single frame, at most max_fps frames are shown per second and the
+    thread sleeps while nothing changes.
+
+    While some section has an effect (see Controller.set_effect) a frame is shown on every tick.
+
+    The duration of Controller.show is measured on each tick (exponential moving average) and the tick is extended when
+    showing a frame takes longer than the period given by max_fps.
+    """
+
+    # weight of the last measure on the moving average of the show duration
+    smoothing = 0.2
+
+    def __init__(self, controller: 'Controller', max_fps: float):
+        super().__init__(name='RenderLoop', daemon=True)
+        self.controller = controller
+        self.min_period = 1 / max_fps
+        self.period = self.min_period
+        self.show_duration = 0.0
+        self.frames = 0
+        self.requested = Event()
+        self.stopped = Event()
+        self.logger = logging.getLogger('RenderLoop')
+
+    def request(self):
+        """
+        Requests a new frame, it will be shown on the next tick
+        """
+        if self.requested.is_set():
+            metrics.count('renders_coalesced')
+        self.requested.set()
+
+    def stop(self):
+        self.stopped.set()
+        self.requested.set()
+
+    def run(self):
+        self.logger.info(f'Rendering at most {1 / self.min_period:.1f} frames per second')
+        next_tick = perf_counter()
+        while True:
+            # effects must be computed on every tick, stopped is checked since the request set by stop may have been
+            # cleared on the last tick
+            if len(self.controller.effects) == 0 and not self.stopped.is_set():
+                self.requested.wait()
+            if self.stopped.is_set():
+                break
+            delay = next_tick - perf_counter()
+            if delay > 0 and self.stopped.wait(delay):
+                # stopped while waiting for the next tick (it may be long with a low max_fps)
+                break
+            self.requested.clear()
+            start = perf_counter()
+            try:
+                self.controller.show()
+            except Exception as e:
+                self.logger.exception(e)
+            duration = perf_counter() - start
+            self.show_duration += self.smoothing * (duration - self.show_duration)
+            self.period = max(self.min_period, self.show_duration)
+            self.frames += 1
+            next_tick = start + self.period
@@ -3,9 +3,11 @@ from json import dumps
 
 class Response:
 
-    def __init__(self, status, result: dict):
+    def __init__(self, status, result: dict, command: str = ''):
         self.status = status
         self.result = result
+        # name of the command answered (see metrics)
+        self.command = command
 
     def to_json(self) -> str:
         """
@@ -0,0 +1,89 @@
+import re
+from typing import Any, Callable, Optional
+
+
+class Unsupported(Exception):
+    pass
+
+
+def _resolve(schema: dict, root: dict) -> dict:
+    ref = schema.get('$ref')
+    if ref is None:
+        return schema
+    if not ref.startswith('#/'):
+        raise Unsupported()
+    for key in ref[2:].split('/'):
+        root = root[key]
+    return root
+
+
+def _compile(schema: dict, root: dict) -> Callable[[Any], bool]:
+    schema = _resolve(schema, root)
+    keywords = set(schema.keys()) - {'$schema', '$defs', 'definitions', 'description'}
+    if not keywords <= {'type', 'properties', 'required', 'items', 'pattern', 'enum'}:
+        raise Unsupported()
+    checks = []
+
+    _type = schema.get('type')
+    if _type == 'object':
+        properties = {key: _compile(s, root) for key, s in schema.get('properties', {}).items()}
+        required = schema.get('required', [])
+
+        def check_object(instance):
+            if type(instance) is not dict:
+                return False
+            for key in required:
+                if key not in instance:
+                    return False
+            for key, check in properties.items():
+                if key in instance and not check(instance[key]):
+                    return False
+            return True
+        checks.append(check_object)
+    elif _type == 'array':
+        items = _compile(schema['items'], root) if 'items' in schema else None
+
+        def check_array(instance):
+            if type(instance) is not list:
+                return False
+            return items is None or all(items(item) for item in instance)
+        checks.append(check_array)
+    elif _type == 'string':
+        checks.append(lambda instance: type(instance) is str)
+    elif _type == 'integer':
+        # bool is a subclass of int but not an integer for JSON schema
+        checks.append(lambda instance: type(instance) is int)
+    elif _type == 'number':
+        checks.append(lambda instance: type(instance) in (int, float))
+    elif _type == 'boolean':
+        checks.append(lambda instance: type(instance) is bool)
+    elif _type is not None:
+        raise Unsupported()
+
+    if 'pattern' in schema:
+        search = re.compile(schema['pattern']).search
+        checks.append(lambda instance: type(instance) is not str or search(instance) is not None)
+    if 'enum' in schema:
+        enum = schema['enum']
+        checks.append(lambda instance: instance in enum)
+
+    if len(checks) == 1:
+        return checks[0]
+    return lambda instance: all(check(instance) for check in checks)
+
+
+def compile_schema(schema: dict) -> Optional[Callable[[Any], bool]]:
+    """
+    Generates a function that tests if an instance is valid against a JSON schema without the overhead of the generic
+    error iteration of jsonschema. Only a subset of JSON schema is supported (the one used on commands): type (object,
+    array, string, integer, number and boolean), properties, required, items, pattern, enum and local references ($ref).
+
+    The generated function may reject valid instances in some corner cases (for instance 1.0 as integer) so when it
+    returns False, the instance must be validated with jsonschema to know the errors.
+
+    :return: the generated function or None if the schema uses keywords not supported
+    """
+    try:
+        return _compile(schema, schema)
+    except Unsupported:
+        return None
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import metrics
+import startup
+from concurrent.futures import ThreadPoolExecutor
+from configparser import ConfigParser
+from time import perf_counter
+from typing import Optional
+from commands.disconnect import Disconnect
+from dispatcher import Dispatcher
+from network import Frame, MessageReader, MessageTooLong
+from response import Response
+from strips import DEFAULT_STRIP, max_strip_length
+
+
+class AsyncServer:
+    """
+    asyncio based SCP server. Unlike NetworkManager, it accepts many concurrent clients (for instance sc-master and
+    dashboards polling the status). Requests are read and parsed on the event loop, while commands from all clients are
+    executed one at a time on a worker thread of the strip they address (see strips.py), so a controller is never
+    accessed concurrently, a slow render does not block the event loop and strips are rendered in parallel.
+    """
+
+    recv_chunk_size = 4096
+
+    def __init__(self, config: ConfigParser, dispatcher: Dispatcher):
+        self.host = config['DEFAULT'].get('host', '0.0.0.0')
+        self.port = int(config['DEFAULT'].get('port', str(8000)))
+        self.tcp_max_queue = int(config['DEFAULT'].get('tcp_max_queue', str(10)))
+        self.tcp_max_msg_size = int(config['DEFAULT'].get('tcp_max_msg_size', str(1024)))
+        self.tcp_msg_encoding = config['DEFAULT'].get('tcp_msg_encoding', 'UTF-8')
+        self.max_frame_size = 3 * max_strip_length(config)
+        self.end_char = '\n'
+        self.dispatcher = dispatcher
+        # a worker thread for each strip
+        self.executors = {strip: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'Controller-{strip}')
+                          for strip in dispatcher.controllers.keys()}
+        self.logger = logging.getLogger('AsyncServer')
+
+    async def process(self, msg, received: float = 0.0) -> Optional[Response]:
+        """
+        Parses a message and executes the command on the worker thread of the strip, commands that are not exclusive
+        (see Command) are executed right away, on the event loop unless they may block
+
+        :param msg: a message (or MessageTooLong error) queued by the MessageReader
+        :param received: time spent receiving the message in seconds (see metrics)
+        :return: the response for the client or None if the client asked to disconnect
+        """
+        if isinstance(msg, MessageTooLong):
+            self.logger.warning(msg.get_msg())
+            return self.dispatcher.error_response(msg)
+        self.logger.info(f'Message received: {msg}')
+        try:
+            cmd = self.dispatcher.parse(msg, received)
+        except Exception as e:
+            return self.dispatcher.error_response(e)
+        if isinstance(cmd, Disconnect):
+            return None
+        loop = asyncio.get_running_loop()
+        if not cmd.exclusive:
+            if cmd.blocking:
+                return await loop.run_in_executor(None, self.dispatcher.execute, cmd)
+            return self.dispatcher.execute(cmd)
+        executor = self.executors[cmd.strip if cmd.strip is not None else DEFAULT_STRIP]
+        return await loop.run_in_executor(executor, self.dispatcher.execute, cmd)
+
+    async def handle_client(self, stream_reader: asyncio.StreamReader, stream_writer: asyncio.StreamWriter):
+        """
+        Serves a client until it disconnects (or sends the disconnect command)
+        """
+        address = stream_writer.get_extra_info('peername')
+        self.logger.info(f'New client connected from {address[0]}:{address[1]}')
+        reader = MessageReader(self.end_char, self.tcp_msg_encoding, self.tcp_max_msg_size, self.max_frame_size)
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                data = await stream_reader.read(max(self.recv_chunk_size, self.tcp_max_msg_size, self.max_frame_size))
+                if len(data) == 0:
+                    self.logger.warning('Client disconnected abruptly')
+                    return
+                start = perf_counter()
+                reader.feed(data)
+                # only the first message completed by this read is charged with the time spent receiving it
+                received = perf_counter() - start
+                metrics.count('bytes_in', len(data))
+                while len(reader.messages) > 0:
+                    msg = reader.messages.popleft()
+                    if isinstance(msg, Frame):
+                        executor = self.executors.get(msg.strip)
+                        if executor is None:
+                            # logged by the dispatcher
+                            self.dispatcher.dispatch_frame(msg, msg.strip)
+                        else:
+                            await loop.run_in_executor(executor, self.dispatcher.dispatch_frame, msg, msg.strip)
+                        continue
+                    response = await self.process(msg, received)
+                    received = 0.0
+                    if response is None:
+                        return
+                    start = perf_counter()
+                    msg = (response.to_json() + self.end_char).encode(self.tcp_msg_encoding)
+                    metrics.count('bytes_out', len(msg))
+                    stream_writer.write(msg)
+                    await stream_writer.drain()
+                    metrics.observe('send', response.command, perf_counter() - start)
+        except ConnectionResetError:
+            self.logger.warning('Client disconnected abruptly')
+        finally:
+            stream_writer.close()
+            self.logger.info(f'Client {address[0]}:{address[1]} socket closed')
+
+    async def serve(self):
+        """
+        Socket binding and listening, serves clients until cancelled
+        """
+        server = await asyncio.start_server(self.handle_client, self.host, self.port, backlog=self.tcp_max_queue)
+        self.logger.info(f'Listening on {self.host}:{self.port}')
+        startup.mark('Listening')
+        async with server:
+            await server.serve_forever()
+
+    def run(self):
+        """
+        Runs the server on a new event loop until interrupted
+        """
+        try:
+            asyncio.run(self.serve())
+        finally:
+            for executor in self.executors.values():
+                executor.shutdown(wait=True)
+            self.logger.info('Server socket closed.')
@@ -0,0 +1,20 @@
+"""
+Measures the startup time of the server: it must be the first module imported by main, so the time is measured since
+imports started. Stages are logged as they are reached (see mark), the last one is the execution of the first command,
+so time-to-first-command can be tracked on the log.
+"""
+
+import logging
+from time import perf_counter
+
+started = perf_counter()
+stages = dict()
+
+
+def mark(stage: str):
+    """
+    Records (and logs) the time elapsed since startup to reach a stage, only the first time the stage is reached
+    """
+    if stage not in stages:
+        stages[stage] = perf_counter() - started
+        logging.getLogger('Startup').info(f'{stage} after {1000 * stages[stage]:.1f} ms')
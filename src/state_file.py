@@ -0,0 +1,104 @@
+import mmap
+import os
+from array import array
+from struct import Struct
+from typing import List, Tuple, Optional
+
+
+class State:
+    """
+    State read from a StateFile (see StateFile.load)
+    """
+
+    __slots__ = ('instance', 'version', 'is_on', 'frame_written', 'sections', 'colors', 'pixels')
+
+    def __init__(self, instance: str, version: int, is_on: bool, frame_written: bool,
+                 sections: List[Tuple[str, int, int, bool]], colors: array, pixels: array):
+        self.instance = instance
+        self.version = version
+        self.is_on = is_on
+        self.frame_written = frame_written
+        self.sections = sections
+        self.colors = colors
+        self.pixels = pixels
+
+
+class StateFile:
+    """
+    Keeps the state of the controller on a memory-mapped file with a fixed layout, so it can be updated in place
+    (only the parts modified) and restored after a restart:
+
+        - header: see HEADER
+        - table of sections, one record (see RECORD) for each slot of the SectionManager (there can't be more sections
+          than leds, so there is one record per led)
+        - colors of the sections (packed, one 32 bits integer per led)
+        - last frame shown (packed, one 32 bits integer per led)
+
+    Integers are stored with the byte order of the machine (the file is not meant to be moved to another one). Changes
+    are written on the mapped memory only, so they survive the process but not necessarily a power loss.
+    """
+
+    # magic, byte order marker, format, strip length, state version, controller instance, is on, frame written and
+    # consistent (0 while sections are being written)
+    HEADER = Struct('=4sIIIQ36sBBBx')
+    # in use, is on, start, end and id
+    RECORD = Struct('=BBxxii36s')
+    MAGIC = b'SCST'
+    MARKER = 0x01020304
+    FORMAT = 1
+
+    def __init__(self, filename: str, strip_length: int):
+        self.strip_length = strip_length
+        self.records_offset = self.HEADER.size
+        self.colors_offset = self.records_offset + self.RECORD.size * strip_length
+        self.pixels_offset = self.colors_offset + 4 * strip_length
+        size = self.pixels_offset + 4 * strip_length
+        fd = os.open(filename, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            self.existing = os.fstat(fd).st_size == size
+            if not self.existing:
+                os.ftruncate(fd, size)
+            self.mmap = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self.memory = memoryview(self.mmap)
+        self.colors = self.memory[self.colors_offset:self.pixels_offset].cast('I')
+        self.pixels = self.memory[self.pixels_offset:].cast('I')
+
+    def load(self) -> Optional[State]:
+        """
+        :return: the stored state or None if the file is new, it was written by an incompatible version or it was not
+                 completely written
+        """
+        if not self.existing:
+            return None
+        magic, marker, _format, strip_length, version, instance, is_on, frame_written, consistent = \
+            self.HEADER.unpack_from(self.mmap, 0)
+        if (magic, marker, _format, strip_length, consistent) != (self.MAGIC, self.MARKER, self.FORMAT,
+                                                                  self.strip_length, 1):
+            return None
+        sections = []
+        for in_use, section_is_on, start, end, section_id in self.RECORD.iter_unpack(
+                self.memory[self.records_offset:self.colors_offset]):
+            if in_use:
+                sections.append((section_id.decode(), start, end, section_is_on == 1))
+        return State(instance.decode(), version, is_on == 1, frame_written == 1, sections, array('I', self.colors),
+                     array('I', self.pixels))
+
+    def write_header(self, instance: str, version: int, is_on: bool, frame_written: bool, consistent: bool = True):
+        self.HEADER.pack_into(self.mmap, 0, self.MAGIC, self.MARKER, self.FORMAT, self.strip_length, version,
+                              instance.encode(), is_on, frame_written, consistent)
+
+    def write_section(self, slot: int, section_id: str, start: int, end: int, is_on: bool):
+        self.RECORD.pack_into(self.mmap, self.records_offset + slot * self.RECORD.size, 1, is_on, start, end,
+                              section_id.encode())
+
+    def clear_section(self, slot: int):
+        self.RECORD.pack_into(self.mmap, self.records_offset + slot * self.RECORD.size, 0, 0, 0, 0, b'')
+
+    def close(self):
+        self.colors.release()
+        self.pixels.release()
+        self.memory.release()
+        self.mmap.flush()
+        self.mmap.close()
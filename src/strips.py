@@ -0,0 +1,98 @@
+"""
+Several strips can be driven by the same server (for instance one on each PWM channel), each one with its own
+Controller: sections, render loop, state file, etc. The [PIXEL_STRIP] section of the configuration defines the default
+strip (DEFAULT_STRIP) and other strips are defined on [PIXEL_STRIP:<id>] sections (id between 0 and 255, so it fits in
+the header of raw frames, see network.MessageReader), options not set there are taken from [PIXEL_STRIP].
+
+Commands and raw frames address a strip by id (the default strip if they don't).
+
+Up to two strips can use the ws281x driver, one on each PWM channel (channel 0 and 1): rpi_ws281x drives both channels
+from a single ws2811_t (sharing the PWM peripheral and the DMA channel), so they must use the same dma and freq_hz.
+Their strips are created together on a single driver.Ws281xDevice (see create_controllers) and shown one at a time.
+
+Frames received over UDP (see udp.py) are only written on the default strip.
+"""
+
+import re
+from configparser import ConfigParser
+from os.path import splitext
+from typing import Dict, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # not imported at runtime, so the size of frames can be computed without the controller (see network.py)
+    from controller import Controller
+
+DEFAULT_STRIP = 0
+
+SECTION = re.compile(r'^PIXEL_STRIP:(\d+)$')
+
+
+def strip_configs(config: ConfigParser) -> Dict[int, ConfigParser]:
+    """
+    Builds a configuration for each strip, where the [PIXEL_STRIP] section has the options of that strip (so they can
+    be passed to Controller). Each strip has its own state file (the id is added to the filename).
+
+    :return: configuration of each strip by id, the default strip first
+    :raise ValueError: if some strip id is not valid or strips using the ws281x driver can't share the device (see
+                       driver.Ws281xDevice)
+    """
+    configs = {DEFAULT_STRIP: config}
+    for section in config.sections():
+        if not section.startswith('PIXEL_STRIP:'):
+            continue
+        match = SECTION.match(section)
+        strip_id = int(match.group(1)) if match is not None else -1
+        if not 0 <= strip_id <= 255 or strip_id == DEFAULT_STRIP:
+            raise ValueError(f'invalid strip {section}, the id must be between 1 and 255')
+        strip_config = ConfigParser()
+        strip_config.read_dict(config)
+        defaults = config.defaults()
+        for key, value in config.items(section):
+            # options of the DEFAULT section are not overridden (unless they're set on the section of the strip)
+            if key not in defaults or defaults[key] != value:
+                strip_config['PIXEL_STRIP'][key] = value
+        strip_config['PIXEL_STRIP']['id'] = str(strip_id)
+        if strip_config.has_section('STATE'):
+            root, extension = splitext(strip_config['STATE'].get('filename', '../sc-rpi.state'))
+            strip_config['STATE']['filename'] = f'{root}.{strip_id}{extension}'
+        configs[strip_id] = strip_config
+    ws281x = [strip_config['PIXEL_STRIP'] for strip_config in configs.values()
+              if strip_config['PIXEL_STRIP'].get('driver', 'ws281x') == 'ws281x']
+    channels = [strip.get('channel') for strip in ws281x]
+    if len(set(channels)) != len(channels) or not set(channels) <= {'0', '1'}:
+        raise ValueError(f'strips using the ws281x driver must use different channels (0 or 1), not {channels}')
+    if len({(strip.get('dma'), strip.get('freq_hz')) for strip in ws281x}) > 1:
+        raise ValueError('strips using the ws281x driver must use the same dma and freq_hz')
+    return configs
+
+
+def max_strip_length(config: ConfigParser) -> int:
+    """
+    :return: number of leds of the longest strip
+    """
+    return max(int(strip_config['PIXEL_STRIP'].get('n')) for strip_config in strip_configs(config).values())
+
+
+def create_controllers(config: ConfigParser) -> Dict[int, 'Controller']:
+    """
+    Creates the controller of each strip (see strip_configs), controllers created are closed if some of them fails.
+    Strips using the ws281x driver share the same device (see driver.create_ws281x_strips). All controllers share the
+    profiler of the default strip, so the profile command profiles all strips.
+
+    :return: controller of each strip by id, the default strip first
+    """
+    from controller import Controller
+    from driver import create_ws281x_strips
+    configs = strip_configs(config)
+    ws281x = create_ws281x_strips(configs)
+    controllers = {}
+    try:
+        for strip_id, strip_config in configs.items():
+            controller = controllers[strip_id] = Controller(strip_config, ws281x.get(strip_id))
+            if strip_id != DEFAULT_STRIP:
+                controller.profiler = controllers[DEFAULT_STRIP].profiler
+    except Exception:
+        for controller in controllers.values():
+            controller.close()
+        raise
+    return controllers
@@ -0,0 +1,93 @@
+from command import CommandParser
+from controller import Controller
+from dispatcher import Dispatcher
+from configparser import ConfigParser
+from json import dumps
+import logging
+import unittest
+
+
+class TestBatch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        config = ConfigParser()
+        config.read('../config.ini')
+        config['PIXEL_STRIP']['driver'] = 'simulated'
+        config['PIXEL_STRIP']['timing'] = '0'
+        config['RENDER'] = {'mode': 'sync'}
+        config['OUTPUT'] = {'order': 'RGB'}
+        config['STATE'] = {'enabled': '0'}
+        logging.basicConfig(level=None)
+        cls.controller = Controller(config=config)
+        cls.dispatcher = Dispatcher(CommandParser(), cls.controller)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.controller.close()
+
+    def setUp(self) -> None:
+        self.controller.remove_all_sections()
+        self.controller.is_on = True
+        self.section_id = self.controller.new_section(0, 9, (1, 1, 1))
+        self.controller.render()
+        self.frames = self.controller.strip.frames
+        self.version = self.controller.section_manager.version
+
+    def batch(self, *commands: dict):
+        return self.dispatcher.dispatch(dumps({'name': 'batch', 'args': {'commands': list(commands)}}))
+
+    @staticmethod
+    def add(start: int, end: int) -> dict:
+        return {'name': 'section_add', 'args': {'sections': [{'start': start, 'end': end, 'color': '#ff0000'}]}}
+
+    def assert_unchanged(self):
+        self.assertEqual([(0, 9)], [s.limits for s in self.controller.section_manager.list_sections()])
+        self.assertEqual(self.version, self.controller.section_manager.version)
+        self.assertEqual(self.frames, self.controller.strip.frames)
+
+    def test_invalid_command(self):
+        response = self.batch(self.add(20, 29), {'name': 'section_add', 'args': {}}, self.add(40, 49))
+        self.assertEqual(400, response.status.value)
+        self.assertIn('args.commands[1]', response.result[0])
+        self.assertEqual(400, self.batch(self.add(20, 29), {'name': 'unknown'}).status.value)
+        self.assertEqual(400, self.batch({'name': 'disconnect'}).status.value)
+        self.assert_unchanged()
+
+    def test_rollback(self):
+        edit = {'name': 'section_edit', 'args': {'section_id': 'x', 'color': '#000000'}}
+        response = self.batch(self.add(20, 29), edit, self.add(40, 49))
+        self.assertEqual(409, response.status.value)
+        self.assertIn('commands[1]', response.result['error'])
+        self.assert_unchanged()
+
+    def test_redundant_turn_off(self):
+        response = self.batch({'name': 'turn_off'}, {'name': 'turn_off'})
+        self.assertEqual(409, response.status.value)
+        self.assertTrue(self.controller.is_on)
+        response = self.batch(self.add(20, 29), {'name': 'turn_on', 'args': {'section_id': 'x'}})
+        self.assertEqual(409, response.status.value)
+        self.assert_unchanged()
+
+    def test_single_render(self):
+        response = self.batch(self.add(20, 29), {'name': 'turn_off', 'args': {'section_id': self.section_id}},
+                              {'name': 'section_edit', 'args': {'section_id': self.section_id, 'color': '#00ff00'}},
+                              {'name': 'turn_on', 'args': {'section_id': self.section_id}})
+        self.assertEqual(200, response.status.value)
+        self.assertEqual(self.frames + 1, self.controller.strip.frames)
+        self.assertEqual(0x00ff00, self.controller.strip.shown[0])
+        self.assertEqual(0xff0000, self.controller.strip.shown[20])
+
+    def test_results(self):
+        response = self.batch(self.add(20, 29), {'name': 'status'},
+                              {'name': 'turn_off', 'args': {'section_id': self.section_id}})
+        self.assertEqual(200, response.status.value)
+        results = response.result['results']
+        self.assertEqual(3, len(results))
+        section_id = results[0]['sections'][0]
+        self.assertEqual([self.section_id, section_id], [s['id'] for s in results[1]['current_sections']])
+        self.assertEqual({}, results[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,25 @@
+from color import parse_color, to_hex
+import unittest
+
+
+class TestParsingColors(unittest.TestCase):
+
+    def test_hex(self):
+        self.assertEqual((255, 128, 0), parse_color('#ff8000'))
+        self.assertEqual((255, 128, 0), parse_color('#FF8000'))
+        self.assertEqual((255, 136, 0), parse_color('#f80'))
+        for c in ['ff8000', '#ff800', '#gg8000', '#+f8000', '#f_8000', '# f8000', '#']:
+            self.assertRaises(ValueError, parse_color, c)
+
+    def test_rgb(self):
+        self.assertEqual((255, 128, 0), parse_color('rgb(255,128,0)'))
+        for c in ['rgb(256,0,0)', 'rgb(1,2)', 'rgb(1, 2, 3)', 'rgb(-1,2,3)', 'rgb(,2,3)', 'rgb(1,2,3', '']:
+            self.assertRaises(ValueError, parse_color, c)
+
+    def test_to_hex(self):
+        self.assertEqual('#ff0a00', to_hex((255, 10, 0)))
+        self.assertEqual('#ff0a00', to_hex(parse_color('#FF0A00')))
+
+
+if __name__ == '__main__':
+    unittest.main()
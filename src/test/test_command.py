@@ -0,0 +1,37 @@
+from os import listdir
+from os.path import abspath, dirname, join
+from inflector import Inflector
+from jsonschema import Draft7Validator
+from command import CommandParser
+from commands import registry
+from error import ParseError
+import unittest
+
+
+class TestRegistry(unittest.TestCase):
+
+    def test_registry(self):
+        # the registry must contain every module on the commands package
+        path = join(dirname(dirname(abspath(__file__))), 'commands')
+        modules = [file_name[:-3] for file_name in listdir(path) if file_name.endswith('.py')]
+        modules.remove('__init__')
+        inflector = Inflector()
+        self.assertEqual({module: inflector.camelize(module) for module in modules}, registry)
+
+    def test_schemas(self):
+        parser = CommandParser()
+        for name in registry.keys():
+            cls = parser.get_class(name)
+            if cls.arguments_schema is not None:
+                Draft7Validator.check_schema(cls.arguments_schema)
+
+    def test_lazy_import(self):
+        parser = CommandParser()
+        self.assertEqual({}, parser.classes)
+        parser.parse('{"name": "status"}')
+        self.assertEqual(['status'], list(parser.classes.keys()))
+        self.assertRaises(ParseError, parser.parse, '{"name": "unknown"}')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,11 @@
-from controller import Controller
+from controller import Controller, SectionManager
 from error import Overlapping
 from configparser import ConfigParser
 from random import randint
+from tempfile import TemporaryDirectory
+from os.path import join
+from threading import Event, Thread
+from time import sleep
 import logging
 import unittest
 
@@ -12,6 +16,7 @@ class TestCreatingSections(unittest.TestCase):
     def setUpClass(cls) -> None:
         config = ConfigParser()
         config.read('../config.ini')
+        config['PIXEL_STRIP']['driver'] = 'simulated'
         logging.basicConfig(level=None)
         cls.controller = Controller(config=config)
 
@@ -92,6 +97,7 @@ class TestRemovingSections(unittest.TestCase):
     def setUpClass(cls) -> None:
         config = ConfigParser()
         config.read('../config.ini')
+        config['PIXEL_STRIP']['driver'] = 'simulated'
         logging.basicConfig(level=None)
         cls.controller = Controller(config=config)
 
@@ -126,6 +132,7 @@ class TestEditingSections(unittest.TestCase):
     def setUpClass(cls) -> None:
         config = ConfigParser()
         config.read('../config.ini')
+        config['PIXEL_STRIP']['driver'] = 'simulated'
         logging.basicConfig(level=None)
         cls.controller = Controller(config=config)
 
@@ -150,6 +157,306 @@ class TestEditingSections(unittest.TestCase):
         self.assertEqual((0, 0, 0), self.controller.concatenate_sections()[0])
         self.assertEqual(color, self.controller.concatenate_sections()[21])
 
+    def test_overlapping(self):
+        s1_id = self.controller.new_section(0, 9, (1, 1, 1))
+        s2_id = self.controller.new_section(20, 29, (2, 2, 2))
+        s3_id = self.controller.new_section(40, 49, (3, 3, 3))
+        self.assertRaises(Overlapping, self.controller.edit_section, s2_id, 5, 25)
+        self.assertRaises(Overlapping, self.controller.edit_section, s2_id, 25, 45)
+        self.assertRaises(Overlapping, self.controller.edit_section, s1_id, 0, 20)
+        self.assertRaises(Overlapping, self.controller.edit_section, s3_id, 15, 35)
+        self.assertRaises(ValueError, self.controller.edit_section, s3_id, 45, 400)
+        self.assertEqual([(0, 9), (20, 29), (40, 49)],
+                         [s.limits for s in self.controller.section_manager.list_sections()])
+        self.controller.edit_section(s2_id, 10, 39)
+        self.controller.edit_section(s1_id, 50, 59)
+        self.controller.edit_section(s3_id, 0, 9)
+        self.assertEqual([(0, 9), (10, 39), (50, 59)],
+                         [s.limits for s in self.controller.section_manager.list_sections()])
+        self.assertEqual((1, 1, 1), self.controller.concatenate_sections()[55])
+
+    def test_not_copied(self):
+        section_id = self.controller.new_section(0, 100, (0, 0, 0))
+        colors = self.controller.section_manager.colors
+        self.controller.edit_section(section_id, 20, 100, (1, 2, 3))
+        self.assertIs(colors, self.controller.section_manager.colors)
+
+
+class TestRollingBack(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        config = ConfigParser()
+        config.read('../config.ini')
+        config['PIXEL_STRIP']['driver'] = 'simulated'
+        logging.basicConfig(level=None)
+        cls.controller = Controller(config=config)
+
+    def setUp(self) -> None:
+        self.controller.remove_all_sections()
+
+    def test_rollback(self):
+        s1_id = self.controller.new_section(0, 9, (1, 1, 1))
+        snapshot = self.controller.snapshot()
+        self.controller.remove_sections([s1_id])
+        self.controller.new_section(5, 20, (2, 2, 2))
+        self.controller.rollback(snapshot)
+        self.assertEqual([s1_id], [s.id for s in self.controller.section_manager.list_sections()])
+        self.assertEqual((1, 1, 1), self.controller.concatenate_sections()[9])
+        self.assertEqual((0, 0, 0), self.controller.concatenate_sections()[10])
+
+    def test_failed_edit(self):
+        self.controller.new_section(0, 9, (1, 1, 1))
+        s2_id = self.controller.new_section(10, 19, (2, 2, 2))
+        self.assertRaises(Overlapping, self.controller.edit_section, s2_id, 5, 19)
+        self.assertEqual((10, 19), self.controller.get_section(s2_id).limits)
+        self.assertEqual((2, 2, 2), self.controller.concatenate_sections()[10])
+
+    def test_diff(self):
+        section_manager = self.controller.section_manager
+        removed_id = self.controller.new_section(0, 10, (1, 1, 1))
+        changed_id = self.controller.new_section(20, 30, (2, 2, 2))
+        version = section_manager.version
+        added_id = self.controller.new_section(40, 50, (3, 3, 3))
+        self.controller.set_color((4, 4, 4), changed_id)
+        self.controller.remove_sections([removed_id])
+        self.assertEqual(([added_id], [removed_id], [changed_id]), section_manager.diff(version))
+        self.assertEqual(([], [], []), section_manager.diff(section_manager.version))
+
+
+class TestResuming(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        config = ConfigParser()
+        config.read('../config.ini')
+        config['PIXEL_STRIP']['driver'] = 'simulated'
+        logging.basicConfig(level=None)
+        cls.controller = Controller(config=config)
+
+    def test_resume(self):
+        state = self.controller.resume()
+        self.assertFalse(state['in_sync'])
+        self.assertTrue(self.controller.resume(state['instance'], state['version'])['in_sync'])
+        self.controller.turn_off()
+        self.assertFalse(self.controller.resume(state['instance'], state['version'])['in_sync'])
+        self.controller.turn_on()
+        self.assertFalse(self.controller.resume('other', self.controller.resume()['version'])['in_sync'])
+
+
+class TestStatus(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        config = ConfigParser()
+        config.read('../config.ini')
+        config['PIXEL_STRIP']['driver'] = 'simulated'
+        logging.basicConfig(level=None)
+        cls.controller = Controller(config=config)
+
+    def setUp(self) -> None:
+        self.controller.remove_all_sections()
+
+    def test_cache(self):
+        self.controller.new_section(0, 9, (1, 1, 1))
+        status = self.controller.status()
+        self.assertIs(status['current_sections'], self.controller.status()['current_sections'])
+        self.controller.new_section(10, 19, (2, 2, 2))
+        self.assertEqual(2, len(self.controller.status()['current_sections']))
+        # versions after a snapshot are reached again after rolling back
+        snapshot = self.controller.snapshot()
+        self.controller.new_section(20, 29, (3, 3, 3))
+        self.assertEqual(3, self.controller.status()['total_sections'])
+        self.controller.rollback(snapshot)
+        self.controller.new_section(30, 39, (4, 4, 4))
+        self.assertEqual('#040404', self.controller.status()['current_sections'][2]['color'])
+
+    def test_since_version(self):
+        removed_id = self.controller.new_section(0, 9, (1, 1, 1))
+        changed_id = self.controller.new_section(10, 19, (2, 2, 2))
+        version = self.controller.status()['version']
+        added_id = self.controller.new_section(20, 29, (3, 3, 3))
+        self.controller.set_color((4, 4, 4), changed_id)
+        self.controller.remove_sections([removed_id])
+        status = self.controller.status(since_version=version)
+        self.assertEqual([added_id], [s['id'] for s in status['added']])
+        self.assertEqual([removed_id], status['removed'])
+        self.assertEqual(['#040404'], [s['color'] for s in status['changed']])
+        self.assertNotIn('current_sections', status)
+        # changes no longer recorded (or a version of another instance)
+        self.assertEqual(2, len(self.controller.status(since_version=-1)['current_sections']))
+        self.assertEqual(2, len(self.controller.status(since_version=status['version'] + 1)['current_sections']))
+
+    def test_pagination(self):
+        ids = self.controller.new_sections([(i, i, (i, i, i)) for i in range(10)])
+        status = self.controller.status(offset=4, limit=3)
+        self.assertEqual(10, status['total_sections'])
+        self.assertEqual(ids[4:7], [s['id'] for s in status['current_sections']])
+        self.assertEqual(ids[8:], [s['id'] for s in self.controller.status(offset=8, limit=3)['current_sections']])
+
+
+class TestPersistingState(unittest.TestCase):
+
+    def test_restart(self):
+        with TemporaryDirectory() as directory:
+            config = ConfigParser()
+            config.read('../config.ini')
+            config['PIXEL_STRIP']['driver'] = 'simulated'
+            config['STATE'] = {'enabled': '1', 'filename': join(directory, 'sc-rpi.state')}
+            controller = Controller(config=config)
+            s1_id = controller.new_section(0, 9, (1, 1, 1))
+            s2_id = controller.new_section(10, 19, (2, 2, 2))
+            controller.persist()
+            controller.edit_section(s1_id, 20, 29, (3, 3, 3))
+            controller.turn_off(s2_id)
+            controller.render()
+            controller.persist()
+            status = controller.status()
+            controller.close()
+
+            controller = Controller(config=config)
+            self.assertEqual(status, controller.status())
+            self.assertEqual((3, 3, 3), controller.concatenate_sections()[20])
+            self.assertEqual((0, 0, 0), controller.concatenate_sections()[0])
+            self.assertEqual(0x030303, controller.framebuffer.pixels[20])
+            controller.close()
+
+
+class TestSectionStorage(unittest.TestCase):
+
+    def setUp(self) -> None:
+        config = ConfigParser()
+        config.read('../config.ini')
+        self.manager = SectionManager(config)
+
+    def test_columns(self):
+        s1_id = self.manager.new_section(0, 9, (1, 2, 3))
+        s2_id = self.manager.new_section(20, 29, (4, 5, 6))
+        self.manager.set_section_off(s2_id)
+        self.assertEqual([s1_id, s2_id], self.manager.ids)
+        self.assertEqual([0, 20], list(self.manager.starts))
+        self.assertEqual([9, 29], list(self.manager.ends))
+        self.assertEqual(0b01, self.manager.on_mask)
+        self.assertEqual(0x010203, self.manager.colors[9])
+        self.assertEqual(0, self.manager.colors[10])
+        section = self.manager.get_section(s2_id)
+        self.assertEqual(((20, 29), False, (4, 5, 6)), (section.limits, section.is_on, section.color))
+
+    def test_slot_reuse(self):
+        s1_id = self.manager.new_section(0, 9, (1, 1, 1))
+        self.manager.new_section(20, 29, (2, 2, 2))
+        self.manager.remove_sections([s1_id])
+        self.assertEqual(0, self.manager.colors[0])
+        self.assertEqual([None], self.manager.ids[:1])
+        s3_id = self.manager.new_section(40, 49, (3, 3, 3))
+        self.assertEqual(0, self.manager.slots[s3_id])
+        self.assertEqual(2, len(self.manager.ids))
+        self.assertEqual((40, 49), self.manager.get_section(s3_id).limits)
+        self.assertTrue(self.manager.get_section(s3_id).is_on)
+        self.assertEqual([(20, 29), (40, 49)], [s.limits for s in self.manager.list_sections()])
+
+    def test_concatenate(self):
+        s1_id = self.manager.new_section(0, 9, (1, 1, 1))
+        self.manager.new_section(10, 19, (2, 2, 2))
+        self.manager.set_section_off(s1_id)
+        colors = self.manager.concatenate()
+        self.assertEqual(self.manager.strip_length, len(colors))
+        self.assertEqual([0, 0x020202, 0], [colors[5], colors[15], colors[25]])
+        self.assertEqual([0, 0x020202], list(self.manager.concatenate(9, 10)))
+
+
+class TestSectionIndex(unittest.TestCase):
+
+    def setUp(self) -> None:
+        config = ConfigParser()
+        config.read('../config.ini')
+        self.manager = SectionManager(config)
+
+    def limits(self):
+        return [s.limits for s in self.manager.list_sections()]
+
+    def test_insertion_order(self):
+        for start in [50, 10, 90, 30, 70, 0]:
+            self.manager.new_section(start, start + 9, (1, 1, 1))
+        self.assertEqual([0, 10, 30, 50, 70, 90], list(self.manager.order_starts))
+        self.assertEqual([start for start, _ in self.limits()], list(self.manager.order_starts))
+        self.assertEqual([self.manager.starts[slot] for slot in self.manager.order], list(self.manager.order_starts))
+
+    def test_boundaries(self):
+        self.manager.new_section(10, 19, (1, 1, 1))
+        # adjacent sections don't overlap
+        self.manager.new_section(20, 29, (1, 1, 1))
+        self.manager.new_section(0, 9, (1, 1, 1))
+        # sharing a led overlaps
+        self.assertRaises(Overlapping, self.manager.new_section, 29, 35, (1, 1, 1))
+        self.manager.new_section(40, 49, (1, 1, 1))
+        self.assertRaises(Overlapping, self.manager.new_section, 30, 40, (1, 1, 1))
+        self.assertRaises(Overlapping, self.manager.new_section, 5, 5, (1, 1, 1))
+        self.assertRaises(Overlapping, self.manager.new_section, 0, 299, (1, 1, 1))
+        self.manager.new_section(30, 39, (1, 1, 1))
+        self.assertEqual([(0, 9), (10, 19), (20, 29), (30, 39), (40, 49)], self.limits())
+
+    def test_bulk_overlapping_within_batch(self):
+        self.manager.new_section(100, 109, (1, 1, 1))
+        self.assertRaises(Overlapping, self.manager.new_sections, [(0, 9, (1, 1, 1)), (20, 29, (1, 1, 1)),
+                                                                   (9, 15, (1, 1, 1))])
+        self.assertRaises(Overlapping, self.manager.new_sections, [(50, 59, (1, 1, 1)), (50, 59, (1, 1, 1))])
+        self.assertEqual([(100, 109)], self.limits())
+
+    def test_bulk_overlapping_existing(self):
+        self.manager.new_section(100, 109, (1, 1, 1))
+        version = self.manager.version
+        self.assertRaises(Overlapping, self.manager.new_sections, [(0, 9, (1, 1, 1)), (105, 120, (1, 1, 1))])
+        self.assertRaises(ValueError, self.manager.new_sections, [(0, 9, (1, 1, 1)), (290, 300, (1, 1, 1))])
+        self.assertEqual([(100, 109)], self.limits())
+        self.assertEqual(version, self.manager.version)
+
+    def test_bulk_merge(self):
+        self.manager.new_sections([(40, 49, (1, 1, 1)), (0, 9, (1, 1, 1))])
+        ids = self.manager.new_sections([(50, 59, (2, 2, 2)), (20, 29, (3, 3, 3)), (10, 19, (4, 4, 4))])
+        self.assertEqual([(0, 9), (10, 19), (20, 29), (40, 49), (50, 59)], self.limits())
+        self.assertEqual([(50, 59), (20, 29), (10, 19)], [self.manager.get_section(i).limits for i in ids])
+        self.assertEqual((4, 4, 4), self.manager.get_section(ids[2]).color)
+
+
+class TestShowingFrames(unittest.TestCase):
+
+    def test_strip_not_modified_while_shown(self):
+        config = ConfigParser()
+        config.read('../config.ini')
+        config['PIXEL_STRIP']['driver'] = 'simulated'
+        config['PIXEL_STRIP']['timing'] = '0'
+        controller = Controller(config=config)
+        strip = controller.strip
+        showing = Event()
+        torn = []
+        set_pixel_color = strip.setPixelColor
+
+        def show():
+            showing.set()
+            sleep(0.001)
+            showing.clear()
+
+        def check_pixel_color(n: int, color: int):
+            if showing.is_set():
+                torn.append(n)
+            set_pixel_color(n, color)
+
+        strip.show = show
+        strip.setPixelColor = check_pixel_color
+
+        def write_frames(color: int):
+            for _ in range(50):
+                controller.write_frame(bytes([color]) * 30)
+
+        threads = [Thread(target=write_frames, args=(color,)) for color in (1, 2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        controller.close()
+        self.assertEqual([], torn)
+
 
 if __name__ == '__main__':
     unittest.main()
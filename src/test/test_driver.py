@@ -0,0 +1,171 @@
+from configparser import ConfigParser
+from controller import Controller
+from driver import SimulatedStrip, ws281x_strip_type
+from framebuffer import pack
+from threading import Thread
+from time import sleep
+from types import ModuleType
+from unittest import mock
+import logging
+import re
+import strips
+import unittest
+
+
+class FakeWs:
+    """
+    Replaces rpi_ws281x.ws (available only on the Raspberry): structs are dicts, each render records the leds of both
+    channels and leds written while rendering are counted (see TestWs281xDevice)
+    """
+
+    WS2811_STRIP_RGB = 0x00100800
+    SK6812_STRIP_RGBW = 0x18100800
+
+    def __init__(self, render_time: float = 0):
+        self.devices = []
+        self.render_time = render_time
+        self.rendered = []
+        self.rendering = 0
+        self.max_rendering = 0
+        self.written_while_rendering = 0
+
+    def __getattr__(self, name):
+        # ws2811_t_<field>_set, ws2811_channel_t_<field>_set and ws2811_channel_t_<field>_get
+        match = re.match(r'^ws2811(?:_channel)?_t_(\w+)_(set|get)$', name)
+        if match is None:
+            raise AttributeError(name)
+        field, operation = match.groups()
+        if operation == 'set':
+            return lambda struct, value: struct.__setitem__(field, value)
+        return lambda struct: struct[field]
+
+    def new_ws2811_t(self):
+        leds = {'channels': [{'leds': {}}, {'leds': {}}], 'initialized': 0}
+        self.devices.append(leds)
+        return leds
+
+    def ws2811_channel_get(self, leds, channel):
+        return leds['channels'][channel]
+
+    def ws2811_init(self, leds):
+        leds['initialized'] += 1
+        return 0
+
+    def ws2811_render(self, leds):
+        self.rendering += 1
+        self.max_rendering = max(self.max_rendering, self.rendering)
+        sleep(self.render_time)
+        self.rendered.append([[channel['leds'].get(i, 0) for i in range(channel['count'])]
+                              for channel in leds['channels']])
+        self.rendering -= 1
+        return 0
+
+    def ws2811_led_set(self, channel, n, color):
+        if self.rendering > 0:
+            self.written_while_rendering += 1
+        channel['leds'][n] = color
+
+    def ws2811_led_get(self, channel, n):
+        return channel['leds'].get(n, 0)
+
+    def ws2811_fini(self, leds):
+        pass
+
+    def delete_ws2811_t(self, leds):
+        pass
+
+
+class TestSimulatingStrip(unittest.TestCase):
+
+    def test_wire_time(self):
+        strip = SimulatedStrip(100, 800000, reset_us=300)
+        self.assertAlmostEqual(0.0033, strip.wire_time)
+        strip.show()
+        start, end = strip.frame_times[-1]
+        self.assertGreaterEqual(end - start, strip.wire_time)
+        self.assertEqual(1, strip.frames)
+
+    def test_ws281x_strip_type(self):
+        self.assertEqual('WS2811_STRIP_RGB', ws281x_strip_type('RGB'))
+        self.assertEqual('WS2811_STRIP_RGB', ws281x_strip_type('GRB'))
+        self.assertEqual('SK6812_STRIP_RGBW', ws281x_strip_type('grbw'))
+
+    def test_show(self):
+        config = ConfigParser()
+        config.read('../config.ini')
+        config['PIXEL_STRIP']['driver'] = 'simulated'
+        config['OUTPUT']['order'] = 'GRB'
+        logging.basicConfig(level=None)
+        controller = Controller(config=config)
+        controller.new_section(10, 19, (1, 2, 3))
+        controller.render()
+        # colors are shown as sent on the wire
+        self.assertEqual(pack((2, 1, 3)), controller.strip.shown[10])
+        self.assertEqual(0, controller.strip.shown[20])
+        controller.close()
+
+
+class TestWs281xDevice(unittest.TestCase):
+
+    def setUp(self) -> None:
+        config = ConfigParser()
+        config.read('../config.ini')
+        config['PIXEL_STRIP']['driver'] = 'ws281x'
+        config['PIXEL_STRIP']['channel'] = '0'
+        config['OUTPUT']['order'] = 'RGB'
+        config['STATE'] = {'enabled': '0'}
+        config['RENDER'] = {'mode': 'sync'}
+        config['PIXEL_STRIP:1'] = {'n': '50', 'pin': '13', 'channel': '1'}
+        logging.basicConfig(level=None)
+        self.config = config
+
+    def create_controllers(self, ws: FakeWs) -> dict:
+        rpi_ws281x = ModuleType('rpi_ws281x')
+        rpi_ws281x.ws = ws
+        with mock.patch.dict('sys.modules', rpi_ws281x=rpi_ws281x):
+            controllers = strips.create_controllers(self.config)
+        self.addCleanup(lambda: [controller.close() for controller in controllers.values()])
+        return controllers
+
+    def test_two_channels(self):
+        ws = FakeWs()
+        controllers = self.create_controllers(ws)
+        self.assertEqual(1, len(ws.devices))
+        leds = ws.devices[0]
+        self.assertEqual(1, leds['initialized'])
+        self.assertEqual((10, 800000), (leds['dmanum'], leds['freq']))
+        self.assertEqual([(300, 18, ws.WS2811_STRIP_RGB), (50, 13, ws.WS2811_STRIP_RGB)],
+                         [(channel['count'], channel['gpionum'], channel['strip_type'])
+                          for channel in leds['channels']])
+        self.assertIs(controllers[0].show_lock, controllers[1].show_lock)
+        controllers[1].new_section(0, 9, (255, 0, 0))
+        controllers[1].render()
+        self.assertEqual(([0] * 300, [0xff0000] * 10 + [0] * 40), tuple(ws.rendered[-1]))
+        controllers[0].new_section(290, 299, (0, 0, 255))
+        controllers[0].render()
+        # the other channel keeps its last frame
+        self.assertEqual(([0] * 290 + [0xff] * 10, [0xff0000] * 10 + [0] * 40), tuple(ws.rendered[-1]))
+
+    def test_show_serialized(self):
+        ws = FakeWs(render_time=0.002)
+        controllers = self.create_controllers(ws)
+
+        def show(controller: Controller, color: tuple):
+            for i in range(20):
+                controller.write_frame(bytes(color) * (i + 1))
+
+        threads = [Thread(target=show, args=(controllers[0], (1, 2, 3))),
+                   Thread(target=show, args=(controllers[1], (4, 5, 6)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, ws.max_rendering)
+        self.assertEqual(0, ws.written_while_rendering)
+        channel_0, channel_1 = ws.rendered[-1]
+        self.assertEqual([0x010203] * 20, channel_0[:20])
+        self.assertEqual([0x040506] * 20, channel_1[:20])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+from configparser import ConfigParser
+from controller import Controller
+from effects import effects, Rainbow, Chase
+from framebuffer import pack
+import logging
+import unittest
+
+
+class TestComputingEffects(unittest.TestCase):
+
+    def test_length(self):
+        for effect in effects.values():
+            for length in [1, 7, 300]:
+                self.assertEqual(length, len(effect(length, 1.0, [pack((1, 2, 3))], 1).render(0.5)))
+
+    def test_rainbow(self):
+        effect = Rainbow(100, 1.0, [], 1)
+        frame = effect.render(0)
+        self.assertEqual(frame[:90], effect.render(0.1)[10:])
+        self.assertEqual(frame[10:], Rainbow(100, 1.0, [], -1).render(0.1)[:90])
+
+    def test_resize(self):
+        effect = Chase(10, 1.0, [pack((1, 2, 3))], 1)
+        effect.resize(50)
+        self.assertEqual(50, len(effect.render(0.3)))
+
+
+class TestBindingEffects(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        config = ConfigParser()
+        config.read('../config.ini')
+        config['PIXEL_STRIP']['driver'] = 'simulated'
+        logging.basicConfig(level=None)
+        cls.controller = Controller(config=config)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.controller.close()
+
+    def setUp(self) -> None:
+        self.controller.remove_all_sections()
+
+    def test_animate(self):
+        section_id = self.controller.new_section(10, 19, (1, 1, 1))
+        with self.controller.lock:
+            # the render loop is started by set_effect
+            self.controller.set_effect(section_id, Rainbow(10, 1.0, [], 1))
+            self.controller.animate(0)
+            self.assertEqual(Rainbow(10, 1.0, [], 1).render(0), self.controller.framebuffer.pixels[10:20])
+            self.controller.set_effect(section_id, None)
+        self.assertEqual(pack((1, 1, 1)), self.controller.framebuffer.pixels[10])
+
+    def test_rollback(self):
+        section_id = self.controller.new_section(10, 19, (1, 1, 1))
+        with self.controller.lock:
+            snapshot = self.controller.snapshot()
+            self.controller.set_effect(section_id, Rainbow(10, 1.0, [], 1))
+            self.controller.animate(0)
+            self.controller.rollback(snapshot)
+        self.assertEqual({}, self.controller.effects)
+        self.assertEqual(pack((1, 1, 1)), self.controller.framebuffer.pixels[10])
+
+    def test_removed_section(self):
+        section_id = self.controller.new_section(10, 19, (1, 1, 1))
+        self.controller.set_effect(section_id, Rainbow(10, 1.0, [], 1))
+        self.controller.remove_sections([section_id])
+        self.controller.animate(0)
+        self.assertEqual({}, self.controller.effects)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+from controller import Controller
+from framebuffer import FrameBuffer, pack
+from configparser import ConfigParser
+from array import array
+import logging
+import unittest
+
+
+class TestDirtyRanges(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.framebuffer = FrameBuffer(100)
+
+    def test_merging(self):
+        self.framebuffer.mark_dirty(50, 59)
+        self.framebuffer.mark_dirty(0, 9)
+        self.framebuffer.mark_dirty(20, 29)
+        self.assertEqual([(0, 9), (20, 29), (50, 59)], self.framebuffer.take_dirty())
+        self.assertEqual([], self.framebuffer.take_dirty())
+
+    def test_adjacent_and_overlapping(self):
+        self.framebuffer.mark_dirty(10, 19)
+        self.framebuffer.mark_dirty(20, 29)
+        self.framebuffer.mark_dirty(25, 35)
+        self.framebuffer.mark_dirty(12, 15)
+        self.framebuffer.mark_dirty(37, 40)
+        self.assertEqual([(10, 35), (37, 40)], self.framebuffer.take_dirty())
+
+    def test_collapse(self):
+        for i in range(FrameBuffer.max_dirty_ranges):
+            self.framebuffer.mark_dirty(i + 1, i + 1)
+        self.framebuffer.mark_dirty(0, 0)
+        self.assertEqual(1, len(self.framebuffer.dirty))
+        self.framebuffer.mark_dirty(99, 99)
+        self.assertEqual([(0, 64), (99, 99)], self.framebuffer.take_dirty())
+
+    def test_fill_and_write(self):
+        self.framebuffer.fill(10, 19, pack((1, 2, 3)))
+        self.framebuffer.write(30, array('I', [1, 2, 3]))
+        self.framebuffer.write(50, array('I'))
+        self.assertEqual([(10, 19), (30, 32)], self.framebuffer.take_dirty())
+        self.assertEqual(0x010203, self.framebuffer.pixels[19])
+        self.assertEqual(3, self.framebuffer.pixels[32])
+
+
+class TestRenderingDirtyLeds(unittest.TestCase):
+
+    def setUp(self) -> None:
+        config = ConfigParser()
+        config.read('../config.ini')
+        config['PIXEL_STRIP']['driver'] = 'simulated'
+        config['PIXEL_STRIP']['timing'] = '0'
+        config['RENDER'] = {'mode': 'sync'}
+        config['STATE'] = {'enabled': '0'}
+        logging.basicConfig(level=None)
+        self.controller = Controller(config=config)
+        self.written = []
+        set_pixel_color = self.controller.strip.setPixelColor
+
+        def count_pixel_color(n: int, color: int):
+            self.written.append(n)
+            set_pixel_color(n, color)
+
+        self.controller.strip.setPixelColor = count_pixel_color
+
+    def tearDown(self) -> None:
+        self.controller.close()
+
+    def test_only_dirty_leds(self):
+        s1_id = self.controller.new_section(0, 9, (1, 1, 1))
+        s2_id = self.controller.new_section(100, 119, (2, 2, 2))
+        self.controller.render()
+        self.assertEqual(list(range(10)) + list(range(100, 120)), sorted(self.written))
+        self.written.clear()
+        self.controller.set_color((3, 3, 3), s2_id)
+        self.controller.render()
+        self.assertEqual(list(range(100, 120)), sorted(self.written))
+        self.written.clear()
+        self.controller.turn_off(s1_id)
+        self.controller.render()
+        self.assertEqual(list(range(10)), sorted(self.written))
+        self.assertEqual(0, self.controller.strip.shown[0])
+        self.assertEqual(0x030303, self.controller.strip.shown[110])
+        self.written.clear()
+        self.controller.render()
+        self.assertEqual([], self.written)
+
+
+if __name__ == '__main__':
+    unittest.main()
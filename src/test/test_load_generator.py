@@ -0,0 +1,78 @@
+from command import CommandParser
+from controller import Controller
+from dispatcher import Dispatcher
+from server import AsyncServer
+from configparser import ConfigParser
+from threading import Thread
+import load_generator
+import asyncio
+import logging
+import socket
+import unittest
+
+
+class TestLoadGenerator(unittest.TestCase):
+
+    def setUp(self) -> None:
+        with socket.socket() as skt:
+            skt.bind(('127.0.0.1', 0))
+            port = skt.getsockname()[1]
+        config = ConfigParser()
+        config.read('../config.ini')
+        config['DEFAULT']['host'] = '127.0.0.1'
+        config['DEFAULT']['port'] = str(port)
+        config['PIXEL_STRIP']['driver'] = 'simulated'
+        config['PIXEL_STRIP']['timing'] = '0'
+        config['STATE'] = {'enabled': '0'}
+        logging.basicConfig(level=None)
+        self.controller = Controller(config)
+        self.server = AsyncServer(config, Dispatcher(CommandParser(), self.controller))
+        self.loop = asyncio.new_event_loop()
+        self.task = self.loop.create_task(self.server.serve())
+        self.thread = Thread(target=self.serve)
+        self.thread.start()
+        for _ in range(100):
+            try:
+                socket.create_connection(('127.0.0.1', port)).close()
+                break
+            except ConnectionRefusedError:
+                self.thread.join(0.01)
+        self.port = port
+
+    def serve(self):
+        try:
+            self.loop.run_until_complete(self.task)
+        except asyncio.CancelledError:
+            pass
+
+    def tearDown(self) -> None:
+        self.loop.call_soon_threadsafe(self.task.cancel)
+        self.thread.join()
+        self.loop.close()
+        for executor in self.server.executors.values():
+            executor.shutdown()
+        self.controller.close()
+
+    def test_mix(self):
+        mix = load_generator.parse_mix(['churn=1', 'edit', 'status=2', 'batch=1'])
+        results = load_generator.run('127.0.0.1', self.port, 2, 0, 0.3, mix, self.controller.strip_length)
+        self.assertEqual([], results['failures'])
+        self.assertEqual(0, results['errors'])
+        self.assertEqual(set(mix.keys()), set(results['operations'].keys()))
+        # sections of each connection are removed when disconnecting
+        self.assertEqual([], self.controller.section_manager.list_sections())
+
+    def test_frames(self):
+        mix = load_generator.parse_mix(['edit', 'frame'])
+        results = load_generator.run('127.0.0.1', self.port, 1, 0, 0.2, mix, self.controller.strip_length)
+        self.assertEqual(0, results['errors'])
+        self.assertEqual(set(mix.keys()), set(results['operations'].keys()))
+        self.assertRaises(ValueError, load_generator.run, '127.0.0.1', self.port, 2, 0, 0.2, mix,
+                          self.controller.strip_length)
+
+    def test_unknown_operation(self):
+        self.assertRaises(ValueError, load_generator.parse_mix, ['flood=1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+from logs import ColorFormatter, RateLimitFilter
+import logging
+import unittest
+
+
+def record(msg: str, level: int = logging.INFO, lineno: int = 1) -> logging.LogRecord:
+    return logging.LogRecord('Test', level, 'test.py', lineno, msg, None, None)
+
+
+class TestColorFormatter(unittest.TestCase):
+
+    def test_format(self):
+        r = record('%s received', logging.WARNING)
+        r.args = ('message',)
+        formatted = ColorFormatter('%(levelname)s %(message)s').format(r)
+        self.assertEqual('\x1b[33;1mWARNING\x1b[0m \x1b[33;1mmessage received\x1b[0m', formatted)
+        # other handlers get the record unchanged
+        self.assertEqual('WARNING', r.levelname)
+        self.assertEqual('%s received', r.msg)
+        self.assertEqual('message received', logging.Formatter('%(message)s').format(r))
+
+
+class TestRateLimitFilter(unittest.TestCase):
+
+    def test_rate_limit(self):
+        rate_limit_filter = RateLimitFilter(3)
+        results = [rate_limit_filter.filter(record('message received')) for _ in range(5)]
+        self.assertEqual([True, True, True, False, False], results)
+        # other lines have their own limit, errors are never dropped
+        self.assertTrue(rate_limit_filter.filter(record('other message', lineno=2)))
+        self.assertTrue(rate_limit_filter.filter(record('error', logging.ERROR)))
+        # a record evaluated by one handler is not counted again by the next one
+        r = record('message received', lineno=3)
+        self.assertTrue(rate_limit_filter.filter(r))
+        self.assertTrue(rate_limit_filter.filter(r))
+
+    def test_dropped_count(self):
+        rate_limit_filter = RateLimitFilter(1)
+        rate_limit_filter.filter(record('message received'))
+        rate_limit_filter.filter(record('message received'))
+        key = ('test.py', 1)
+        tokens, last, dropped = rate_limit_filter.buckets[key]
+        # as if a second elapsed
+        rate_limit_filter.buckets[key] = (tokens, last - 1, dropped)
+        r = record('message received')
+        self.assertTrue(rate_limit_filter.filter(r))
+        self.assertEqual('message received (1 similar messages dropped)', r.getMessage())
+
+    def test_disabled(self):
+        rate_limit_filter = RateLimitFilter(0)
+        self.assertTrue(all(rate_limit_filter.filter(record('message received')) for _ in range(100)))
+
+
+if __name__ == '__main__':
+    unittest.main()
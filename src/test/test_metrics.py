@@ -0,0 +1,77 @@
+from command import CommandParser
+from controller import Controller
+from dispatcher import Dispatcher
+from configparser import ConfigParser
+from json import dumps
+from threading import Thread, Event
+import metrics
+import logging
+import unittest
+
+
+class TestHistogram(unittest.TestCase):
+
+    def test_buckets(self):
+        histogram = metrics.Histogram()
+        for us in [5, 10, 11, 400, 2 * metrics.BUCKETS[-1]]:
+            histogram.observe(us)
+        self.assertEqual(5, histogram.count)
+        self.assertEqual(2, histogram.counts[0])
+        self.assertEqual(1, histogram.counts[1])
+        self.assertEqual(1, histogram.counts[metrics.BUCKETS.index(500)])
+        self.assertEqual(1, histogram.counts[-1])
+        self.assertEqual(25, histogram.quantile(0.5))
+        self.assertEqual(2 * metrics.BUCKETS[-1], histogram.quantile(0.99))
+
+
+class TestMetrics(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        config = ConfigParser()
+        config.read('../config.ini')
+        config['PIXEL_STRIP']['driver'] = 'simulated'
+        config['RENDER'] = {'mode': 'sync'}
+        logging.basicConfig(level=None)
+        cls.dispatcher = Dispatcher(CommandParser(), Controller(config=config))
+
+    def setUp(self) -> None:
+        metrics.snapshot(reset=True)
+
+    def dispatch(self, name: str, args: dict = None) -> dict:
+        return self.dispatcher.dispatch(dumps({'name': name, 'args': args or {}}), 0.001).result
+
+    def test_stages(self):
+        self.dispatch('status')
+        self.dispatch('section_edit', {'section_id': 'unknown'})
+        self.dispatch('unknown')
+        result = self.dispatch('metrics', {'reset': True})
+        for stage in ['receive', 'parse', 'validate', 'exec']:
+            self.assertEqual(1, result['histograms'][stage]['status']['count'], stage)
+        self.assertEqual(1000, result['histograms']['receive']['status']['max_us'])
+        self.assertEqual(1, result['errors']['ParseError'])
+        self.assertEqual(sum(result['errors'].values()), 2)
+        self.assertEqual({}, self.dispatch('metrics')['errors'])
+
+    def test_not_exclusive(self):
+        # metrics must not wait for the controller (for instance while showing a frame)
+        locked = Event()
+        release = Event()
+
+        def hold():
+            with self.dispatcher.controller.lock:
+                locked.set()
+                release.wait(5)
+
+        thread = Thread(target=hold)
+        thread.start()
+        try:
+            locked.wait(5)
+            self.assertIn('counters', self.dispatch('metrics'))
+        finally:
+            release.set()
+            thread.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
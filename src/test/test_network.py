@@ -0,0 +1,75 @@
+from network import NetworkManager, ClientDisconnected, MessageTooLong, MessageReader
+from configparser import ConfigParser
+import socket
+import unittest
+
+
+class TestReceivingMessages(unittest.TestCase):
+
+    def setUp(self) -> None:
+        config = ConfigParser()
+        config.read('../config.ini')
+        self.network_manager = NetworkManager(config)
+        self.network_manager.skt_client, self.master = socket.socketpair()
+
+    def tearDown(self) -> None:
+        self.network_manager.skt_client.close()
+        self.network_manager.skt_server.close()
+        self.master.close()
+
+    def test_single_message(self):
+        self.master.sendall(b'{"name": "status"}\n')
+        self.assertEqual('{"name": "status"}', self.network_manager.receive())
+
+    def test_pipelined_messages(self):
+        self.master.sendall(b'{"name": "reset"}\n{"name": "status"}\n{"name": "disc')
+        self.assertEqual('{"name": "reset"}', self.network_manager.receive())
+        self.assertEqual('{"name": "status"}', self.network_manager.receive())
+        self.master.sendall(b'onnect"}\n')
+        self.assertEqual('{"name": "disconnect"}', self.network_manager.receive())
+
+    def test_message_too_long(self):
+        max_size = self.network_manager.tcp_max_msg_size
+        self.master.sendall(b'x' * (max_size + 1) + b'\n{"name": "status"}\n')
+        self.assertRaises(MessageTooLong, self.network_manager.receive)
+        self.assertEqual('{"name": "status"}', self.network_manager.receive())
+
+    def test_unterminated_message_too_long(self):
+        max_size = self.network_manager.tcp_max_msg_size
+        self.master.sendall(b'x' * (2 * max_size))
+        self.assertRaises(MessageTooLong, self.network_manager.receive)
+        self.master.sendall(b'x' * max_size + b'\n{"name": "status"}\n')
+        self.assertEqual('{"name": "status"}', self.network_manager.receive())
+
+    def test_frames(self):
+        frame = bytes(range(30))
+        header = MessageReader.FRAME_HEADER.pack(MessageReader.FRAME_MARKER, len(frame))
+        self.master.sendall(b'{"name": "status"}\n' + header + frame + header + frame[:10])
+        self.assertEqual('{"name": "status"}', self.network_manager.receive())
+        self.assertEqual(frame, self.network_manager.receive())
+        self.master.sendall(frame[10:] + b'{"name": "reset"}\n')
+        self.assertEqual(frame, self.network_manager.receive())
+        self.assertEqual('{"name": "reset"}', self.network_manager.receive())
+
+    def test_strip_frames(self):
+        frame = bytes(range(30))
+        header = MessageReader.STRIP_FRAME_HEADER.pack(MessageReader.STRIP_FRAME_MARKER, 2, len(frame))
+        self.master.sendall(header + frame + MessageReader.FRAME_HEADER.pack(MessageReader.FRAME_MARKER, 3) + b'abc')
+        msg = self.network_manager.receive()
+        self.assertEqual((frame, 2), (msg, msg.strip))
+        msg = self.network_manager.receive()
+        self.assertEqual((b'abc', 0), (msg, msg.strip))
+
+    def test_frame_too_long(self):
+        frame = b'\n' * (self.network_manager.max_frame_size + 3)
+        header = MessageReader.FRAME_HEADER.pack(MessageReader.FRAME_MARKER, len(frame))
+        self.master.sendall(header + frame + b'{"name": "status"}\n')
+        self.assertEqual('{"name": "status"}', self.network_manager.receive())
+
+    def test_client_disconnected(self):
+        self.master.close()
+        self.assertRaises(ClientDisconnected, self.network_manager.receive)
+
+
+if __name__ == '__main__':
+    unittest.main()
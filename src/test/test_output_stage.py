@@ -0,0 +1,30 @@
+from array import array
+from output_stage import OutputStage
+from framebuffer import pack
+import unittest
+
+
+class TestCorrectingColors(unittest.TestCase):
+
+    def test_identity(self):
+        colors = array('I', [pack((1, 2, 3)), pack((255, 128, 0))])
+        self.assertIs(colors, OutputStage().apply(colors))
+
+    def test_order(self):
+        colors = array('I', [pack((1, 2, 3))])
+        self.assertEqual(array('I', [0x020103]), OutputStage(order='GRB').apply(colors))
+        # white is sent last on RGBW strips, it's placed on the most significant byte (see driver)
+        self.assertEqual(array('I', [0x01000102]), OutputStage(order='RGBW').apply(colors))
+        self.assertEqual(array('I', [0x02010001]), OutputStage(order='WRGB').apply(colors))
+
+    def test_corrections(self):
+        colors = array('I', [pack((255, 255, 255)), pack((128, 128, 128))])
+        output_stage = OutputStage(gamma=2, white_balance=(1, 0.5, 0), brightness=0.5)
+        self.assertEqual(array('I', [pack((128, 64, 0)), pack((32, 16, 0))]), output_stage.apply(colors))
+
+    def test_invalid_order(self):
+        self.assertRaises(ValueError, OutputStage, order='RGG')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+from command import CommandParser
+from controller import Controller
+from dispatcher import Dispatcher
+from configparser import ConfigParser
+from json import dumps
+from os import listdir
+from os.path import join, exists
+from pstats import Stats
+from tempfile import TemporaryDirectory
+from profiling import rotate
+from time import perf_counter
+from unittest.mock import patch
+import logging
+import unittest
+
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = TemporaryDirectory()
+        config = ConfigParser()
+        config.read('../config.ini')
+        config['PIXEL_STRIP']['driver'] = 'simulated'
+        config['PIXEL_STRIP']['timing'] = '0'
+        config['RENDER'] = {'mode': 'sync'}
+        config['PROFILE'] = {'filename': join(self.directory.name, 'sc-rpi.prof'), 'backup_count': '1',
+                             'interval': '0.001'}
+        logging.basicConfig(level=None)
+        self.dispatcher = Dispatcher(CommandParser(), Controller(config=config))
+
+    def tearDown(self) -> None:
+        self.dispatcher.controller.close()
+        self.directory.cleanup()
+
+    def dispatch(self, name: str, args: dict = None):
+        return self.dispatcher.dispatch(dumps({'name': name, 'args': args or {}}))
+
+    def test_deterministic(self):
+        self.assertEqual(200, self.dispatch('profile', {'action': 'start', 'commands': 3, 'top': 5}).status.value)
+        self.assertEqual(409, self.dispatch('profile', {'action': 'start'}).status.value)
+        for _ in range(3):
+            self.dispatch('section_add', {'sections': [{'start': 0, 'end': 9, 'color': '#ff0000'}]})
+            self.dispatch('reset')
+        status = self.dispatch('profile', {'action': 'status'}).result
+        self.assertFalse(status['running'])
+        last = status['last']
+        self.assertEqual(3, last['commands'])
+        self.assertEqual(5, len(last['hotspots']))
+        # the render is profiled along with commands
+        self.assertIn('_show', [name for _, _, name in Stats(last['file']).stats.keys()])
+        self.assertEqual(409, self.dispatch('profile', {'action': 'stop'}).status.value)
+
+    def test_sampling(self):
+        self.dispatch('profile', {'action': 'start', 'mode': 'sampling'})
+        for _ in range(20):
+            self.dispatch('section_add', {'sections': [{'start': 0, 'end': 299, 'color': '#ff0000'}]})
+            self.dispatch('reset')
+        result = self.dispatch('profile', {'action': 'stop'}).result
+        self.assertTrue(result['file'].endswith('.folded'))
+        self.assertTrue(exists(result['file']))
+        self.assertEqual(40, result['commands'])
+
+    def test_enter_fails(self):
+        # since Python 3.12, cProfile can't be enabled while another thread is profiled
+        profiler = self.dispatcher.controller.profiler
+        self.dispatch('profile', {'action': 'start'})
+        with patch('profiling.Profile.enable', side_effect=ValueError('another profiling tool is already active')):
+            response = self.dispatch('section_add', {'sections': [{'start': 0, 'end': 9, 'color': '#ff0000'}]})
+        self.assertEqual(200, response.status.value)
+        self.assertEqual(set(), profiler.active)
+        started = perf_counter()
+        self.assertEqual(200, self.dispatch('profile', {'action': 'stop'}).status.value)
+        self.assertLess(perf_counter() - started, profiler.stop_timeout)
+
+    def test_rotate(self):
+        filename = join(self.directory.name, 'results')
+        for i in range(3):
+            rotate(filename, 2)
+            with open(filename, 'w') as f:
+                f.write(str(i))
+        self.assertEqual(['results', 'results.1', 'results.2'], sorted(listdir(self.directory.name)))
+        with open(filename + '.2') as f:
+            self.assertEqual('0', f.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
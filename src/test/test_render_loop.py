@@ -0,0 +1,107 @@
+from controller import Controller
+from configparser import ConfigParser
+from time import perf_counter, sleep
+import logging
+import metrics
+import unittest
+
+
+class TestRenderLoop(unittest.TestCase):
+
+    def create_controller(self, max_fps: float, reset_us: float = 300, timing: bool = False) -> Controller:
+        config = ConfigParser()
+        config.read('../config.ini')
+        config['PIXEL_STRIP']['driver'] = 'simulated'
+        config['PIXEL_STRIP']['timing'] = '1' if timing else '0'
+        config['PIXEL_STRIP']['reset_us'] = str(reset_us)
+        config['RENDER'] = {'mode': 'loop', 'max_fps': str(max_fps)}
+        config['STATE'] = {'enabled': '0'}
+        logging.basicConfig(level=None)
+        controller = Controller(config=config)
+        self.addCleanup(controller.close)
+        return controller
+
+    @staticmethod
+    def wait_frames(controller: Controller, frames: int, timeout: float = 1.0):
+        deadline = perf_counter() + timeout
+        while controller.strip.frames < frames and perf_counter() < deadline:
+            sleep(0.001)
+
+    def test_coalescing(self):
+        controller = self.create_controller(max_fps=10)
+        section_id = controller.new_section(0, 9, (1, 1, 1))
+        controller.render()
+        self.wait_frames(controller, 1)
+        coalesced = metrics.snapshot()['counters'].get('renders_coalesced', 0)
+        for i in range(20):
+            controller.set_color((i, i, i), section_id)
+            controller.render()
+        self.wait_frames(controller, 2)
+        sleep(0.15)
+        # the first request is shown on the next tick, the rest are coalesced into (at most) one more frame
+        self.assertLessEqual(controller.strip.frames, 3)
+        self.assertGreater(metrics.snapshot()['counters'].get('renders_coalesced', 0), coalesced)
+        self.assertEqual(0x131313, controller.strip.shown[0])
+
+    def test_max_fps(self):
+        controller = self.create_controller(max_fps=20)
+        section_id = controller.new_section(0, 9, (1, 1, 1))
+        controller.render()
+        started = perf_counter()
+        i = 0
+        while perf_counter() - started < 0.3:
+            controller.set_color((i % 256, 0, 0), section_id)
+            controller.render()
+            i += 1
+            sleep(0.001)
+        self.assertLessEqual(controller.strip.frames, 0.3 * 20 + 2)
+        # ticks are at least 1 / max_fps apart
+        times = [start for start, _ in controller.strip.frame_times]
+        self.assertGreater(len(times), 3)
+        self.assertTrue(all(b - a >= 0.045 for a, b in zip(times, times[1:])))
+
+    def test_idle(self):
+        controller = self.create_controller(max_fps=100)
+        controller.new_section(0, 9, (1, 1, 1))
+        controller.render()
+        self.wait_frames(controller, 1)
+        frames = controller.strip.frames
+        sleep(0.1)
+        self.assertEqual(frames, controller.strip.frames)
+
+    def test_adaptive_tick(self):
+        # showing a frame takes about 30 ms, much longer than the period given by max_fps
+        controller = self.create_controller(max_fps=1000, reset_us=20000, timing=True)
+        section_id = controller.new_section(0, 9, (1, 1, 1))
+        controller.render()
+        for i in range(10):
+            frames = controller.strip.frames
+            controller.set_color((i, 0, 0), section_id)
+            controller.render()
+            self.wait_frames(controller, frames + 1)
+        render_loop = controller.render_loop
+        self.assertGreater(render_loop.show_duration, 0.01)
+        self.assertEqual(render_loop.show_duration, render_loop.period)
+        self.assertGreater(render_loop.period, render_loop.min_period)
+
+    def test_stop(self):
+        controller = self.create_controller(max_fps=0.5)
+        frames = controller.strip.frames
+        section_id = controller.new_section(0, 9, (1, 1, 1))
+        controller.render()
+        self.wait_frames(controller, frames + 1)
+        # the next tick is 2 seconds later
+        controller.set_color((2, 2, 2), section_id)
+        controller.render()
+        # the render loop is waiting for the next tick
+        sleep(0.05)
+        render_loop = controller.render_loop
+        started = perf_counter()
+        render_loop.stop()
+        render_loop.join(1)
+        self.assertFalse(render_loop.is_alive())
+        self.assertLess(perf_counter() - started, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
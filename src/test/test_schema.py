@@ -0,0 +1,60 @@
+from jsonschema import Draft7Validator
+from command import CommandParser
+from schema import compile_schema
+import unittest
+
+
+class TestFastValidators(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.parser = CommandParser()
+
+    def assertAgree(self, name: str, instances: list):
+        cls = self.parser.get_class(name)
+        validator = Draft7Validator(cls.arguments_schema)
+        fast_validator = compile_schema(cls.arguments_schema)
+        self.assertIsNotNone(fast_validator)
+        for instance in instances:
+            # the fast validator must never accept invalid instances
+            if fast_validator(instance):
+                self.assertTrue(validator.is_valid(instance), instance)
+
+    def test_section_add(self):
+        self.assertAgree('section_add', [
+            {'sections': [{'start': 0, 'end': 9, 'color': '#fff'}]},
+            {'sections': [{'start': 0, 'end': 9, 'color': '#gggggg'}]},
+            {'sections': [{'start': 0, 'end': 9}]},
+            {'sections': [{'start': True, 'end': 9, 'color': '#ffffff'}]},
+            {'sections': [{'start': '0', 'end': 9, 'color': '#ffffff'}]},
+            {'sections': {}},
+            {},
+            None
+        ])
+        fast_validator = self.parser.get_class('section_add').fast_validator
+        self.assertTrue(fast_validator({'sections': [{'start': 0, 'end': 9, 'color': '#ff8000'}]}))
+        self.assertFalse(fast_validator({'sections': [{'start': 0, 'end': 9, 'color': 'ff8000'}]}))
+
+    def test_section_edit(self):
+        self.assertAgree('section_edit', [
+            {'section_id': 'a', 'start': 0, 'color': '#123456'},
+            {'section_id': 1},
+            {'start': 0},
+            {'section_id': 'a', 'end': 1.5}
+        ])
+
+    def test_metrics(self):
+        self.assertAgree('metrics', [
+            {'reset': True},
+            {'reset': 1},
+            {'reset': 'true'},
+            {}
+        ])
+        self.assertFalse(self.parser.get_class('metrics').fast_validator({'reset': 1}))
+
+    def test_unsupported(self):
+        self.assertIsNone(compile_schema({'type': 'object', 'additionalProperties': False}))
+
+
+if __name__ == '__main__':
+    unittest.main()
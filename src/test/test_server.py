@@ -0,0 +1,150 @@
+from command import CommandParser
+from controller import Controller
+from dispatcher import Dispatcher
+from server import AsyncServer
+from configparser import ConfigParser
+from tempfile import TemporaryDirectory
+from threading import Thread
+from time import perf_counter
+from os.path import join
+import asyncio
+import json
+import logging
+import socket
+import unittest
+
+
+class TestAsyncServer(unittest.TestCase):
+
+    def setUp(self) -> None:
+        with socket.socket() as skt:
+            skt.bind(('127.0.0.1', 0))
+            port = skt.getsockname()[1]
+        self.directory = TemporaryDirectory()
+        config = ConfigParser()
+        config.read('../config.ini')
+        config['DEFAULT']['host'] = '127.0.0.1'
+        config['DEFAULT']['port'] = str(port)
+        config['PIXEL_STRIP']['driver'] = 'simulated'
+        config['PIXEL_STRIP']['timing'] = '0'
+        config['STATE'] = {'enabled': '0'}
+        config['PROFILE'] = {'filename': join(self.directory.name, 'sc-rpi.prof')}
+        logging.basicConfig(level=None)
+        self.controller = Controller(config)
+        self.server = AsyncServer(config, Dispatcher(CommandParser(), self.controller))
+        self.loop = asyncio.new_event_loop()
+        self.task = self.loop.create_task(self.server.serve())
+        self.thread = Thread(target=self.serve)
+        self.thread.start()
+        for _ in range(100):
+            try:
+                socket.create_connection(('127.0.0.1', port)).close()
+                break
+            except ConnectionRefusedError:
+                self.thread.join(0.01)
+        self.port = port
+        self.clients = []
+
+    def serve(self):
+        try:
+            self.loop.run_until_complete(self.task)
+        except asyncio.CancelledError:
+            pass
+
+    def tearDown(self) -> None:
+        for skt, file in self.clients:
+            file.close()
+            skt.close()
+        self.loop.call_soon_threadsafe(self.task.cancel)
+        self.thread.join()
+        self.loop.close()
+        for executor in self.server.executors.values():
+            executor.shutdown()
+        self.controller.close()
+        self.directory.cleanup()
+
+    def connect(self):
+        skt = socket.create_connection(('127.0.0.1', self.port))
+        file = skt.makefile('rb')
+        self.clients.append((skt, file))
+        return skt, file
+
+    @staticmethod
+    def encode(name: str, args: dict = None) -> bytes:
+        return json.dumps({'name': name, 'args': args or {}}).encode() + b'\n'
+
+    @staticmethod
+    def read(file) -> dict:
+        return json.loads(file.readline())
+
+    def test_pipelined_requests(self):
+        skt, file = self.connect()
+        skt.sendall(self.encode('section_add', {'sections': [{'start': 0, 'end': 9, 'color': '#ff0000'}]}) +
+                    self.encode('metrics') + self.encode('status') + self.encode('unknown'))
+        section_id = self.read(file)['result']['sections'][0]
+        self.assertIn('histograms', self.read(file)['result'])
+        self.assertEqual([section_id], [s['id'] for s in self.read(file)['result']['current_sections']])
+        self.assertEqual(400, self.read(file)['status'])
+
+    def test_concurrent_clients(self):
+        clients = [self.connect() for _ in range(2)]
+        requests = 20
+        for i, (skt, _) in enumerate(clients):
+            start = 10 * i
+            skt.sendall(self.encode('section_add', {'sections': [{'start': start, 'end': start + 9,
+                                                                  'color': '#ff0000'}]}))
+        ids = [self.read(file)['result']['sections'][0] for _, file in clients]
+
+        def pipeline(skt):
+            skt.sendall(b''.join(self.encode('section_edit', {'section_id': ids[0 if skt is clients[0][0] else 1],
+                                                              'color': f'#0000{i:02x}'})
+                                 + self.encode('metrics') for i in range(requests)))
+
+        threads = [Thread(target=pipeline, args=(skt,)) for skt, _ in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for _, file in clients:
+            for i in range(requests):
+                self.assertEqual(200, self.read(file)['status'])
+                self.assertIn('histograms', self.read(file)['result'])
+        colors = [s['color'] for s in self.controller.status()['current_sections']]
+        self.assertEqual([f'#0000{requests - 1:02x}'] * 2, colors)
+
+    def test_disconnect_mid_request(self):
+        skt, file = self.connect()
+        skt.sendall(b'{"name": "sta')
+        file.close()
+        skt.close()
+        self.clients.clear()
+        skt, file = self.connect()
+        skt.sendall(self.encode('status'))
+        self.assertEqual(200, self.read(file)['status'])
+
+    def test_message_too_long(self):
+        skt, file = self.connect()
+        skt.sendall(b'x' * (self.server.tcp_max_msg_size + 1) + b'\n' + self.encode('status'))
+        self.assertEqual(413, self.read(file)['status'])
+        self.assertEqual(200, self.read(file)['status'])
+
+    def test_blocking_command(self):
+        profiler = self.controller.profiler
+        profiler.stop_timeout = 0.5
+        skt, file = self.connect()
+        skt.sendall(self.encode('profile', {'action': 'start'}))
+        self.assertEqual(200, self.read(file)['status'])
+        # a thread that never leaves the code profiled, stopping waits for stop_timeout
+        profiler.active.add(0)
+        other_skt, other_file = self.connect()
+        skt.sendall(self.encode('profile', {'action': 'stop'}))
+        started = perf_counter()
+        other_skt.sendall(self.encode('status'))
+        self.assertEqual(200, self.read(other_file)['status'])
+        self.assertLess(perf_counter() - started, profiler.stop_timeout)
+        self.assertEqual(200, self.read(file)['status'])
+        self.assertGreaterEqual(perf_counter() - started, profiler.stop_timeout)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+from command import CommandParser
+from dispatcher import Dispatcher
+from configparser import ConfigParser
+from http import HTTPStatus
+import strips
+import json
+import logging
+import unittest
+
+
+class TestStrips(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        config = ConfigParser()
+        config.read('../config.ini')
+        config['PIXEL_STRIP']['driver'] = 'simulated'
+        config['PIXEL_STRIP']['timing'] = '0'
+        config['STATE'] = {'enabled': '0', 'filename': '../sc-rpi.state'}
+        config['PIXEL_STRIP:2'] = {'n': '50', 'pin': '13', 'dma': '11', 'channel': '1'}
+        logging.basicConfig(level=None)
+        cls.config = config
+        cls.controllers = strips.create_controllers(config)
+        cls.dispatcher = Dispatcher(CommandParser(), cls.controllers[strips.DEFAULT_STRIP], cls.controllers)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        for controller in cls.controllers.values():
+            controller.close()
+
+    def setUp(self) -> None:
+        for controller in self.controllers.values():
+            controller.remove_all_sections()
+
+    def request(self, msg: dict):
+        return self.dispatcher.dispatch(json.dumps(msg))
+
+    def test_configs(self):
+        configs = strips.strip_configs(self.config)
+        self.assertEqual([0, 2], list(configs.keys()))
+        strip = configs[2]['PIXEL_STRIP']
+        self.assertEqual(('50', '13', '11', '1', '2'), (strip['n'], strip['pin'], strip['dma'], strip['channel'],
+                                                        strip['id']))
+        self.assertEqual('simulated', strip['driver'])
+        self.assertEqual('../sc-rpi.2.state', configs[2]['STATE']['filename'])
+        self.assertEqual('../sc-rpi.state', self.config['STATE']['filename'])
+        self.assertEqual(300, strips.max_strip_length(self.config))
+
+    def test_invalid_id(self):
+        config = ConfigParser()
+        config.read_dict(self.config)
+        config['PIXEL_STRIP:256'] = {'n': '10'}
+        self.assertRaises(ValueError, strips.strip_configs, config)
+
+    def test_ws281x_channels(self):
+        config = ConfigParser()
+        config.read_dict(self.config)
+        config['PIXEL_STRIP:2']['driver'] = 'ws281x'
+        config['PIXEL_STRIP']['driver'] = 'ws281x'
+        # both strips share the DMA channel
+        self.assertRaises(ValueError, strips.strip_configs, config)
+        config['PIXEL_STRIP:2']['dma'] = config['PIXEL_STRIP']['dma']
+        self.assertEqual([0, 2], list(strips.strip_configs(config).keys()))
+        config['PIXEL_STRIP:3'] = {'driver': 'ws281x', 'channel': '1'}
+        self.assertRaises(ValueError, strips.strip_configs, config)
+        config['PIXEL_STRIP:3']['channel'] = '2'
+        self.assertRaises(ValueError, strips.strip_configs, config)
+        del config['PIXEL_STRIP:3']
+        config['PIXEL_STRIP:2']['freq_hz'] = '400000'
+        self.assertRaises(ValueError, strips.strip_configs, config)
+
+    def test_sections_by_strip(self):
+        add = {'name': 'section_add', 'args': {'sections': [{'start': 0, 'end': 9, 'color': '#ff0000'}]}}
+        self.assertEqual(HTTPStatus.OK, self.request(add).status)
+        # leds of other strips are not overlapped
+        self.assertEqual(HTTPStatus.OK, self.request(dict(add, strip=2)).status)
+        status = self.request({'name': 'status', 'strip': 2}).result
+        self.assertEqual((2, 50, 1), (status['strip'], status['strip_length'], len(status['current_sections'])))
+        status = self.request({'name': 'status'}).result
+        self.assertEqual((0, 300, 1), (status['strip'], status['strip_length'], len(status['current_sections'])))
+
+    def test_strip_not_defined(self):
+        self.assertEqual(HTTPStatus.BAD_REQUEST, self.request({'name': 'status', 'strip': 1}).status)
+
+    def test_batch(self):
+        batch = {'name': 'batch', 'strip': 2, 'args': {'commands': [
+            {'name': 'section_add', 'args': {'sections': [{'start': 0, 'end': 9, 'color': '#ff0000'}]}}
+        ]}}
+        self.assertEqual(HTTPStatus.OK, self.request(batch).status)
+        self.assertEqual(1, len(self.controllers[2].status()['current_sections']))
+        self.assertEqual(0, len(self.controllers[0].status()['current_sections']))
+        batch['args']['commands'][0]['strip'] = 0
+        self.assertEqual(HTTPStatus.BAD_REQUEST, self.request(batch).status)
+
+    def test_frames(self):
+        self.dispatcher.dispatch_frame(bytes([255, 0, 0]) * 50, 2)
+        self.dispatcher.dispatch_frame(bytes([255, 0, 0]) * 50, 1)
+        self.assertEqual(0xff0000, self.controllers[2].framebuffer.pixels[0])
@@ -0,0 +1,47 @@
+from udp import FrameAssembler, build_packets
+import unittest
+
+
+class TestAssemblingFrames(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.assembler = FrameAssembler(900)
+
+    def test_frame_in_many_packets(self):
+        frame = bytes(i % 256 for i in range(900))
+        packets = build_packets(frame, 1, max_data_size=300)
+        self.assertEqual(3, len(packets))
+        self.assertIsNone(self.assembler.feed(packets[0]))
+        self.assertIsNone(self.assembler.feed(packets[1]))
+        self.assertEqual(frame, self.assembler.feed(packets[2]))
+
+    def test_stale_packets(self):
+        old_frame = bytes([1]) * 900
+        new_frame = bytes([2]) * 900
+        self.assertEqual(new_frame, self.assembler.feed(build_packets(new_frame, 2)[0]))
+        self.assertIsNone(self.assembler.feed(build_packets(old_frame, 1)[0]))
+        self.assertIsNone(self.assembler.feed(build_packets(old_frame, 2)[0]))
+        self.assertEqual(2, self.assembler.dropped_packets)
+
+    def test_sequence_wrap_around(self):
+        frame = bytes([1]) * 900
+        self.assertIsNotNone(self.assembler.feed(build_packets(frame, 0xFFFF)[0]))
+        self.assertIsNotNone(self.assembler.feed(build_packets(frame, 0x10000)[0]))
+
+    def test_partial_frame(self):
+        frame = bytes([1]) * 900
+        self.assembler.feed(build_packets(frame, 1)[0])
+        packet = FrameAssembler.HEADER.pack(FrameAssembler.VERSION, FrameAssembler.FLAG_PUSH, 2, 3, 3) + b'abc'
+        self.assertEqual(bytes([1, 1, 1]) + b'abc' + bytes([1]) * 894, self.assembler.feed(packet))
+
+    def test_invalid_packets(self):
+        self.assertIsNone(self.assembler.feed(b'abc'))
+        packet = FrameAssembler.HEADER.pack(FrameAssembler.VERSION, FrameAssembler.FLAG_PUSH, 1, 900, 3) + b'abc'
+        self.assertIsNone(self.assembler.feed(packet))
+        packet = FrameAssembler.HEADER.pack(FrameAssembler.VERSION, FrameAssembler.FLAG_PUSH, 1, 0, 6) + b'abc'
+        self.assertIsNone(self.assembler.feed(packet))
+        self.assertEqual(3, self.assembler.dropped_packets)
+
+
+if __name__ == '__main__':
+    unittest.main()
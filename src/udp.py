@@ -0,0 +1,171 @@
+import socket
+import logging
+import metrics
+from configparser import ConfigParser
+from struct import Struct
+from threading import Thread, Event
+from typing import Optional, List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # not imported at runtime, so packets can be built without rpi_ws281x (see udp_generator.py)
+    from controller import Controller
+
+
+def is_newer(sequence: int, other: int) -> bool:
+    """
+    Compares 16 bits sequence numbers taking wrap around into account
+    """
+    return 0 < ((sequence - other) & 0xFFFF) < 0x8000
+
+
+def build_packets(frame: bytes, sequence: int, max_data_size: int = 1440) -> List[bytes]:
+    """
+    Splits a frame in packets that can be sent to the UdpReceiver (see FrameAssembler)
+
+    :param frame: RGB bytes of the frame
+    :param sequence: sequence number of the frame
+    :param max_data_size: maximum number of bytes of the frame per packet
+    """
+    max_data_size -= max_data_size % 3
+    packets = []
+    for offset in range(0, len(frame), max_data_size):
+        data = frame[offset:offset + max_data_size]
+        flags = FrameAssembler.FLAG_PUSH if offset + max_data_size >= len(frame) else 0
+        header = FrameAssembler.HEADER.pack(FrameAssembler.VERSION, flags, sequence & 0xFFFF, offset, len(data))
+        packets.append(header + data)
+    return packets
+
+
+class FrameAssembler:
+    """
+    Assembles frames from UDP packets (in the style of DDP). Each packet carries a portion of the frame:
+
+        - version (1 byte): must be VERSION
+        - flags (1 byte): FLAG_PUSH is set on the last packet of the frame
+        - sequence (2 bytes): same for all packets of the frame, incremented (with wrap around) for each new frame
+        - offset (4 bytes): offset (in bytes) of the data within the frame
+        - length (2 bytes): length (in bytes) of the data
+        - data: RGB bytes (3 bytes per led)
+
+    All numbers are unsigned and big-endian. Packets belonging to an older frame than the one being assembled, and
+    packets belonging to an already pushed frame, are dropped. Portions of the frame not included in any packet keep
+    the values of the previous frame.
+    """
+
+    HEADER = Struct('!BBHIH')
+    VERSION = 1
+    FLAG_PUSH = 0x01
+
+    def __init__(self, frame_size: int):
+        self.frame = bytearray(frame_size)
+        self.sequence = None
+        self.pushed = None
+        self.dropped_packets = 0
+
+    def drop(self):
+        self.dropped_packets += 1
+        metrics.count('udp_packets_dropped')
+
+    def feed(self, packet) -> Optional[bytes]:
+        """
+        Copies the data of the packet into the frame
+
+        :param packet: bytes-like object with the received packet
+        :return: the complete frame if the packet has FLAG_PUSH set, None otherwise
+        """
+        if len(packet) < self.HEADER.size:
+            self.drop()
+            return None
+        version, flags, sequence, offset, length = self.HEADER.unpack_from(packet)
+        if version != self.VERSION or len(packet) - self.HEADER.size != length or offset + length > len(self.frame):
+            self.drop()
+            return None
+        if sequence == self.pushed or \
+                (self.sequence is not None and sequence != self.sequence and not is_newer(sequence, self.sequence)):
+            self.drop()
+            return None
+        self.sequence = sequence
+        self.frame[offset:offset + length] = packet[self.HEADER.size:]
+        if flags & self.FLAG_PUSH:
+            self.pushed = sequence
+            return bytes(self.frame)
+        return None
+
+
+class UdpReceiver(Thread):
+    """
+    Receives frames over UDP (see FrameAssembler) and writes them on the strip. It runs alongside the SCP server, so
+    sections and on/off state still work (a frame is rendered until the next command changing sections). Packets have
+    no strip id, so frames are written on the default strip only (see strips.py).
+
+    After receiving a packet, every packet already queued on the socket is read before writing on the strip, so if
+    several frames are completed meanwhile only the latest one is shown.
+    """
+
+    timeout = 0.5
+
+    def __init__(self, config: ConfigParser, controller: Optional['Controller']):
+        super().__init__(name='UdpReceiver', daemon=True)
+        self.host = config['UDP'].get('host', '0.0.0.0')
+        self.port = int(config['UDP'].get('port', str(4048)))
+        frame_size = 3 * int(config['PIXEL_STRIP'].get('n'))
+        self.assembler = FrameAssembler(frame_size)
+        self.buffer = bytearray(FrameAssembler.HEADER.size + frame_size)
+        self.controller = controller
+        self.stopped = Event()
+        self.logger = logging.getLogger('UdpReceiver')
+
+    def set_controller(self, controller: Optional['Controller']):
+        """
+        Sets the controller on which frames are written (frames are dropped if it's None)
+        """
+        self.controller = controller
+
+    def stop(self):
+        self.stopped.set()
+
+    def read_pending(self, skt: socket.socket, frame: Optional[bytes] = None) -> Optional[bytes]:
+        """
+        Reads every packet queued on the socket without blocking
+
+        :param frame: frame completed before reading (if any)
+        :return: the latest complete frame or None if no frame was completed
+        """
+        skt.setblocking(False)
+        try:
+            while True:
+                size = skt.recv_into(self.buffer)
+                completed = self.assembler.feed(memoryview(self.buffer)[:size])
+                if completed is not None:
+                    if frame is not None:
+                        # superseded by a newer frame before being shown
+                        metrics.count('frames_dropped')
+                    frame = completed
+        except BlockingIOError:
+            pass
+        finally:
+            skt.settimeout(self.timeout)
+        return frame
+
+    def run(self):
+        skt = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        skt.bind((self.host, self.port))
+        skt.settimeout(self.timeout)
+        self.logger.info(f'Listening on {self.host}:{self.port} (UDP)')
+        try:
+            while not self.stopped.is_set():
+                try:
+                    size = skt.recv_into(self.buffer)
+                except socket.timeout:
+                    continue
+                frame = self.assembler.feed(memoryview(self.buffer)[:size])
+                frame = self.read_pending(skt, frame)
+                controller = self.controller
+                if frame is not None and controller is not None:
+                    try:
+                        controller.write_frame(frame)
+                    except Exception as e:
+                        self.logger.exception(e)
+        finally:
+            skt.close()
+            self.logger.info('UDP socket closed.')
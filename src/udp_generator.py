@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+"""
+Sends frames to the UdpReceiver, useful to test it on localhost. It sends a moving rainbow, for instance:
+
+    ./udp_generator.py --host 127.0.0.1 --port 4048 --leds 300 --fps 60 --seconds 10
+"""
+
+import socket
+import time
+from argparse import ArgumentParser
+from colorsys import hsv_to_rgb
+from udp import build_packets
+
+
+def rainbow(leds: int, shift: int) -> bytes:
+    frame = bytearray(3 * leds)
+    for i in range(leds):
+        r, g, b = hsv_to_rgb(((i + shift) % leds) / leds, 1, 1)
+        frame[3 * i:3 * i + 3] = bytes((int(255 * r), int(255 * g), int(255 * b)))
+    return bytes(frame)
+
+
+if __name__ == '__main__':
+
+    parser = ArgumentParser(description='Sends frames to the UDP receiver of sc-rpi')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4048)
+    parser.add_argument('--leds', type=int, default=300)
+    parser.add_argument('--fps', type=float, default=60)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    skt = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    frames = [rainbow(args.leds, shift) for shift in range(args.leds)]
+    period = 1 / args.fps
+    sequence = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.seconds:
+        for packet in build_packets(frames[sequence % args.leds], sequence):
+            skt.sendto(packet, (args.host, args.port))
+        sequence += 1
+        time.sleep(max(0.0, start + sequence * period - time.perf_counter()))
+    print(f'{sequence} frames sent in {time.perf_counter() - start:.2f} seconds')